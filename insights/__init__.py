@@ -67,18 +67,35 @@ def get_nvr():
 def get_pool(parallel, prefix, kwargs):
     """
     Yields:
-        a ThreadPoolExecutor if parallel is True and `concurrent.futures` exists.
+        a ProcessPoolExecutor if parallel is "process", a ThreadPoolExecutor
+        if parallel is any other true value, and `concurrent.futures` exists.
         `None` otherwise.
     """
-    if parallel:
-        try:
-            from concurrent.futures import ThreadPoolExecutor
-            with ThreadPoolExecutor(thread_name_prefix=prefix, **kwargs) as pool:
-                yield pool
-        except ImportError:
-            yield None
-    else:
+    if not parallel:
         yield None
+        return
+
+    try:
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    except ImportError:
+        yield None
+        return
+
+    if parallel == "process":
+        kwargs = dict(kwargs)
+        if sys.version_info >= (3, 7) and "mp_context" not in kwargs:
+            import multiprocessing
+            try:
+                # forked workers inherit the loaded components and their
+                # configuration.
+                kwargs["mp_context"] = multiprocessing.get_context("fork")
+            except ValueError:
+                pass
+        with ProcessPoolExecutor(**kwargs) as pool:
+            yield pool
+    else:
+        with ThreadPoolExecutor(thread_name_prefix=prefix, **kwargs) as pool:
+            yield pool
 
 
 RULES_STATUS = {}
@@ -101,25 +118,28 @@ def add_status(name, nvr, commit=None):
 add_status(package_info["NAME"], get_nvr(), package_info["COMMIT"])
 
 
-def process_dir(broker, root, graph, context, inventory=None, parallel=False):
-    ctx, broker = initialize_broker(root, context=context, broker=broker)
-    log.debug("Processing %s with %s" % (root, ctx))
+def process_dir(broker, root, graph, context, inventory=None, parallel=False, archive=None, lazy=False):
+    with get_pool(parallel, "insights-run-pool", {"max_workers": None}) as pool:
+        ctx, broker = initialize_broker(root, context=context, broker=broker, lazy=lazy, pool=pool,
+                                        archive=archive)
+        log.debug("Processing %s with %s" % (root, ctx))
 
-    if isinstance(ctx, ClusterArchiveContext):
-        from .core.cluster import process_cluster
-        archives = [f for f in ctx.all_files if f.endswith(COMPRESSION_TYPES)]
-        return process_cluster(graph, archives, broker=broker, inventory=inventory)
+        if isinstance(ctx, ClusterArchiveContext):
+            from .core.cluster import process_cluster
+            archives = [f for f in ctx.all_files if f.endswith(COMPRESSION_TYPES)]
+            return process_cluster(graph, archives, broker=broker, inventory=inventory, pool=pool)
 
-    graph = dict((k, v) for k, v in graph.items() if k in dr.COMPONENTS[dr.GROUPS.single])
-    if parallel:
-        with get_pool(parallel, "insights-run-pool", {"max_workers": None}) as pool:
-            broker = dr.run_all(graph, broker, pool)
-    else:
-        broker = dr.run(graph, broker=broker)
+        graph = dict((k, v) for k, v in graph.items() if k in dr.COMPONENTS[dr.GROUPS.single])
+        graph = dr.prune(graph, broker)
+        if parallel:
+            dr.run_all(graph, broker, pool)
+        else:
+            broker = dr.run(graph, broker=broker)
     return broker
 
 
-def _run(broker, graph=None, root=None, context=None, inventory=None, parallel=False):
+def _run(broker, graph=None, root=None, context=None, inventory=None, parallel=False, on_demand=False,
+         lazy=False):
     """
     run is a general interface that is meant for stand-alone scripts to use
     when executing insights components.
@@ -138,7 +158,17 @@ def _run(broker, graph=None, root=None, context=None, inventory=None, parallel=F
             will execute.
         context (obj): The execution context that's set.
         inventory (str): Path to inventory file.
-        parallel (bool): Boolean as to weather to use parallel execution or not.
+        parallel (bool or str): Whether to execute disjoint subgraphs in
+            parallel. "process" uses a pool of worker processes, any other
+            true value uses a pool of threads.
+            The metadata of a serialized archive is also read by the pool.
+        on_demand (bool): Whether to extract the files of a zip or an
+            uncompressed tar archive only when they're collected, instead of
+            extracting the whole archive first.
+        lazy (bool): Whether to load each component of a serialized archive
+            only when the evaluation looks it up, instead of loading all of
+            them first. Components the evaluated graph doesn't use are then
+            never loaded.
 
     Returns:
         broker: object containing the result of the evaluation.
@@ -147,17 +177,21 @@ def _run(broker, graph=None, root=None, context=None, inventory=None, parallel=F
         context = context or HostContext
         broker[context] = context()
         graph = dict((k, v) for k, v in graph.items() if k in dr.COMPONENTS[dr.GROUPS.single])
+        graph = dr.prune(graph, broker)
         if parallel:
             with get_pool(parallel, "insights-run-pool", {"max_workers": None}) as pool:
                 dr.run_all(graph, broker, pool)
+            return broker
         else:
             return dr.run(graph, broker=broker)
 
     if os.path.isdir(root):
-        return process_dir(broker, root, graph, context, inventory=inventory, parallel=parallel)
+        return process_dir(broker, root, graph, context, inventory=inventory, parallel=parallel,
+                           lazy=lazy)
     else:
-        with extract(root) as ex:
-            return process_dir(broker, ex.tmp_dir, graph, context, inventory=inventory, parallel=parallel)
+        with extract(root, on_demand=on_demand) as ex:
+            return process_dir(broker, ex.tmp_dir, graph, context, inventory=inventory, parallel=parallel,
+                               archive=ex.archive, lazy=lazy)
 
 
 def load_default_plugins():
@@ -268,7 +302,7 @@ def _load_context(path):
 
 
 def run(component=None, root=None, print_summary=False, context=None, inventory=None, print_component=None,
-        store_skips=False):
+        store_skips=False, parallel=False, on_demand=False, lazy=False):
     args = None
     formatters = None
 
@@ -292,7 +326,14 @@ def run(component=None, root=None, print_summary=False, context=None, inventory=
                        help="Choose if and how the color encoding is outputted. When is 'always', 'auto', or 'never'.")
         p.add_argument("--context", help="Execution Context. Defaults to HostContext if an archive isn't passed.")
         p.add_argument("--no-load-default", help="Don't load the default plugins.", action="store_true")
-        p.add_argument("--parallel", help="Execute rules in parallel.", action="store_true")
+        p.add_argument("--parallel", help="Execute rules in parallel.", action="store_const", const="thread",
+                       default=False)
+        p.add_argument("--parallel-processes", help="Execute rules in parallel worker processes.",
+                       action="store_const", const="process", dest="parallel")
+        p.add_argument("--on-demand", help="Extract the files of zip and uncompressed tar archives on demand.",
+                       action="store_true", default=False)
+        p.add_argument("--lazy", help="Load the components of serialized archives only when they're used.",
+                       action="store_true", default=False)
         p.add_argument("--show-skips", help="Capture skips in the broker for troubleshooting.", action="store_true",
                        default=False)
         p.add_argument("--tags", help="Expression to select rules by tag.")
@@ -405,14 +446,15 @@ def run(component=None, root=None, print_summary=False, context=None, inventory=
         if formatters:
             for formatter in formatters:
                 formatter.preprocess(broker)
-
             if args:
                 if args.bare:
                     broker = dr.run(graph, broker=broker)
                 else:
-                    broker = _run(broker, graph, root, context=context, inventory=inventory, parallel=args.parallel)
+                    broker = _run(broker, graph, root, context=context, inventory=inventory, parallel=args.parallel,
+                                  on_demand=args.on_demand, lazy=args.lazy)
             else:
-                broker = _run(broker, graph, root, context=context, inventory=inventory)
+                broker = _run(broker, graph, root, context=context, inventory=inventory, parallel=parallel,
+                              on_demand=on_demand, lazy=lazy)
 
             for formatter in formatters:
                 formatter.postprocess(broker)
@@ -421,9 +463,11 @@ def run(component=None, root=None, print_summary=False, context=None, inventory=
                 if args.bare:
                     broker = dr.run(graph, broker=broker)
                 else:
-                    broker = _run(broker, graph, root, context=context, inventory=inventory, parallel=args.parallel)
+                    broker = _run(broker, graph, root, context=context, inventory=inventory, parallel=args.parallel,
+                                  on_demand=args.on_demand, lazy=args.lazy)
             else:
-                broker = _run(broker, graph, root, context=context, inventory=inventory)
+                broker = _run(broker, graph, root, context=context, inventory=inventory, parallel=parallel,
+                              on_demand=on_demand, lazy=lazy)
 
             broker.print_component(print_component)
         else:
@@ -431,9 +475,11 @@ def run(component=None, root=None, print_summary=False, context=None, inventory=
                 if args.bare:
                     broker = dr.run(graph, broker=broker)
                 else:
-                    broker = _run(broker, graph, root, context=context, inventory=inventory, parallel=args.parallel)
+                    broker = _run(broker, graph, root, context=context, inventory=inventory, parallel=args.parallel,
+                                  on_demand=args.on_demand, lazy=args.lazy)
             else:
-                broker = _run(broker, graph, root, context=context, inventory=inventory)
+                broker = _run(broker, graph, root, context=context, inventory=inventory, parallel=parallel,
+                              on_demand=on_demand, lazy=lazy)
 
         return broker
     except (InvalidContentType, InvalidArchive):
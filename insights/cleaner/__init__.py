@@ -28,12 +28,14 @@ specs during collection according to the user configuration and specs setting.
   * password
 """
 
+import locale
 import logging
 import json
 import os
+import re
 import six
 
-from insights.cleaner.filters import AllowFilter
+from insights.cleaner.filters import AllowFilter, AllowMatcher
 from insights.cleaner.hostname import Hostname
 from insights.cleaner.ip import IPv4, IPv6
 from insights.cleaner.keyword import Keyword
@@ -42,6 +44,7 @@ from insights.cleaner.mac import Mac
 from insights.cleaner.password import Password
 from insights.cleaner.pattern import Pattern
 from insights.cleaner.utilities import write_report
+from insights.util.fs import ReversedSpool, read_lines_reversed
 from insights.util.hostname import determine_hostname
 from insights.util.posix_regex import replace_posix
 
@@ -57,6 +60,38 @@ DEFAULT_OBFUSCATIONS = {
 }
 
 
+def _compile_trigger(parser, kwargs):
+    trigger = getattr(parser, 'trigger', None)
+    pattern = trigger(**kwargs) if trigger else None
+    if pattern is None:
+        return None
+    try:
+        return re.compile(pattern)
+    except re.error:
+        return None
+
+
+def _compile_parsers(parsers):
+    """
+    Attaches the compiled trigger of each parser to it and combines all of
+    them into a single alternation that prescreens a line in one scan.  A
+    parser is called for a line only when its trigger matches the line.
+    The prescreen is None when any parser has no trigger.
+    """
+    compiled = []
+    for parser, kwargs in parsers:
+        regex = _compile_trigger(parser, kwargs)
+        compiled.append((parser, kwargs, regex))
+
+    prescreen = None
+    if compiled and all(regex is not None for _, _, regex in compiled):
+        try:
+            prescreen = re.compile('|'.join('(?:%s)' % regex.pattern for _, _, regex in compiled))
+        except re.error:
+            prescreen = None
+    return compiled, prescreen
+
+
 class Cleaner(object):
     """
     Class to clean the content of Specs according to the user configuration and
@@ -100,7 +135,7 @@ class Cleaner(object):
             # - MAC obfuscation
             self.obfuscate.update(mac=Mac()) if 'mac' in obfs else None
 
-    def clean_content(self, lines, no_obfuscate=None, no_redact=False, allowlist=None, width=False):
+    def clean_content(self, lines, no_obfuscate=None, no_redact=False, allowlist=None, width=False, matcher=None):
         """
         Clean lines one by one according to the configuration.
 
@@ -108,6 +143,38 @@ class Cleaner(object):
         part of them.  So the lines are processed in reverse order.  But the
         processed result is returned in the original order.
         """
+        kwargs = dict(no_obfuscate=no_obfuscate, no_redact=no_redact, allowlist=allowlist, width=width,
+                      matcher=matcher)
+        # handle single string
+        if not isinstance(lines, list):
+            result = list(self.clean_stream([lines], **kwargs))
+            return result[0] if result else None
+
+        # process lines in reverse order
+        result = list(self.clean_stream(reversed(lines), **kwargs))
+        if result and any(l for l in result):
+            # When some lines Truthy, return them in right order
+            result.reverse()
+            return result
+        # All lines blank
+        return []
+
+    def clean_stream(self, lines, no_obfuscate=None, no_redact=False, allowlist=None, width=False, matcher=None):
+        """
+        Clean lines one by one according to the configuration and yield the
+        lines that are kept.
+
+        Unlike :meth:`clean_content`, the `lines` can be any iterable and are
+        processed in the order they are given, so the last line of a file
+        should come first to keep the bottom part of it.  The lines are
+        yielded in the same order.  Lines are not read any more once the
+        allowlist is used up.
+
+        The `matcher` is the :class:`insights.cleaner.filters.AllowMatcher`
+        of the `allowlist`, e.g. the one cached for the spec by
+        :func:`insights.core.filters.get_matcher`.  A new one is built when
+        it's not specified.
+        """
 
         def _clean_line(line):
             if len(line) > MAX_LINE_LENGTH:
@@ -115,7 +182,18 @@ class Cleaner(object):
                 line = line[:MAX_LINE_LENGTH]
                 logger.debug('Extra-long line is truncated ...')
 
-            for parser, kwargs in parsers:
+            if line and prescreen is not None and not prescreen.search(line):
+                # None of the parsers would change it, the allow filter
+                # would discard it.
+                return None if allowlist is not None else line
+
+            for parser, kwargs, regex in parsers:
+                if not line:
+                    break
+                if regex is not None and not regex.search(line):
+                    if parser is self.redact['allow_filter']:
+                        return None
+                    continue
                 line = parser.parse_line(line, **kwargs)
             return line
 
@@ -125,8 +203,11 @@ class Cleaner(object):
         if self.redact['pattern'] and not no_redact:
             parsers.append((self.redact['pattern'], {})) if not no_redact else None
         # 2. Filter as per allowlist got from add_filter  # copy it to avoid write back
+        remaining = dict(allowlist) if allowlist is not None else None
+        if allowlist is not None and (matcher is None or matcher.allowlist != allowlist):
+            matcher = AllowMatcher(allowlist)
         (
-            parsers.append((self.redact['allow_filter'], {'allowlist': dict(allowlist)}))
+            parsers.append((self.redact['allow_filter'], {'allowlist': remaining, 'matcher': matcher}))
             if allowlist is not None
             else None
         )
@@ -141,59 +222,62 @@ class Cleaner(object):
             if self.obfuscate[obf]:
                 parsers.append((self.obfuscate[obf], {'width': width}))
 
-        # handle single string
-        if not isinstance(lines, list):
-            return _clean_line(lines)
+        parsers, prescreen = _compile_parsers(parsers)
 
-        result = []
-        # process lines in reverse order
-        for idx in range(len(lines) - 1, -1, -1):
-            line = _clean_line(lines[idx])
-            result.append(line) if line is not None else None
-        if result and any(l for l in result):
-            # When some lines Truthy, return them in right order
-            result.reverse()
-            return result
-        # All lines blank
-        return []
+        for line in lines:
+            line = _clean_line(line)
+            if line is not None:
+                yield line
+            if remaining is not None and not remaining:
+                # enough lines were found for every filter
+                break
 
     def clean_file(self, _file, no_obfuscate=None, no_redact=False, allowlist=None):
         """
         Clean a file according to the configuration, the file will be updated
         directly with the cleaned content.
+
+        The file is read from the bottom up and the cleaned lines are spooled
+        to a temporary file, so only a block of it is held in memory.
         """
         logger.debug('Cleaning %s ...' % _file)
 
         if os.path.exists(_file) and not os.path.islink(_file):
             # Process the file
-            raw_data = content = None
-            try:
-                with open(_file, 'r') as fh:
-                    raw_data = fh.readlines()
-                    content = self.clean_content(
-                        raw_data,
-                        no_obfuscate=no_obfuscate,
-                        no_redact=no_redact,
-                        allowlist=allowlist,
-                        width=_file.endswith("netstat_-neopa"),
-                    )
-            except Exception as e:  # pragma: no cover
-                logger.warning(e)
-                raise Exception("Error: Cannot Open File for Cleaning: %s" % _file)
-            # Store it
-            try:
-                if raw_data:
-                    if content:
-                        with open(_file, 'wb') as fh:
-                            for line in content:
-                                fh.write(line.encode('utf-8') if six.PY3 else line)
-                    else:
-                        # Remove Empty file
-                        logger.debug('Removing %s, as it\'s empty after cleaning' % _file)
-                        os.remove(_file)
-            except Exception as e:  # pragma: no cover
-                logger.warning(e)
-                raise Exception("Error: Cannot Write to File: %s" % _file)
+            with ReversedSpool() as spool:
+                raw_data = content = False
+                try:
+                    raw_data = os.path.getsize(_file) > 0
+                    with open(_file, 'rb') as fh:
+                        # the lines are bytes on Python 2 as the file was read before
+                        encoding = locale.getpreferredencoding(False) if six.PY3 else None
+                        lines = read_lines_reversed(fh, encoding=encoding, keepends=True)
+                        for line in self.clean_stream(
+                            lines,
+                            no_obfuscate=no_obfuscate,
+                            no_redact=no_redact,
+                            allowlist=allowlist,
+                            width=_file.endswith("netstat_-neopa"),
+                        ):
+                            spool.write(line.encode('utf-8') if isinstance(line, six.text_type) else line)
+                            content = content or bool(line)
+                except Exception as e:  # pragma: no cover
+                    logger.warning(e)
+                    raise Exception("Error: Cannot Open File for Cleaning: %s" % _file)
+                # Store it
+                try:
+                    if raw_data:
+                        if content:
+                            with open(_file, 'wb') as fh:
+                                for line in spool:
+                                    fh.write(line)
+                        else:
+                            # Remove Empty file
+                            logger.debug('Removing %s, as it\'s empty after cleaning' % _file)
+                            os.remove(_file)
+                except Exception as e:  # pragma: no cover
+                    logger.warning(e)
+                    raise Exception("Error: Cannot Write to File: %s" % _file)
 
     def generate_rhsm_facts(self):
         logger.info('Writing RHSM facts to %s ...', self.rhsm_facts_file)
@@ -4,6 +4,7 @@ Filtering
 """
 
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
@@ -13,28 +14,50 @@ class AllowFilter(object):
     Class for filtering per allow list.
     """
 
+    _last_matcher = None
+
     def parse_line(self, line, **kwargs):
         # filter line as per the allow list specified by plugins
         if not line:
             return line
         allowlist = kwargs.get('allowlist', {})
         if allowlist:
-            for a_key in list(allowlist.keys()):  # copy keys to avoid RuntimeError
-                # keep line when any filter match
-                # FIXME:
-                # Considering performance, didn't handle multiple filters in one same line
-                if a_key in line:
-                    allowlist[a_key] -= 1
-                    # stop checking it when enough lines contain the key were found
-                    allowlist.pop(a_key) if allowlist[a_key] == 0 else None
-                    return line
+            matcher = kwargs.get('matcher') or self._matcher(allowlist)
+            # keep line when any filter match, the line only counts for the
+            # first key of the allowlist it contains
+            a_key = matcher.first(line, allowlist)
+            if a_key is not None:
+                allowlist[a_key] -= 1
+                # stop checking it when enough lines contain the key were found
+                allowlist.pop(a_key) if allowlist[a_key] == 0 else None
+                return line
         # discard line when none filters found
 
+    def _matcher(self, allowlist):
+        # the matcher of the allowlist of the lines cleaned last, a key
+        # popped from the allowlist is skipped by AllowMatcher.first
+        matcher = self._last_matcher
+        if matcher is None or matcher.allowlist is not allowlist:
+            matcher = self._last_matcher = AllowMatcher(allowlist)
+        return matcher
+
+    def trigger(self, **kwargs):
+        """
+        Returns a regular expression that matches every line this filter
+        could keep.
+        """
+        allowlist = kwargs.get('allowlist', {})
+        if not allowlist:
+            # nothing is kept
+            return r'(?!)'
+        matcher = kwargs.get('matcher') or self._matcher(allowlist)
+        return matcher.regex.pattern
+
     def generate_report(self, report_dir, archive_name):
         pass  # pragma: no cover
 
     @staticmethod
-    def filter_content(lines, allowlist):
+    def filter_content(lines, allowlist, matcher=None):
         """
         Filter content based on allowlist.
 
@@ -48,21 +71,112 @@ class AllowFilter(object):
 
         :param lines: list of lines
         :param allowlist: dictionary of allowlist
+        :param matcher: an :class:`AllowMatcher` built for the `allowlist`,
+                        a new one is built when it's not specified
         :return: list of lines
         """
-        allowlist = dict(allowlist)  # copy it to avoid write back
+        if not allowlist:
+            return []
+        if matcher is None or matcher.allowlist != allowlist:
+            matcher = AllowMatcher(allowlist)
+        remaining = dict(allowlist)
         result = []
         for idx in range(len(lines) - 1, -1, -1):
-            for a_key in list(allowlist.keys()):  # copy keys to avoid RuntimeError
-                if a_key in lines[idx]:
-                    allowlist[a_key] -= 1
+            a_key = matcher.first(lines[idx], remaining)
+            if a_key is not None:
+                remaining[a_key] -= 1
+                result.append(lines[idx])
+                if remaining[a_key] == 0:
                     # stop checking it when enough lines contain the key were found
-                    allowlist.pop(a_key) if allowlist[a_key] == 0 else None
-                    result.append(lines[idx])
-                    # stop checking other keys when one key is found
-                    # it's sometimes not fair to other keys, but it's
-                    # the best we can do for performance
-                    break
+                    remaining.pop(a_key)
+                    if not remaining:
+                        break
         # Return the result in right order
         result.reverse()
         return result
+
+
+class AllowMatcher(object):
+    """
+    Matcher of the keys of an allowlist, built once per allowlist.
+
+    The keys contained in a line are found in one pass over the line by a
+    regular expression of the trie of the keys: each match is the longest key
+    starting at a position of the line, and the keys it starts with are known
+    in advance.  The search is resumed at the next position after the start
+    of each match, so that overlapping keys are found too.
+
+    Checking the keys one by one with ``in`` is faster for the allowlists
+    with less than ``scan_max_keys`` keys, they are checked so.
+
+    :param allowlist: dictionary of allowlist, the key to max match count
+    """
+
+    scan_max_keys = 50
+
+    def __init__(self, allowlist):
+        self.allowlist = allowlist
+        self.keys = list(allowlist)
+        self.regex = re.compile(self._trie_regex()) if self.keys else None
+        if len(self.keys) < self.scan_max_keys:
+            self._prefixes = None
+        else:
+            # the rank and the key of the keys each key starts with
+            ranks = dict((key, rank) for rank, key in enumerate(self.keys))
+            self._prefixes = dict(
+                (key, [(ranks[key[:i]], key[:i]) for i in range(len(key) + 1) if key[:i] in ranks])
+                for key in self.keys
+            )
+            for prefixes in self._prefixes.values():
+                prefixes.sort()
+
+    def _trie_regex(self):
+        # the children and whether a key ends there of each node of the
+        # trie, the node 0 is the root
+        goto = [{}]
+        ends = [False]
+        for key in self.keys:
+            node = 0
+            for ch in key:
+                if ch not in goto[node]:
+                    goto.append({})
+                    ends.append(False)
+                    goto[node][ch] = len(goto) - 1
+                node = goto[node][ch]
+            # an empty key ends at the root and matches every line
+            ends[node] = True
+        # nodes are numbered after their parents, build the expression
+        # of the deepest nodes first
+        exprs = [''] * len(goto)
+        for node in range(len(goto) - 1, -1, -1):
+            alts = [re.escape(ch) + exprs[nxt] for ch, nxt in sorted(goto[node].items())]
+            expr = alts[0] if len(alts) == 1 else '(?:{0})'.format('|'.join(alts))
+            if alts and ends[node]:
+                # a key ends here, the longest one is matched
+                expr = '(?:{0})?'.format(expr)
+            exprs[node] = expr
+        return exprs[0]
+
+    def first(self, line, remaining):
+        """
+        Returns the first key of the allowlist contained in the `line` that
+        is still in `remaining`, or None when there is no such key.
+        """
+        if self._prefixes is None:
+            for key in self.keys:
+                if key in remaining and key in line:
+                    return key
+            return None
+        best = None
+        search = self.regex.search
+        match = search(line)
+        while match is not None:
+            for rank, key in self._prefixes[match.group()]:
+                if key in remaining:
+                    if best is None or rank < best[0]:
+                        best = (rank, key)
+                    break
+            if match.start() == len(line):
+                break
+            match = search(line, match.start() + 1)
+        return best[1] if best else None
@@ -8,6 +8,7 @@ import hashlib
 import os
 import re
 import six
+import threading
 
 from insights.cleaner.utilities import write_report
 
@@ -34,6 +35,8 @@ class Hostname(object):
 
         # - Hostname obfuscate information
         self._hn_db = dict()  # hostname database
+        self._hn_idx = dict()  # reversed hostname database
+        self._lock = threading.Lock()
         self._hostname_count = 0
         self._obfuscated_domain = 'example.com'
 
@@ -47,6 +50,7 @@ class Hostname(object):
         )
         self._hostname_count += 1
         self._hn_db[self._obfuscated_fqdn] = self._fqdn
+        self._hn_idx[self._fqdn] = self._obfuscated_fqdn
 
     def _domains2db(self):
         # adds any additional domainnames to the domain database to be searched for
@@ -67,24 +71,22 @@ class Hostname(object):
         '''
         This will add a hostname for a hostname for an included domain or return an existing entry
         '''
-        db = self._hn_db
-        hn_found = False
-        for k, v in db.items():
-            if v == hn:  # the hostname is in the database
-                ret_hn = k
-                hn_found = True
-        if hn_found:
-            return ret_hn
-        else:
-            # we have a new hostname, so we increment the counter to get the host ID number
-            self._hostname_count += 1
-            o_domain = self._obfuscated_domain
-            for od, d in self._dn_db.items():
-                if d in hn:  # pragma: no cover # never false
-                    o_domain = od
-            new_hn = "host%s.%s" % (self._hostname_count, o_domain)
-            self._hn_db[new_hn] = hn
+        new_hn = self._hn_idx.get(hn)
+        if new_hn is not None:  # the hostname is in the database
             return new_hn
+        o_domain = self._obfuscated_domain
+        for od, d in self._dn_db.items():
+            if d in hn:  # pragma: no cover # never false
+                o_domain = od
+        with self._lock:
+            new_hn = self._hn_idx.get(hn)
+            if new_hn is None:
+                # we have a new hostname, so we increment the counter to get the host ID number
+                self._hostname_count += 1
+                new_hn = "host%s.%s" % (self._hostname_count, o_domain)
+                self._hn_db[new_hn] = hn
+                self._hn_idx[hn] = new_hn
+        return new_hn
 
     def parse_line(self, line, **kwargs):
         '''
@@ -110,9 +112,19 @@ class Hostname(object):
             logger.warning(e)
             raise Exception('SubHostnameError: Unable to Substitute Hostname/Domainname')
 
+    def trigger(self, **kwargs):
+        """
+        Returns a regular expression that matches every line this cleaner
+        could change.  The domain names are searched as regular expressions
+        by `parse_line` as well.
+        """
+        return '|'.join([re.escape(self._hostname)] + ['(?:%s)' % d for d in self._dn_db.values()])
+
     def mapping(self):
         mapping = []
-        for k, v in self._hn_db.items():
+        with self._lock:
+            items = list(self._hn_db.items())
+        for k, v in items:
             mapping.append({'original': v, 'obfuscated': k})
         return mapping
 
@@ -122,7 +134,9 @@ class Hostname(object):
             logger.info('Creating Hostname Report - %s', hn_report_file)
             lines = ['Obfuscated Hostname,Original Hostname']
             if self._hostname_count > 0:
-                for k, v in self._hn_db.items():
+                with self._lock:
+                    items = list(self._hn_db.items())
+                for k, v in items:
                     lines.append('{0},{1}'.format(k, v))
             else:  # pragma: no cover # never false
                 lines.append('None,None')
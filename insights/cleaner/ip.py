@@ -18,6 +18,7 @@ import re
 import six
 import socket
 import struct
+import threading
 
 from insights.cleaner.utilities import write_report
 
@@ -27,12 +28,18 @@ logger = logging.getLogger(__name__)
 class IPv4(object):
     """
     Class for obfuscating IPv4.
+
+    The IP database is shared by the threads cleaning specs at the same time,
+    so an IP gets the same obfuscated IP in every spec.
     """
 
     def __init__(self):
         # - IP obfuscate information
         self._ip_db = dict()  # IP database
+        self._ip_idx = dict()  # reversed IP database
+        self._lock = threading.Lock()
         self._start_ip = '10.230.230.1'
+        self._next_ip = self._ip2int(self._start_ip)
         self._ignore_list = ["127.0.0.1"]
         # self.pattern = r'((?<!(\.|\d))([0-9]{1,3}\.){3}([0-9]){1,3}(\/([0-9]{1,2}))?)'
         self.pattern = r"(((\b25[0-5]|\b2[0-4][0-9]|\b1[0-9][0-9]|\b[1-9][0-9]|\b[1-9]))(\.(\b25[0-5]|\b2[0-4][0-9]|\b1[0-9][0-9]|\b[1-9][0-9]|\b[0-9])){3})"
@@ -53,22 +60,16 @@ class IPv4(object):
         {$obfuscated_ip: $original_ip,}
         '''
         ip_num = self._ip2int(ip)
-        ip_found = False
-        db = self._ip_db
-        for k, v in db.items():
-            if v == ip_num:
-                ret_ip = self._int2ip(k)
-                ip_found = True
-        if ip_found:  # the entry already existed
-            return ret_ip
-        else:  # the entry did not already exist
-            if len(self._ip_db) > 0:
-                new_ip = max(db.keys()) + 1
-            else:
-                new_ip = self._ip2int(self._start_ip)
-            db[new_ip] = ip_num
-
-            return self._int2ip(new_ip)
+        new_ip = self._ip_idx.get(ip_num)
+        if new_ip is None:
+            with self._lock:
+                new_ip = self._ip_idx.get(ip_num)
+                if new_ip is None:  # the entry did not already exist
+                    new_ip = self._next_ip
+                    self._next_ip += 1
+                    self._ip_db[new_ip] = ip_num
+                    self._ip_idx[ip_num] = new_ip
+        return self._int2ip(new_ip)
 
     def parse_line(self, line, **kwargs):
         '''
@@ -130,9 +131,18 @@ class IPv4(object):
             logger.warning(e)
             raise Exception('SubIPError: Unable to Substitute IPv4 Address - %s', ips)
 
+    def trigger(self, **kwargs):
+        """
+        Returns a regular expression that matches every line this cleaner
+        could change.
+        """
+        return r'\d\.\d'
+
     def mapping(self):
         mapping = []
-        for k, v in self._ip_db.items():
+        with self._lock:
+            items = list(self._ip_db.items())
+        for k, v in items:
             mapping.append({'original': self._int2ip(v), 'obfuscated': self._int2ip(k)})
         return mapping
 
@@ -141,7 +151,9 @@ class IPv4(object):
             ip_report_file = os.path.join(report_dir, "%s-ipv4.csv" % archive_name)
             logger.info('Creating IPv4 Report - %s', ip_report_file)
             lines = ['Obfuscated IPv4,Original IPv4']
-            for k, v in self._ip_db.items():
+            with self._lock:
+                items = list(self._ip_db.items())
+            for k, v in items:
                 lines.append('{0},{1}'.format(self._int2ip(k), self._int2ip(v)))
         except Exception as e:  # pragma: no cover
             logger.exception(e)
@@ -159,6 +171,8 @@ class IPv6(object):
 
     def __init__(self):
         self._ipv6_db = dict()  # IPv6 database
+        self._obfuscated = set()  # obfuscated IPv6 addresses
+        self._lock = threading.Lock()
         # Ignore list for IPv6
         self._ignore_list = [r'\s+']  # ignore whitespace
         # IPv6 pattern, stolen from sos
@@ -191,13 +205,17 @@ class IPv6(object):
             return ''
 
         try:
-            if ip in self._ipv6_db:
-                return self._ipv6_db[ip]
-            if ip in self._ipv6_db.values():  # pragma: no cover
+            new_ip = self._ipv6_db.get(ip)
+            if new_ip is not None:
+                return new_ip
+            if ip in self._obfuscated:  # pragma: no cover
                 # avoid nested obfuscating
                 return None
-            self._ipv6_db[ip] = ':'.join(obfuscate_hex(h) for h in ip.split(':'))
-            return self._ipv6_db[ip]
+            new_ip = ':'.join(obfuscate_hex(h) for h in ip.split(':'))
+            with self._lock:
+                self._ipv6_db[ip] = new_ip
+                self._obfuscated.add(new_ip)
+            return new_ip
         except Exception as e:  # pragma: no cover
             logger.warning(e)
             raise Exception('SubIPv6Error: Unable to Substitute IPv6 Address - %s', ip)
@@ -221,9 +239,18 @@ class IPv6(object):
             line = _sub_ip(line, ip[0])
         return line
 
+    def trigger(self, **kwargs):
+        """
+        Returns a regular expression that matches every line this cleaner
+        could change.
+        """
+        return r':'
+
     def mapping(self):
         mapping = []
-        for k, v in self._ipv6_db.items():
+        with self._lock:
+            items = list(self._ipv6_db.items())
+        for k, v in items:
             mapping.append({'original': k, 'obfuscated': v})
         return mapping
 
@@ -232,7 +259,9 @@ class IPv6(object):
             ip_report_file = os.path.join(report_dir, "%s-ipv6.csv" % archive_name)
             logger.info('Creating IPv6 Report - %s', ip_report_file)
             lines = ['Obfuscated IPv6,Original IPv6']
-            for k, v in self._ipv6_db.items():
+            with self._lock:
+                items = list(self._ipv6_db.items())
+            for k, v in items:
                 lines.append('{0},{1}'.format(v, k))
         except Exception as e:  # pragma: no cover
             logger.exception(e)
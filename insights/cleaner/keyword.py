@@ -5,6 +5,8 @@ Keyword Replacement
 
 import logging
 import os
+import re
+import threading
 
 from insights.cleaner.utilities import write_report
 
@@ -22,6 +24,7 @@ class Keyword(object):
         self._kw_db = dict()  # keyword database
         self._keywords2db(keywords)
         self._obfuscated = set()  # keywords that have been replaced
+        self._lock = threading.Lock()
 
     def _keywords2db(self, keywords):
         # processes optional keywords to add to be obfuscated
@@ -45,12 +48,23 @@ class Keyword(object):
             if k in line:
                 logger.debug("Replacing Keyword - %s > %s", k, v)
                 line = line.replace(k, v)
-                self._obfuscated.add(k)
+                if k not in self._obfuscated:
+                    with self._lock:
+                        self._obfuscated.add(k)
         return line
 
+    def trigger(self, **kwargs):
+        """
+        Returns a regular expression that matches every line this cleaner
+        could change.
+        """
+        return '|'.join(re.escape(k) for k in self._kw_db) or r'(?!)'
+
     def mapping(self):
         mapping = []
-        for k in self._obfuscated:
+        with self._lock:
+            replaced = list(self._obfuscated)
+        for k in replaced:
             mapping.append({'original': k, 'obfuscated': self._kw_db[k]})
         return mapping
 
@@ -59,7 +73,9 @@ class Keyword(object):
             kw_report_file = os.path.join(report_dir, "%s-keyword.csv" % archive_name)
             logger.info('Creating Keyword Report - %s', kw_report_file)
             lines = ['Replaced Keyword,Original Keyword']
-            for k in self._obfuscated:
+            with self._lock:
+                replaced = list(self._obfuscated)
+            for k in replaced:
                 lines.append('{0},{1}'.format(k, self._kw_db[k]))
         except Exception as e:  # pragma: no cover
             logger.exception(e)
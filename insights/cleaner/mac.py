@@ -8,6 +8,7 @@ import logging
 import os
 import re
 import six
+import threading
 
 from insights.cleaner.utilities import write_report
 
@@ -21,6 +22,8 @@ class Mac(object):
 
     def __init__(self):
         self._mac_db = dict()  # MAC database
+        self._obfuscated = set()  # obfuscated MAC addresses
+        self._lock = threading.Lock()
         # Ignore list for MAC addresses
         # - 00:00:00:00:00:00
         # - FF:FF:FF:FF:FF:FF
@@ -42,15 +45,19 @@ class Mac(object):
             return new_hex if lower else new_hex.upper()
 
         try:
-            if mac in self._mac_db:
-                return self._mac_db[mac]
-            if mac in self._mac_db.values():  # pragma: no cover
+            new_mac = self._mac_db.get(mac)
+            if new_mac is not None:
+                return new_mac
+            if mac in self._obfuscated:  # pragma: no cover
                 # avoid nested obfuscating
                 return None
             lower = not mac.isupper()
             sep = '-' if '-' in mac else ':'
-            self._mac_db[mac] = sep.join(obfuscate_hex(h, lower) for h in mac.split(sep))
-            return self._mac_db[mac]
+            new_mac = sep.join(obfuscate_hex(h, lower) for h in mac.split(sep))
+            with self._lock:
+                self._mac_db[mac] = new_mac
+                self._obfuscated.add(new_mac)
+            return new_mac
         except Exception as e:  # pragma: no cover
             logger.warning(e)
             raise Exception('SubMacError: Unable to Substitute MAC Addr - %s', mac)
@@ -74,9 +81,18 @@ class Mac(object):
 
         return line
 
+    def trigger(self, **kwargs):
+        """
+        Returns a regular expression that matches every line this cleaner
+        could change.
+        """
+        return r'[0-9a-fA-F]{2}[:-][0-9a-fA-F]{2}'
+
     def mapping(self):
         mapping = []
-        for k, v in self._mac_db.items():
+        with self._lock:
+            items = list(self._mac_db.items())
+        for k, v in items:
             mapping.append({'original': k, 'obfuscated': v})
         return mapping
 
@@ -85,7 +101,9 @@ class Mac(object):
             mac_report_file = os.path.join(report_dir, "%s-mac.csv" % archive_name)
             logger.info('Creating MAC addr Report - %s', mac_report_file)
             lines = ['Obfuscated MAC,Original MAC']
-            for k, v in self._mac_db.items():
+            with self._lock:
+                items = list(self._mac_db.items())
+            for k, v in items:
                 lines.append('{0},{1}'.format(v, k))
         except Exception as e:  # pragma: no cover
             logger.exception(e)
@@ -36,5 +36,12 @@ class Password(object):
                 break
         return line
 
+    def trigger(self, **kwargs):
+        """
+        Returns a regular expression that matches every line this cleaner
+        could change.  All the DEFAULT_PASSWORD_REGEXS start with "password".
+        """
+        return r'password'
+
     def generate_report(self, report_dir, archive_name):
         pass
@@ -30,5 +30,23 @@ class Pattern(object):
             return None
         return line
 
+    def trigger(self, **kwargs):
+        """
+        Returns a regular expression that matches every line this cleaner
+        could change, or None when it can't be told without calling
+        `parse_line`.
+        """
+        if not self._regex:
+            return '|'.join(re.escape(pat) for pat in self._exclude)
+        for pat in self._exclude:
+            try:
+                compiled = re.compile(pat)
+            except re.error:
+                return None
+            # groups or inline flags change their meaning once combined
+            if compiled.groups or compiled.flags != re.compile('').flags:
+                return None
+        return '|'.join('(?:%s)' % pat for pat in self._exclude)
+
     def generate_report(self, report_dir, archive_name):
         pass  # pragma: no cover
@@ -14,6 +14,7 @@ import logging
 import os
 import sys
 import tempfile
+import threading
 import yaml
 
 from datetime import datetime
@@ -22,7 +23,8 @@ from insights import apply_configs, apply_default_enabled, get_pool
 from insights.cleaner import Cleaner
 from insights.core import blacklist, dr, filters
 from insights.core.serde import Hydration
-from insights.core.spec_factory import SAFE_ENV
+from insights.core.spec_factory import COMMAND_CACHE, SAFE_ENV, CommandOutputProvider
+from insights.specs.datasources import PACKAGE_CACHE
 from insights.specs.manifests import manifests
 from insights.util import fs, utc
 from insights.util.hostname import determine_hostname
@@ -141,6 +143,60 @@ def get_to_persist(persisters):
     return results
 
 
+class CommandScheduler(object):
+    """
+    An observer that starts the commands of the persisted command specs in the
+    threads of a pool as soon as their datasources are evaluated, so the
+    commands of independent specs run at the same time while the other
+    components are evaluated. Persisting such a spec is deferred until its
+    commands finish, and is done by the threads that evaluate the components
+    instead of the pool.
+
+    Args:
+        pool (ThreadPoolExecutor): the pool running the commands. Its number
+            of workers bounds the number of commands running at once.
+        persister (function): the observer that persists the components.
+        to_persist (set): the components to persist.
+        timeout (int): Maximum number of seconds each command may take.
+    """
+
+    def __init__(self, pool, persister, to_persist, timeout=None):
+        self.pool = pool
+        self.persister = persister
+        self.to_persist = to_persist
+        self.timeout = timeout
+        self._deferred = []
+        self._lock = threading.Lock()
+
+    def schedule(self, value):
+        """
+        Starts the commands of the providers in ``value`` and returns their
+        futures.
+        """
+        values = value if isinstance(value, list) else [value]
+        return [v.schedule(self.pool, self.timeout) for v in values if isinstance(v, CommandOutputProvider)]
+
+    def __call__(self, component, broker):
+        futures = self.schedule(broker.get(component)) if component in self.to_persist else []
+        if futures:
+            with self._lock:
+                self._deferred.append((component, broker, futures))
+        else:
+            self.persister(component, broker)
+        self.flush(wait=False)
+
+    def flush(self, wait=True):
+        """
+        Persists the deferred components whose commands have finished, or all
+        of them if ``wait`` is True.
+        """
+        with self._lock:
+            ready = [d for d in self._deferred if wait or all(f.done() for f in d[2])]
+            self._deferred = [d for d in self._deferred if d not in ready]
+        for component, broker, _ in ready:
+            self.persister(component, broker)
+
+
 def create_archive(path, remove_path=True):
     """
     Creates a tar.gz of the path using the path basename + "tar.gz"
@@ -243,6 +299,8 @@ def collect(
     fs.ensure_path(output_path)
     fs.touch(os.path.join(output_path, "insights_archive.txt"))
 
+    COMMAND_CACHE.clear()
+    PACKAGE_CACHE.clear()
     broker = dr.Broker()
     ctx = create_context(client.get("context", {}))
     cleaner = Cleaner(client_config, black_list) if client_config else None
@@ -256,16 +314,30 @@ def collect(
     parallel = run_strategy.get("name") == "parallel"
     to_persist = get_to_persist(client.get("persist", set()))
 
-    if client_config and client_config.obfuscate and parallel:
-        log.warning("Parallel collection is not supported when 'obfuscate' is enabled")
-        parallel = False
-
     pool_args = run_strategy.get("args", {})
-    with get_pool(parallel, "insights-collector-pool", pool_args) as pool:
-        h = Hydration(output_path, ctx, pool=pool)
-        broker.add_observer(h.make_persister(to_persist))
-        dr.run_all(broker=broker, pool=pool)
-
+    scheduler_args = client.get("command_scheduler", {})
+    command_pool_args = {"max_workers": scheduler_args.get("max_workers")}
+    with get_pool(parallel, "insights-collector-pool", pool_args) as pool, \
+            get_pool(scheduler_args.get("enabled"), "insights-command-pool", command_pool_args) as command_pool:
+        h = Hydration(output_path, ctx, pool=pool, packed=client.get("packed_meta", False))
+        persister = h.make_persister(to_persist)
+        scheduler = None
+        if command_pool:
+            scheduler = CommandScheduler(command_pool, persister, to_persist, scheduler_args.get("timeout"))
+        broker.add_observer(scheduler or persister)
+        try:
+            dr.run_all(broker=broker, pool=pool)
+        finally:
+            if scheduler:
+                scheduler.flush()
+            h.close()
+
+    log.info(
+        "Resolved %d commands with %d PATH searches, saving %.3fs",
+        COMMAND_CACHE.hits + COMMAND_CACHE.misses,
+        COMMAND_CACHE.misses,
+        COMMAND_CACHE.saved_time,
+    )
     collect_errors = _parse_broker_exceptions(broker, EXCEPTIONS_TO_REPORT)
 
     cleaner.generate_report(archive_name) if cleaner else None
@@ -111,7 +111,8 @@ class StreamParser(Parser):
 
 @serializer(Parser)
 def default_parser_serializer(obj):
-    return vars(obj)
+    # the index of TextFileOutput is rebuilt from the lines when it's needed
+    return dict((k, v) for k, v in vars(obj).items() if k != '_postings')
 
 
 @deserializer(Parser)
@@ -842,6 +843,7 @@ class JSONParser(Parser, LegacyItemAccess):
 class ScanMeta(type):
     def __new__(cls, name, parents, dct):
         dct["scanners"] = dict()
+        dct["scan_tokens"] = set()
         return super(ScanMeta, cls).__new__(cls, name, parents, dct)
 
 
@@ -1023,14 +1025,171 @@ class TextFileOutput(six.with_metaclass(ScanMeta, Parser)):
 
     """
 
+    index_max_postings = 1000000
+    """
+    The maximum number of lines the index of the scanner tokens records in
+    total.  When there are more, searches scan the lines instead.
+    """
+
     def parse_content(self, content):
         """
         Use all the defined scanners to search the log file, setting the
         properties defined in the scanner.
         """
         self.lines = content
-        for scanner in self.scanners.values():
+        fused = []
+        for key, scanner in self.scanners.items():
+            if getattr(scanner, 'fused', None):
+                fused.append(key)
+                continue
+            # the scanners registered by ``scan`` run in order between the
+            # fused ones
+            self._fused_scan(fused)
+            fused = []
             scanner(self)
+        self._fused_scan(fused)
+
+    def _fused_scan(self, keys):
+        """
+        Runs the scanners of the `keys` registered by :meth:`token_scan`,
+        :meth:`keep_scan` and :meth:`last_scan` together.  One pass from the
+        head of the lines evaluates all the tokens of each line once and
+        fills every result, another pass from the tail does it for the
+        scanners looking for the last lines.  Each pass stops as soon as all
+        its scanners are satisfied.
+        """
+        if not keys:
+            return
+        if not isinstance(self.lines, list) or (
+            six.get_unbound_function(type(self).get) is not six.get_unbound_function(TextFileOutput.get)
+        ):
+            for key in keys:
+                self.scanners[key](self)
+            return
+        entries, head, tail = [], [], []
+        for key in keys:
+            kind, token, check, num, reverse = self.scanners[key].fused
+            if check not in (all, any) and not isinstance(token, six.string_types):
+                self.scanners[key](self)
+                continue
+            # raise the same errors as the scanner
+            self._valid_search(token, check)
+            if num is not None and not isinstance(num, six.integer_types):
+                raise TypeError('Required numbers must be given as a integer')
+            # the key, kind, token, check, the number of lines to find, and
+            # the lines found
+            entry = (key, kind, token, check, num if kind == 'keep' else 1, [])
+            entries.append(entry)
+            if num is not None and num <= 0:
+                continue
+            (tail if reverse and num is not None else head).append(entry)
+
+        self._fused_pass(head, range(len(self.lines)))
+        self._fused_pass(tail, range(len(self.lines) - 1, -1, -1))
+
+        tail = set(e[0] for e in tail)
+        for key, kind, token, check, num, found in entries:
+            if kind == 'token':
+                setattr(self, key, bool(found))
+                continue
+            if key in tail:
+                # re-sort to original order
+                found = found[::-1]
+            found = [self._parse_line(l) for l in found]
+            if kind == 'last':
+                setattr(self, key, found[0] if found else dict())
+            else:
+                setattr(self, key, found)
+
+    def _fused_pass(self, entries, indexes):
+        """
+        Appends the lines at the `indexes` matching each of the `entries` to
+        its lines found, until it has found enough.
+        """
+        lines = self.lines
+        pending = list(entries)
+        while pending:
+            words = set()
+            for entry in pending:
+                token = entry[2]
+                words.update([token] if isinstance(token, six.string_types) else token)
+            satisfied = False
+            for idx in indexes:
+                line = lines[idx]
+                present = [w for w in words if w in line]
+                if not present:
+                    continue
+                present = set(present)
+                for key, kind, token, check, num, found in pending:
+                    if (
+                        token in present
+                        if isinstance(token, six.string_types)
+                        else check(w in present for w in token)
+                    ):
+                        found.append(line)
+                        satisfied = satisfied or len(found) == num
+                if satisfied:
+                    break
+            if not satisfied:
+                return
+            # carry on with the unsatisfied ones after the line
+            pending = [e for e in pending if len(e[5]) != e[4]]
+            indexes = indexes[indexes.index(idx) + 1:]
+
+    def _index(self):
+        """
+        Returns the postings of the tokens of the registered scanners, i.e.
+        a dictionary of each token to the indexes of the lines containing
+        it, or None when it's over ``index_max_postings``.  It's built in one
+        pass over the lines the first time it's needed, and again only if
+        the ``lines`` are replaced.
+        """
+        lines = self.lines
+        cached = self.__dict__.get('_postings')
+        if cached and cached[0] is lines and cached[1] == len(lines):
+            return cached[2]
+        tokens = list(self.scan_tokens)
+        postings = dict((t, []) for t in tokens)
+        total = 0
+        for idx, line in enumerate(lines):
+            for t in tokens:
+                if t in line:
+                    postings[t].append(idx)
+                    total += 1
+            if total > self.index_max_postings:
+                postings = None
+                break
+        self._postings = (lines, len(lines), postings)
+        return postings
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_postings', None)
+        return state
+
+    def _indexed_search(self, s, check=all):
+        """
+        Returns the indexes of the lines matching `s` as :meth:`get` does,
+        from the index of the scanner tokens, or None when the lines have to
+        be scanned.
+        """
+        if check not in (all, any) or not isinstance(self.lines, list):
+            return None
+        words = [s] if isinstance(s, six.string_types) else s
+        if not words or not self.scan_tokens.issuperset(words):
+            return None
+        postings = self._index()
+        if postings is None:
+            return None
+        if len(words) == 1:
+            return postings[words[0]]
+        found = set(postings[words[0]])
+        for w in words[1:]:
+            if check is all:
+                found.intersection_update(postings[w])
+            else:
+                found.update(postings[w])
+        return sorted(found)
 
     def __contains__(self, s):
         """
@@ -1038,6 +1197,9 @@ class TextFileOutput(six.with_metaclass(ScanMeta, Parser)):
         strings in the given list.
         """
         search_by_expression = self._valid_search(s)
+        found = self._indexed_search(s)
+        if found is not None:
+            return bool(found)
         return any(search_by_expression(l) for l in self.lines)
 
     def _parse_line(self, line):
@@ -1086,6 +1248,11 @@ class TextFileOutput(six.with_metaclass(ScanMeta, Parser)):
             raise TypeError('Required numbers must be given as a integer')
         ret = []
         search_by_expression = self._valid_search(s, check)
+        found = self._indexed_search(s, check)
+        if found is not None:
+            if num is not None:
+                found = (found[-num:] if reverse else found[:num]) if num > 0 else []
+            return [self._parse_line(self.lines[idx]) for idx in found]
         lines = self.lines[::-1] if reverse else self.lines
         for l in lines:
             if (num is None or len(ret) < num) and search_by_expression(l):
@@ -1113,6 +1280,16 @@ class TextFileOutput(six.with_metaclass(ScanMeta, Parser)):
 
         cls.scanners.update({result_key: scanner})
 
+    @classmethod
+    def _add_scan_tokens(cls, token):
+        """
+        Adds the strings of `token` to the tokens indexed for the scanners.
+        """
+        if isinstance(token, six.string_types):
+            cls.scan_tokens.add(token)
+        elif isinstance(token, list) and all(isinstance(w, six.string_types) for w in token):
+            cls.scan_tokens.update(token)
+
     @classmethod
     def token_scan(cls, result_key, token, check=all):
         """
@@ -1131,9 +1308,14 @@ class TextFileOutput(six.with_metaclass(ScanMeta, Parser)):
 
         def _scan(self):
             search_by_expression = self._valid_search(token, check)
+            found = self._indexed_search(token, check)
+            if found is not None:
+                return bool(found)
             return any(search_by_expression(l) for l in self.lines)
 
+        cls._add_scan_tokens(token)
         cls.scan(result_key, _scan)
+        cls.scanners[result_key].fused = ('token', token, check, None, False)
 
     @classmethod
     def keep_scan(cls, result_key, token, check=all, num=None, reverse=False):
@@ -1155,7 +1337,9 @@ class TextFileOutput(six.with_metaclass(ScanMeta, Parser)):
         def _scan(self):
             return self.get(token, check=check, num=num, reverse=reverse)
 
+        cls._add_scan_tokens(token)
         cls.scan(result_key, _scan)
+        cls.scanners[result_key].fused = ('keep', token, check, num, reverse)
 
     @classmethod
     def last_scan(cls, result_key, token, check=all):
@@ -1176,7 +1360,9 @@ class TextFileOutput(six.with_metaclass(ScanMeta, Parser)):
             ret = self.get(token, check=check, num=1, reverse=True)
             return ret[0] if ret else dict()
 
+        cls._add_scan_tokens(token)
         cls.scan(result_key, _scan)
+        cls.scanners[result_key].fused = ('last', token, check, 1, True)
 
 
 class LogFileOutput(TextFileOutput):
@@ -2,9 +2,15 @@
 
 import logging
 import os
+import shutil
+import tarfile
 import tempfile
+import threading
+import zipfile
 
 from contextlib import contextmanager
+from fnmatch import fnmatchcase
+from glob import has_magic
 
 from insights.core.exceptions import InvalidContentType
 from insights.util import fs, subproc, which
@@ -66,14 +72,164 @@ class TarExtractor(object):
         return self
 
 
+class ArchiveIndex(object):
+    """
+    Indexes the members of a zip or an uncompressed tar archive without
+    extracting them. Since the members of both can be read at their offsets,
+    a member is only extracted into `tmp_dir` the first time a path or glob
+    pattern matching it is passed to :meth:`extract_matching`.
+
+    Attributes:
+        tmp_dir (str): the directory the members are extracted into.
+        files (list): the paths the regular files of the archive have in
+            `tmp_dir`, whether they're extracted yet or not.
+    """
+    content_types = ("application/zip", "application/x-tar")
+
+    def __init__(self, path, content_type, extract_dir=None):
+        if content_type not in self.content_types:
+            raise InvalidContentType(content_type)
+        self.path = path
+        self.content_type = content_type
+        self._members = {}
+        self._children = {"": set()}
+        self._extracted = set()
+        self._lock = threading.RLock()
+        if content_type == "application/zip":
+            self._archive = zipfile.ZipFile(path)
+            members = [(i.filename, i) for i in self._archive.infolist() if not i.filename.endswith("/")]
+        else:
+            self._archive = tarfile.open(path, "r:")
+            members = [(m.name, m) for m in self._archive.getmembers()
+                       if m.isreg() or m.issym() or m.islnk()]
+        for name, member in members:
+            name = self._normalize(name)
+            if name and not name.endswith("/dev/null"):
+                self._add(name, member)
+        self.tmp_dir = tempfile.mkdtemp(prefix="insights-", dir=extract_dir)
+        self.files = [os.path.join(self.tmp_dir, n) for n, m in sorted(self._members.items())
+                      if not (isinstance(m, tarfile.TarInfo) and m.issym())]
+
+    @staticmethod
+    def _normalize(name):
+        name = os.path.normpath("/" + name).lstrip("/")
+        return "" if name == "." else name
+
+    def _add(self, name, member):
+        self._members[name] = member
+        parent, child = os.path.split(name)
+        while child not in self._children.setdefault(parent, set()):
+            self._children[parent].add(child)
+            parent, child = os.path.split(parent)
+            if not child:
+                break
+
+    def _glob(self, parts):
+        paths = [""]
+        for part in parts:
+            matched = []
+            for path in paths:
+                children = self._children.get(path, ())
+                if has_magic(part):
+                    names = [c for c in children if fnmatchcase(c, part)]
+                else:
+                    names = [part] if part in children else []
+                matched.extend(os.path.join(path, n) if path else n for n in names)
+            paths = matched
+        return paths
+
+    def _destination(self, name):
+        """
+        Returns the path of the member `name` in `tmp_dir`, or None if it
+        would be written through a symlink or outside of `tmp_dir`.
+        """
+        root = os.path.realpath(self.tmp_dir)
+        parent = root
+        for part in os.path.dirname(name).split("/"):
+            if part:
+                parent = os.path.join(parent, part)
+                if os.path.islink(parent):
+                    return None
+        parent = os.path.realpath(parent)
+        if parent != root and not parent.startswith(root + os.sep):
+            return None
+        return os.path.join(self.tmp_dir, name)
+
+    def _extract(self, name):
+        if name in self._extracted:
+            return
+        self._extracted.add(name)
+        dst = self._destination(name)
+        if dst is None:
+            logger.warning("Refusing to extract %s from %s outside of %s", name, self.path, self.tmp_dir)
+            return
+        member = self._members.get(name)
+        if member is None:
+            # a directory
+            fs.ensure_path(dst)
+            return
+        fs.ensure_path(os.path.dirname(dst))
+        try:
+            if isinstance(member, zipfile.ZipInfo):
+                src = self._archive.open(member)
+            elif member.issym():
+                os.symlink(member.linkname, dst)
+                target = self._normalize(os.path.join(os.path.dirname(name), member.linkname))
+                if not os.path.isabs(member.linkname) and (target in self._members or target in self._children):
+                    self._extract(target)
+                return
+            elif member.islnk():
+                src = self._archive.extractfile(self._members[self._normalize(member.linkname)])
+            else:
+                src = self._archive.extractfile(member)
+            try:
+                with open(dst, "wb") as out:
+                    shutil.copyfileobj(src, out)
+            finally:
+                src.close()
+        except Exception as ex:
+            logger.warning("Could not extract %s from %s: %r" % (name, self.path, ex))
+
+    def extract_matching(self, path):
+        """
+        Extracts the members whose paths in `tmp_dir` match `path`, which may
+        be a glob pattern. When `path` is a directory, the members directly
+        in it are extracted.
+        """
+        rel = os.path.relpath(path, self.tmp_dir)
+        if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+            return
+        rel = self._normalize(rel)
+        with self._lock:
+            names = self._glob(rel.split("/")) if has_magic(rel) else [rel]
+            for name in names:
+                if name in self._children:
+                    self._extract(name)
+                    for child in self._children[name]:
+                        self._extract(os.path.join(name, child) if name else child)
+                elif name in self._members:
+                    self._extract(name)
+
+    def extract_all(self):
+        """ Extracts every member. """
+        with self._lock:
+            for name in list(self._members):
+                self._extract(name)
+
+    def close(self):
+        self._archive.close()
+        fs.remove(self.tmp_dir, chmod=True)
+
+
 class Extraction(object):
-    def __init__(self, tmp_dir, content_type):
+    def __init__(self, tmp_dir, content_type, archive=None):
         self.tmp_dir = tmp_dir
         self.content_type = content_type
+        self.archive = archive
 
 
 @contextmanager
-def extract(path, timeout=None, extract_dir=None, content_type=None):
+def extract(path, timeout=None, extract_dir=None, content_type=None, on_demand=False):
     """
     Extract path into a temporary directory in `extract_dir`.
 
@@ -82,8 +238,21 @@ def extract(path, timeout=None, extract_dir=None, content_type=None):
 
     If the extraction takes longer than `timeout` seconds, the temporary path
     is removed, and an exception is raised.
+
+    When `on_demand` is True and the archive is a zip or an uncompressed tar,
+    nothing is extracted up front. The yielded object has the
+    :class:`ArchiveIndex` of the archive as its `archive` attribute, which
+    extracts the members when they're located by the context created for it.
     """
     content_type = content_type or content_type_from_file(path)
+    if on_demand and content_type in ArchiveIndex.content_types:
+        index = ArchiveIndex(path, content_type, extract_dir=extract_dir)
+        try:
+            yield Extraction(index.tmp_dir, content_type, archive=index)
+        finally:
+            index.close()
+        return
+
     if content_type == "application/zip":
         extractor = ZipExtractor(timeout=timeout)
     else:
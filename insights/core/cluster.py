@@ -1,7 +1,8 @@
 #!/usr/bin/env python
 import itertools
+import logging
 import os
-from collections import defaultdict
+from collections import defaultdict, deque
 
 import pandas as pd
 
@@ -14,8 +15,23 @@ from insights.core.hydration import create_context
 from insights.specs import Specs
 
 
+log = logging.getLogger(__name__)
+
 ID_GENERATOR = itertools.count()
 
+MAX_EXTRACTIONS = 8
+"""
+The most archives that are extracted and evaluated by the workers of a pool
+at the same time. Each extraction takes the disk space of its archive, and the
+facts of each are held until they're added to the frames.
+"""
+
+FACT_CHUNK_SIZE = 10000
+"""
+The number of rows of a fact that are collected before they're added to its
+DataFrame.
+"""
+
 
 class ClusterMeta(dict):
     def __init__(self, num_members, kwargs):
@@ -53,7 +69,7 @@ def process_archives(graph, archives):
                 ctx = create_context(ex.tmp_dir)
                 broker = dr.Broker()
                 broker[ctx.__class__] = ctx
-                yield dr.run(broker=broker)
+                yield dr.run(graph, broker=broker)
         else:
             ctx = create_context(archive)
             broker = dr.Broker()
@@ -74,22 +90,103 @@ def extract_facts(brokers):
     return results
 
 
+class FactFrames(object):
+    """
+    Collects the rows of facts into a DataFrame per fact. The rows are
+    converted to DataFrames every :data:`FACT_CHUNK_SIZE` rows, so the rows of
+    all the archives are never held at once.
+    """
+    def __init__(self, chunk_size=FACT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.rows = defaultdict(list)
+        self.frames = defaultdict(list)
+
+    def add(self, facts):
+        """ Adds the rows of facts returned by :func:`extract_facts`. """
+        for k, rows in facts.items():
+            self.rows[k].extend(rows)
+            if len(self.rows[k]) >= self.chunk_size:
+                self.frames[k].append(pd.DataFrame(self.rows.pop(k)))
+
+    def finish(self):
+        """ Returns the DataFrame of each fact. """
+        results = {}
+        for k in set(self.rows) | set(self.frames):
+            frames = self.frames.pop(k, [])
+            if self.rows.get(k) or not frames:
+                frames.append(pd.DataFrame(self.rows.pop(k, [])))
+            results[k] = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True, sort=False)
+        return results
+
+
+def _process_archive_unit(unit, archive):
+    """
+    Evaluates the graph of a work unit made by :func:`insights.core.dr.make_work_unit`
+    against an archive in a worker, and returns only its facts.
+    """
+    for key, enabled in unit["enabled"].items():
+        dr.ENABLED[dr.resolve_key(key)] = enabled
+    graph = dict((dr.resolve_key(k), set(dr.resolve_key(d) for d in deps)) for k, deps in unit["graph"].items())
+    facts = extract_facts(process_archives(graph, [archive]))
+    return dict((dr.component_key(k), v) for k, v in facts.items())
+
+
+def process_archives_parallel(graph, archives, pool, max_extractions=MAX_EXTRACTIONS):
+    """
+    Extracts and evaluates the archives in the workers of ``pool``, at most
+    ``max_extractions`` at a time, and yields the facts of each archive in the
+    order of ``archives``.
+    """
+    unit = dr.make_work_unit(graph, {}, False)
+    if unit is None:
+        log.debug("Processing the archives in the main process")
+        for broker in process_archives(graph, archives):
+            yield extract_facts([broker])
+        return
+
+    pending = deque()
+    for archive in archives:
+        if len(pending) >= max_extractions:
+            yield _resolve_facts(pending.popleft().result())
+        pending.append(pool.submit(_process_archive_unit, unit, archive))
+    while pending:
+        yield _resolve_facts(pending.popleft().result())
+
+
+def _resolve_facts(facts):
+    return dict((dr.resolve_key(k), v) for k, v in facts.items())
+
+
 def process_facts(facts, meta, broker, cluster_graph):
     broker[ClusterMeta] = meta
     for k, v in facts.items():
-        broker[k] = pd.DataFrame(v)
+        broker[k] = v if isinstance(v, pd.DataFrame) else pd.DataFrame(v)
     return dr.run(cluster_graph, broker=broker)
 
 
-def process_cluster(graph, archives, broker, inventory=None):
+def process_cluster(graph, archives, broker, inventory=None, pool=None, max_extractions=MAX_EXTRACTIONS):
+    """
+    Evaluates the host components of ``graph`` against each archive, and the
+    cluster components against the facts of all of them.
+
+    When a ``concurrent.futures`` executor is passed as ``pool``, the archives
+    are extracted and evaluated by its workers, at most ``max_extractions``
+    at a time, and only the facts of each archive are sent back.
+    """
     host_graph = dict((k, v) for k, v in graph.items() if k in dr.COMPONENTS[dr.GROUPS.single])
     host_graph[machine_id] = dr.DELEGATES[machine_id].dependencies
     cluster_graph = dict((k, v) for k, v in graph.items() if k not in host_graph)
 
     inventory = parse_inventory(inventory) if inventory else {}
 
-    brokers = process_archives(host_graph, archives)
-    facts = extract_facts(brokers)
+    if pool:
+        frames = FactFrames()
+        for facts in process_archives_parallel(host_graph, archives, pool, max_extractions=max_extractions):
+            frames.add(facts)
+        facts = frames.finish()
+    else:
+        brokers = process_archives(host_graph, archives)
+        facts = extract_facts(brokers)
     meta = ClusterMeta(len(archives), inventory)
 
     return process_facts(facts, meta, broker, cluster_graph)
@@ -158,6 +158,11 @@ class ExecutionContextMeta(type):
 
 class ExecutionContext(six.with_metaclass(ExecutionContextMeta)):
     marker = None
+    archive = None
+    """
+    The :class:`insights.core.archives.ArchiveIndex` of an archive that isn't
+    extracted up front. Its members are extracted by :meth:`locate_path`.
+    """
 
     def __init__(self, root="/", timeout=None, all_files=None):
         self.root = root
@@ -223,7 +228,11 @@ class ExecutionContext(six.with_metaclass(ExecutionContextMeta)):
             yield s
 
     def locate_path(self, path):
-        return os.path.expandvars(path)
+        path = os.path.expandvars(path)
+        if self.archive is not None:
+            full = path if path.startswith(self.root) else os.path.join(self.root, path.lstrip("/"))
+            self.archive.extract_matching(full)
+        return path
 
     def __repr__(self):
         msg = "<%s('%s', %s)>"
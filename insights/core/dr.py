@@ -53,10 +53,12 @@ import inspect
 import json
 import logging
 import os
+import pickle
 import pkgutil
 import re
 import six
 import sys
+import threading
 import time
 import traceback
 
@@ -65,7 +67,7 @@ from functools import reduce as _reduce
 
 from insights.contrib.toposort import toposort_flatten
 from insights.core.blacklist import BLACKLISTED_SPECS
-from insights.core.context import SerializedArchiveContext
+from insights.core.context import ExecutionContext, SerializedArchiveContext
 from insights.core.exceptions import BlacklistedSpec, MissingRequirements, SkipComponent
 from insights.util import defaults, enum, KeyPassingDefaultDict
 
@@ -88,6 +90,10 @@ HIDDEN = set()
 IGNORE = defaultdict(set)
 ENABLED = defaultdict(lambda: True)
 
+_PLANS = {}
+_PLANS_GENERATION = 0
+_PLANS_MAX = 128
+
 
 def set_enabled(component, enabled=True):
     """
@@ -111,6 +117,7 @@ def set_enabled(component, enabled=True):
 
     if component:
         ENABLED[component] = enabled
+        invalidate_execution_plans()
 
 
 def is_enabled(component):
@@ -209,6 +216,7 @@ def get_group(component):
 
 def add_dependent(component, dep):
     DEPENDENTS[component].add(dep)
+    invalidate_execution_plans()
 
 
 def get_dependents(component):
@@ -565,6 +573,7 @@ def load_components(*paths, **kwargs):
     num_loaded = 0
     for path in paths:
         num_loaded += _load_components(path, **kwargs)
+    invalidate_execution_plans()
     return num_loaded
 
 
@@ -611,6 +620,7 @@ def _register_component(delegate):
 
     MODULE_NAMES[component] = get_module_name(component)
     BASE_MODULE_NAMES[component] = get_base_module_name(component)
+    invalidate_execution_plans()
 
 
 class ComponentType(object):
@@ -782,7 +792,7 @@ class ComponentType(object):
         Gets required and at-least-one dependencies not provided by the broker.
         """
         missing_required = [r for r in self.requires if r not in broker]
-        missing_at_least_one = [d for d in self.at_least_one if not set(d).intersection(broker)]
+        missing_at_least_one = [d for d in self.at_least_one if not any(i in broker for i in d)]
         if missing_required or missing_at_least_one:
             return (missing_required, missing_at_least_one)
 
@@ -809,6 +819,7 @@ class ComponentType(object):
 
         DEPENDENCIES[self.component].add(dep)
         COMPONENTS[group][self.component].add(dep)
+        invalidate_execution_plans()
 
 
 class Broker(object):
@@ -842,14 +853,27 @@ class Broker(object):
             the execution time here is the sum of their individual execution
             times.
         store_skips (bool): Weather to store skips in the broker or not.
+        lazy (dict): components whose instances are loaded the first time
+            they're looked up or read from the broker. Values are functions
+            that return a two-tuple of the instance and its execution time.
+            See :meth:`add_lazy`.
+        pruned (int): the number of components :func:`prune` removed from the
+            graph it pruned last for this broker.
     """
     def __init__(self, seed_broker=None):
         self.instances = dict(seed_broker.instances) if seed_broker else {}
+        self.lazy = dict(seed_broker.lazy) if seed_broker else {}
+        self._lazy_lock = threading.Lock()
+        # the instances of each component type, kept in step with instances
+        self._by_type = defaultdict(dict)
+        for k, v in self.instances.items():
+            self._by_type[get_component_type(k)][k] = v
         self.missing_requirements = {}
         self.exceptions = defaultdict(list)
         self.tracebacks = {}
         self.exec_times = {}
         self.store_skips = False
+        self.pruned = 0
 
         self.observers = defaultdict(set)
         if seed_broker is not None:
@@ -859,6 +883,19 @@ class Broker(object):
             for k, v in TYPE_OBSERVERS.items():
                 self.observers[k] |= set(v)
 
+    @property
+    def observers(self):
+        """
+        The callbacks of each component type. Use :meth:`add_observer` to
+        add one so the dispatch table of :meth:`fire_observers` is updated.
+        """
+        return self._observers
+
+    @observers.setter
+    def observers(self, value):
+        self._observers = value
+        self._dispatch = {}
+
     def observer(self, component_type=ComponentType):
         """
         You can use ``@broker.observer()`` as a decorator to your callback
@@ -892,19 +929,23 @@ class Broker(object):
         """
 
         self.observers[component_type].add(o)
+        self._dispatch = {}
 
     def fire_observers(self, component):
         _type = get_component_type(component)
         if not _type:
             return
 
-        for k, v in self.observers.items():
-            if issubclass(_type, k):
-                for o in v:
-                    try:
-                        o(component, self)
-                    except Exception as e:
-                        log.exception(e)
+        observers = self._dispatch.get(_type)
+        if observers is None:
+            observers = [o for k, v in self.observers.items() if issubclass(_type, k) for o in v]
+            self._dispatch[_type] = observers
+
+        for o in observers:
+            try:
+                o(component, self)
+            except Exception as e:
+                log.exception(e)
 
     def add_exception(self, component, ex, tb=None):
         if isinstance(ex, MissingRequirements):
@@ -913,44 +954,96 @@ class Broker(object):
             self.exceptions[component].append(ex)
             self.tracebacks[ex] = tb
 
+    def __getstate__(self):
+        self._load_all()
+        state = self.__dict__.copy()
+        del state["_lazy_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lazy_lock = threading.Lock()
+
+    def add_lazy(self, component, load):
+        """
+        Registers a component whose instance is loaded by calling ``load`` the
+        first time the component is looked up or read from the broker.
+        ``load`` must return a two-tuple of the instance and its execution
+        time. Like with any other component, a falsy instance isn't added to
+        the broker, and if ``load`` raises an exception, the component isn't
+        in the broker.
+        """
+        if component in self.instances:
+            raise KeyError("Already exists in broker with key: %s" % get_name(component))
+        self.lazy[component] = load
+
+    def _load(self, component):
+        with self._lazy_lock:
+            load = self.lazy.get(component)
+            if load is None:
+                return
+            try:
+                value, exec_time = load()
+            except Exception as ex:
+                log.debug("Could not load %s: %r" % (get_name(component), ex))
+                value = None
+            if value:
+                self.instances[component] = value
+                self._by_type[get_component_type(component)][component] = value
+                self.exec_times[component] = exec_time
+            # popped once it's loaded, so a concurrent lookup waits for it
+            del self.lazy[component]
+
+    def _load_all(self):
+        for comp in list(self.lazy):
+            self._load(comp)
+
     def __iter__(self):
+        self._load_all()
         return iter(self.instances)
 
     def keys(self):
+        self._load_all()
         return self.instances.keys()
 
     def items(self):
+        self._load_all()
         return self.instances.items()
 
     def values(self):
+        self._load_all()
         return self.instances.values()
 
     def get_by_type(self, _type):
         """
         Return all of the instances of :class:`ComponentType` ``_type``.
         """
-        r = {}
-        for k, v in self.items():
-            if get_component_type(k) is _type:
-                r[k] = v
-        return r
+        self._load_all()
+        return dict(self._by_type.get(_type, {}))
 
     def __contains__(self, component):
+        if component in self.lazy:
+            self._load(component)
         return component in self.instances
 
     def __setitem__(self, component, instance):
         msg = "Already exists in broker with key: %s"
-        if component in self.instances:
+        if component in self:
             raise KeyError(msg % get_name(component))
 
         self.instances[component] = instance
+        self._by_type[get_component_type(component)][component] = instance
 
     def __delitem__(self, component):
+        self.lazy.pop(component, None)
         if component in self.instances:
             del self.instances[component]
+            self._by_type[get_component_type(component)].pop(component, None)
             return
 
     def __getitem__(self, component):
+        if component in self.lazy:
+            self._load(component)
         if component in self.instances:
             return self.instances[component]
 
@@ -1054,24 +1147,223 @@ def determine_components(components):
 _determine_components = determine_components
 
 
-def run_components(ordered_components, components, broker):
+class ExecutionPlan(object):
+    """
+    An ExecutionPlan is a dependency graph compiled for evaluation. It holds
+    the order in which the components must be tried along with the delegates
+    of the components, so repeated evaluations of the same components don't
+    have to build the graph and sort it again. Plans for the components
+    passed to :func:`run`, :func:`run_incremental`, and :func:`run_all` are
+    cached by :func:`get_execution_plan`.
+
+    Whether a component is enabled is checked at evaluation time since
+    :data:`ENABLED` may be updated directly.
+
+    Attributes:
+        graph (dict): the dependency graph of the plan.
+        order (list): the components of the graph in an order that satisfies
+            their dependency relationships.
+        delegates (dict): the :class:`ComponentType` of each component in the
+            graph that has one.
+    """
+    def __init__(self, graph):
+        self.graph = dict((k, set(v)) for k, v in graph.items())
+        self.order = run_order(self.graph)
+        self.delegates = dict((c, DELEGATES[c]) for c in self.order if c in DELEGATES)
+        self._registry_points = {}
+        self._subgraphs = None
+
+    def get_registry_points(self, component):
+        """
+        Memoized :func:`get_registry_points` for the components of the plan.
+        """
+        try:
+            return self._registry_points[component]
+        except KeyError:
+            pass
+        reg_points = get_registry_points(component)
+        self._registry_points[component] = reg_points
+        return reg_points
+
+    @property
+    def subgraphs(self):
+        """
+        The plans of the disjoint subgraphs of this plan in the order
+        :func:`get_subgraphs` yields them.
+        """
+        if self._subgraphs is None:
+            self._subgraphs = [ExecutionPlan(g) for g in get_subgraphs(self.graph)]
+        return self._subgraphs
+
+    def run(self, broker=None):
+        """
+        Evaluates the plan.
+
+        Args:
+            broker (Broker): Optionally pass a broker to use for evaluation.
+
+        Returns:
+            Broker: The broker after evaluation.
+        """
+        broker = broker or Broker()
+        components = self.graph
+        # If a SerializedArchiveContext then data found in the archive's
+        # ./meta_data directory are prepopulated in the broker as Specs so
+        # no need to collect them again
+        if broker.get(SerializedArchiveContext) is not None:
+            components = dict(components)
+            for comp in list(components):
+                if comp in broker:
+                    for dep in self.graph[comp]:
+                        components.pop(dep, None)
+        return run_components(self.order, components, broker, plan=self)
+
+
+def invalidate_execution_plans():
+    """
+    Drops all cached execution plans. This is called whenever components are
+    registered, loaded, or enabled.
+    """
+    global _PLANS_GENERATION
+    _PLANS_GENERATION += 1
+    _PLANS.clear()
+
+
+def _plan_key(components):
+    if isinstance(components, dict):
+        return ("graph", frozenset(components))
+    if isinstance(components, (list, set)):
+        return ("list", frozenset(components))
+    if hashable(components):
+        return ("one", components)
+
+
+def get_execution_plan(components=None):
+    """
+    Returns the :class:`ExecutionPlan` for ``components``. Plans are cached
+    until the registered components change.
+
+    Keyword Args:
+        components: Can be one of a dependency graph, a single component, a
+            list of components, a component group, or a component type.
+            Defaults to the ``GROUPS.single`` group.
+    Returns:
+        ExecutionPlan: the plan for the components.
+    """
+    components = components or COMPONENTS[GROUPS.single]
+    if isinstance(components, ExecutionPlan):
+        return components
+
+    # a registry that was replaced instead of updated must not hit the cache
+    key = (_plan_key(components), id(COMPONENTS), id(DEPENDENCIES), id(DELEGATES), id(COMPONENTS_BY_TYPE))
+    plan = _PLANS.get(key) if key[0] is not None else None
+    if plan is not None:
+        if not isinstance(components, dict) or plan.graph == components:
+            return plan
+
+    generation = _PLANS_GENERATION
+    plan = ExecutionPlan(determine_components(components))
+    if key[0] is not None and generation == _PLANS_GENERATION:
+        if len(_PLANS) >= _PLANS_MAX:
+            _PLANS.clear()
+        _PLANS[key] = plan
+    return plan
+
+
+def _has_context(broker):
+    # lazily loaded components are never contexts, so don't load them here.
+    for comp in broker.instances:
+        if inspect.isclass(comp) and issubclass(comp, ExecutionContext):
+            return True
+    return False
+
+
+def prune(components=None, broker=None, targets=None):
+    """
+    Removes the components that can't fire during an evaluation with
+    ``broker`` from a dependency graph. A component can fire if it's already
+    in the broker, or if it's registered, enabled, and all of its required
+    dependencies and at least one of each of its "at least one" dependencies
+    can fire. Working backwards from ``targets``, only the components that
+    can fire and that something kept depends on are retained. The targets
+    themselves are always retained so their missing requirements are still
+    reported. The number of components removed is recorded in the
+    ``pruned`` attribute of the broker.
+
+    Nothing is pruned unless the broker already holds an
+    :class:`insights.core.context.ExecutionContext`, since the components
+    that can fire depend on it.
+
+    Keyword Args:
+        components: Can be one of a dependency graph, a single component, a
+            component group, or a component type.
+        broker (Broker): the broker that will be used for the evaluation.
+        targets (list): the components whose results are wanted. Defaults to
+            the components of the graph that nothing else in it depends on.
+    Returns:
+        dict: the pruned dependency graph.
+    """
+    plan = get_execution_plan(components)
+    graph = plan.graph
+    if broker is None or not _has_context(broker):
+        return dict(graph)
+
+    can_fire = set()
+    for comp in plan.order:
+        if comp in broker:
+            can_fire.add(comp)
+            continue
+        delegate = plan.delegates.get(comp)
+        if delegate is None or not is_enabled(comp):
+            continue
+        if (all(r in can_fire for r in delegate.requires) and
+                all(can_fire.intersection(alo) for alo in delegate.at_least_one)):
+            can_fire.add(comp)
+
+    if targets is None:
+        needed = set()
+        for deps in graph.values():
+            needed |= deps
+        targets = [c for c in graph if c not in needed]
+
+    keep = set()
+    frontier = [t for t in targets if t in graph]
+    keep.update(frontier)
+    while frontier:
+        comp = frontier.pop()
+        for dep in graph[comp]:
+            if dep not in keep and dep in can_fire and dep in graph:
+                keep.add(dep)
+                frontier.append(dep)
+
+    pruned = dict((c, graph[c] & keep) for c in plan.order if c in keep)
+    broker.pruned = len(graph) - len(pruned)
+    log.info("Pruned %d of %d components", broker.pruned, len(graph))
+    return pruned
+
+
+def run_components(ordered_components, components, broker, plan=None):
     """
     Runs a list of preordered components using the provided broker.
 
     This function allows callers to order components themselves and cache the
-    result so they don't incur the toposort overhead on every run.
+    result so they don't incur the toposort overhead on every run. If an
+    :class:`ExecutionPlan` is passed, its delegates and registry points are
+    used.
     """
+    delegates = plan.delegates if plan is not None else DELEGATES
+    registry_points = plan.get_registry_points if plan is not None else get_registry_points
     for component in ordered_components:
         start = time.time()
         try:
             if (component not in broker and component in components and
-               component in DELEGATES and
+               component in delegates and
                is_enabled(component)):
                 log.info("Trying %s" % get_name(component))
-                result = DELEGATES[component].process(broker)
+                result = delegates[component].process(broker)
                 broker[component] = result
         except BlacklistedSpec as bs:
-            for x in get_registry_points(component):
+            for x in registry_points(component):
                 BLACKLISTED_SPECS.append(str(x).split('.')[-1])
             broker.add_exception(component, bs, traceback.format_exc())
         except MissingRequirements as mr:
@@ -1090,7 +1382,7 @@ def run_components(ordered_components, components, broker):
             log.debug(ex)
             tb = traceback.format_exc()
             broker.add_exception(component, ex, tb)
-            for reg_spec in get_registry_points(component):
+            for reg_spec in registry_points(component):
                 broker.add_exception(reg_spec, ex, tb)
         finally:
             broker.exec_times[component] = time.time() - start
@@ -1106,34 +1398,26 @@ def run(components=None, broker=None):
 
     Keyword Args:
         components: Can be one of a dependency graph, a single component, a
-            component group, or a component type. If it's anything other than a
-            dependency graph, the appropriate graph is built for you and before
-            evaluation.
+            component group, a component type, or an :class:`ExecutionPlan`.
+            If it's anything other than a plan, the cached plan for the
+            components is used or built before evaluation.
         broker (Broker): Optionally pass a broker to use for evaluation. One is
             created by default, but it's often useful to seed a broker with an
             initial dependency.
     Returns:
         Broker: The broker after evaluation.
     """
-    components = components or COMPONENTS[GROUPS.single]
-    components = determine_components(components)
-    broker = broker or Broker()
-    # If a SerializedArchiveContext then data found in the archive's
-    # ./meta_data directory are prepopulated in the broker as Specs so
-    # no need to collect them again
-    if broker.get(SerializedArchiveContext) is not None:
-        for comp in list(components):
-            if comp in broker:
-                for dep in components[comp]:
-                    components.pop(dep, None)
-    return run_components(run_order(components), components, broker)
+    return get_execution_plan(components).run(broker)
+
+
+def _generate_plans(components=None, broker=None):
+    for plan in get_execution_plan(components).subgraphs:
+        yield plan, broker or Broker()
 
 
 def generate_incremental(components=None, broker=None):
-    components = components or COMPONENTS[GROUPS.single]
-    components = determine_components(components)
-    for graph in get_subgraphs(components):
-        yield graph, broker or Broker()
+    for plan, _broker in _generate_plans(components, broker):
+        yield plan.graph, _broker
 
 
 def run_incremental(components=None, broker=None):
@@ -1155,15 +1439,264 @@ def run_incremental(components=None, broker=None):
     Yields:
         Broker: the broker used to evaluate each subgraph.
     """
-    for graph, _broker in generate_incremental(components, broker):
-        yield run(graph, broker=_broker)
+    for plan, _broker in _generate_plans(components, broker):
+        yield plan.run(_broker)
+
+
+def _is_process_pool(pool):
+    try:
+        from concurrent.futures import ProcessPoolExecutor
+    except ImportError:
+        return False
+    return isinstance(pool, ProcessPoolExecutor)
+
+
+def _dumps(value):
+    """
+    Returns the pickled value or None if it can't be pickled.
+    """
+    try:
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return None
+
+
+def component_key(component):
+    """
+    Returns a picklable key that identifies ``component`` in another process
+    or None if the component can't be found again by its name. The key is
+    turned back into the component by :func:`resolve_key`.
+    """
+    if isinstance(component, six.string_types):
+        return ("str", component)
+    name = get_name(component)
+    if get_component(name) is component:
+        return ("name", name)
+
+
+def resolve_key(key):
+    """
+    Returns the component identified by a key made by :func:`component_key`.
+    """
+    kind, name = key
+    return name if kind == "str" else get_component(name)
+
+
+def _display_key(component):
+    # keys of components that only show up in reports don't need to resolve
+    # back to the original object.
+    return component_key(component) or ("str", get_name(component))
+
+
+def _make_seed(broker):
+    """
+    Pickles the instances of ``broker`` once so they can seed every work
+    unit. Instances that can't be pickled are left out.
+    """
+    seed = {}
+    for comp, value in broker.items():
+        key = component_key(comp)
+        data = _dumps(value) if key is not None else None
+        if data is None:
+            log.debug("Not seeding worker brokers with %s" % get_name(comp))
+            continue
+        seed[key] = data
+    return seed
+
+
+def make_work_unit(graph, seed, store_skips):
+    """
+    Creates a picklable description of the evaluation of ``graph`` in
+    another process, like the ones :func:`run_all` sends to the workers of a
+    process pool. The components are identified by the keys of
+    :func:`component_key`.
+
+    Args:
+        graph (dict): the dependency graph to evaluate.
+        seed (dict): the pickled instances to seed the broker of the worker
+            with, by the keys of their components.
+        store_skips (bool): whether the worker stores skips in its broker.
+
+    Returns:
+        dict: the work unit, or None if any component of the graph can't be
+        identified by name in another process.
+    """
+    keys = {}
+    for comp, deps in graph.items():
+        for c in [comp] + list(deps):
+            if c not in keys:
+                key = component_key(c)
+                if key is None:
+                    return None
+                keys[c] = key
+
+    return {
+        "graph": dict((keys[c], [keys[d] for d in deps]) for c, deps in graph.items()),
+        "enabled": dict((k, is_enabled(c)) for c, k in keys.items()),
+        "seed": seed,
+        "store_skips": store_skips,
+    }
+
+
+def _run_work_unit(unit):
+    """
+    Evaluates a work unit created by :func:`make_work_unit` in a worker
+    process and returns the results in a picklable form. Observers aren't
+    fired here. The parent fires them once the results are merged.
+    """
+    broker = Broker()
+    broker.observers = defaultdict(set)
+    broker.store_skips = unit["store_skips"]
+    for key, data in unit["seed"].items():
+        broker[resolve_key(key)] = pickle.loads(data)
+    seeded = set(broker.instances)
+
+    for key, enabled in unit["enabled"].items():
+        ENABLED[resolve_key(key)] = enabled
+
+    observed = []
+    broker.add_observer(lambda c, b: observed.append(c))
+
+    graph = {}
+    for key, deps in unit["graph"].items():
+        graph[resolve_key(key)] = set(resolve_key(d) for d in deps)
+
+    num_blacklisted = len(BLACKLISTED_SPECS)
+    run(graph, broker=broker)
+
+    instances = {}
+    exceptions = defaultdict(list)
+    for comp, value in broker.items():
+        if comp in seeded:
+            continue
+        key = component_key(comp)
+        if key is None:
+            continue
+        data = _dumps(value)
+        if data is None:
+            ex = TypeError("Result of %s can't be sent from the worker process." % get_name(comp))
+            exceptions[key].append((ex, None))
+        else:
+            instances[key] = data
+
+    for comp, exs in broker.exceptions.items():
+        key = component_key(comp)
+        if key is None:
+            continue
+        for ex in exs:
+            tb = broker.tracebacks.get(ex)
+            if _dumps(ex) is None:
+                ex = Exception("%s: %s" % (type(ex).__name__, ex))
+            exceptions[key].append((ex, tb))
+
+    missing = {}
+    for comp, (req_all, req_any) in broker.missing_requirements.items():
+        key = component_key(comp)
+        if key is not None:
+            missing[key] = ([_display_key(r) for r in req_all],
+                            [[_display_key(r) for r in any_list] for any_list in req_any])
+
+    exec_times = {}
+    for comp, t in broker.exec_times.items():
+        key = component_key(comp)
+        if key is not None:
+            exec_times[key] = t
+
+    return {
+        "instances": instances,
+        "exceptions": dict(exceptions),
+        "missing": missing,
+        "exec_times": exec_times,
+        "observed": [k for k in (component_key(c) for c in observed) if k is not None],
+        "blacklisted": BLACKLISTED_SPECS[num_blacklisted:],
+    }
+
+
+def _merge_work_result(result, broker):
+    """
+    Merges the results of :func:`_run_work_unit` into ``broker`` and fires
+    its observers in the order the worker executed the components.
+    """
+    for key, data in result["instances"].items():
+        comp = resolve_key(key)
+        if comp not in broker:
+            broker[comp] = pickle.loads(data)
+
+    for key, t in result["exec_times"].items():
+        broker.exec_times[resolve_key(key)] = t
+
+    for key, (req_all, req_any) in result["missing"].items():
+        broker.missing_requirements[resolve_key(key)] = (
+            [resolve_key(r) for r in req_all],
+            [[resolve_key(r) for r in any_list] for any_list in req_any],
+        )
+
+    for key, exs in result["exceptions"].items():
+        comp = resolve_key(key)
+        for ex, tb in exs:
+            broker.add_exception(comp, ex, tb)
+
+    BLACKLISTED_SPECS.extend(result["blacklisted"])
+
+    for key in result["observed"]:
+        broker.fire_observers(resolve_key(key))
+    return broker
+
+
+def _run_all_processes(components, broker, pool):
+    seed = _make_seed(broker) if broker is not None else {}
+    store_skips = broker.store_skips if broker is not None else False
+
+    jobs = []
+    for plan, _broker in _generate_plans(components, broker):
+        unit = make_work_unit(plan.graph, seed, store_skips)
+        if unit is None:
+            # Components that can't be looked up by name in the worker are
+            # evaluated here while the pool works on the other subgraphs.
+            log.debug("Running subgraph of %d components in the main process" % len(plan.graph))
+            jobs.append((None, plan, _broker))
+        else:
+            jobs.append((pool.submit(_run_work_unit, unit), plan, _broker))
+
+    results = []
+    for future, plan, _broker in jobs:
+        if future is None:
+            plan.run(_broker)
+        else:
+            _merge_work_result(future.result(), _broker)
+        results.append(_broker)
+    return results
 
 
 def run_all(components=None, broker=None, pool=None):
+    """
+    Executes the disjoint subgraphs of the components and returns the brokers
+    used to evaluate them.
+
+    If ``pool`` is a ``ThreadPoolExecutor``, the subgraphs are evaluated in
+    its threads. If it's a ``ProcessPoolExecutor``, each subgraph is sent to a
+    worker process by component name along with the picklable instances of
+    ``broker``, and the instances, exceptions, tracebacks, and execution times
+    produced by the worker are merged back. Observers are fired in the calling
+    process after a subgraph's results are merged. Subgraphs that contain
+    components that can't be looked up by name are evaluated in the calling
+    process, and results that can't be pickled are recorded as exceptions.
+
+    Keyword Args:
+        components: Can be one of a dependency graph, a single component, a
+            component group, or a component type.
+        broker (Broker): Optionally pass a broker to use for evaluation. If
+            given, the results of every subgraph are collected in it.
+        pool: Optionally pass a ``concurrent.futures`` executor.
+    Returns:
+        list: the brokers used to evaluate each subgraph.
+    """
     if pool:
+        if _is_process_pool(pool):
+            return _run_all_processes(components, broker, pool)
         futures = []
-        for graph, _broker in generate_incremental(components, broker):
-            futures.append(pool.submit(run, graph, _broker))
+        for plan, _broker in _generate_plans(components, broker):
+            futures.append(pool.submit(plan.run, _broker))
         return [f.result() for f in futures]
     else:
         return list(run_incremental(components=components, broker=broker))
@@ -75,6 +75,7 @@ class Evaluator(Formatter):
         return result
 
     def process(self, graph=None, parallel=False):
+        graph = dr.prune(graph or dr.COMPONENTS[dr.GROUPS.single], self.broker)
         with self:
             if self.incremental:
                 self.run_incremental(graph, parallel)
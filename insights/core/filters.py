@@ -44,10 +44,12 @@ import yaml as ser
 from collections import defaultdict
 
 import insights
+from insights.cleaner.filters import AllowMatcher
 from insights.core import dr, plugins
 from insights.util import parse_bool
 
 _CACHE = {}
+_MATCHERS = {}
 FILTERS = defaultdict(dict)
 ENABLED = parse_bool(os.environ.get("INSIGHTS_FILTERS_ENABLED"), default=True)
 MAX_MATCH = 10000
@@ -90,6 +92,7 @@ def add_filter(component, patterns, max_match=MAX_MATCH):
     def inner(comp, patterns):
         if comp in _CACHE:
             del _CACHE[comp]
+        _MATCHERS.pop(comp, None)
 
         if not isinstance(patterns, (six.string_types, list, set)):
             raise TypeError("Filter patterns must be of type string, list, or set.")
@@ -193,6 +196,26 @@ def get_filters(component, with_matches=False):
     return _CACHE[component] if with_matches else set(_CACHE[component].keys())
 
 
+def get_matcher(component):
+    """
+    Get the :class:`insights.cleaner.filters.AllowMatcher` of the filters of
+    the given datasource.  It's built once and cached along with the
+    filters.
+
+    Args:
+        component (a datasource): The target datasource
+
+    Returns:
+        (AllowMatcher): the matcher of the filters returned by
+                        ``get_filters(component, True)``.
+    """
+    filters = get_filters(component, True)
+    matcher = _MATCHERS.get(component)
+    if matcher is None or matcher.allowlist is not filters:
+        matcher = _MATCHERS[component] = AllowMatcher(filters)
+    return matcher
+
+
 def apply_filters(target, lines):
     """
     Applys filters to the lines of a datasource. This function is used only in
@@ -32,6 +32,70 @@ else:
                     yield full_path
 
 
+PROBE_DEPTH = 3
+"""
+How many levels of directories below the top of an archive are probed for
+the markers of contexts by :func:`probe`.
+"""
+
+
+def _has_files(path):
+    # whether the files of get_all_files would include something in path
+    if os.path.islink(path):
+        return False
+    if os.path.isfile(path):
+        return True
+    for root, _, files in os.walk(path):
+        if any(os.path.isfile(os.path.join(root, f)) and not os.path.islink(os.path.join(root, f))
+               for f in files):
+            return True
+    return False
+
+
+def probe(path, depth=PROBE_DEPTH):
+    """
+    Identifies the context of the directory at ``path`` by looking for the
+    markers of contexts in the top ``depth`` levels of directories only,
+    instead of in the paths of all of its files.
+
+    Like :meth:`insights.core.context.ExecutionContextMeta.identify`, the
+    contexts are tried in reverse order of registration, and the marker that's
+    closest to ``path`` is used.
+
+    Returns:
+        tuple: the root and the class of the context, or ``(None, None)`` if
+        no marker is found.
+    """
+    markers = {}
+    for ctx in ExecutionContextMeta.registry:
+        if ctx.marker:
+            markers.setdefault(ctx.marker.strip(os.sep).split(os.sep)[0], []).append(ctx)
+
+    found = {}
+    level = [path]
+    for _ in range(depth + 1):
+        next_level = []
+        for d in level:
+            try:
+                names = sorted(os.listdir(d))
+            except OSError as ex:
+                log.debug(ex)
+                continue
+            for name in names:
+                full_path = os.path.join(d, name)
+                for ctx in markers.get(name, []):
+                    if ctx not in found and _has_files(os.path.join(d, ctx.marker.strip(os.sep))):
+                        found[ctx] = d
+                if os.path.isdir(full_path) and not os.path.islink(full_path):
+                    next_level.append(full_path)
+        level = next_level
+
+    for ctx in reversed(ExecutionContextMeta.registry):
+        if ctx in found:
+            return found[ctx], ctx
+    return None, None
+
+
 def identify(files):
     common_path, ctx = ExecutionContextMeta.identify(files)
     if ctx:
@@ -44,7 +108,38 @@ def identify(files):
     return common_path, HostArchiveContext
 
 
-def create_context(path, context=None):
+def _create_archive_context(archive, context=None):
+    # the context is identified by the members of the archive alone
+    top = [f for f in archive.files if os.path.dirname(f) == archive.tmp_dir]
+    arc = [f for f in top if f.endswith(archives.COMPRESSION_TYPES)]
+    if arc:
+        for f in arc:
+            archive.extract_matching(f)
+        return ClusterArchiveContext(archive.tmp_dir, all_files=arc)
+
+    if not archive.files:
+        raise InvalidArchive("No files in archive")
+
+    common_path, ctx = identify(archive.files)
+    context = context or ctx
+    ctx = context(common_path, all_files=archive.files)
+    if isinstance(ctx, SerializedArchiveContext):
+        # the metadata and data of components are read from the files
+        archive.extract_all()
+    else:
+        ctx.archive = archive
+    return ctx
+
+
+def create_context(path, context=None, archive=None):
+    """
+    Creates the context of the directory at ``path``. When ``archive``, an
+    :class:`insights.core.archives.ArchiveIndex`, is passed, ``path`` is the
+    directory its members are extracted into on demand.
+    """
+    if archive is not None:
+        return _create_archive_context(archive, context=context)
+
     top = os.listdir(path)
     arc = [os.path.join(path, f) for f in top
            if f.endswith(archives.COMPRESSION_TYPES) and
@@ -56,19 +151,34 @@ def create_context(path, context=None):
     if not all_files:
         raise InvalidArchive("No files in archive")
 
-    common_path, ctx = identify(all_files)
+    # the markers are looked for near the top first, the paths of all the
+    # files are only matched when none is there
+    common_path, ctx = probe(path)
+    if not ctx:
+        common_path, ctx = identify(all_files)
     context = context or ctx
     return context(common_path, all_files=all_files)
 
 
-def initialize_broker(path, context=None, broker=None):
-    ctx = create_context(path, context=context)
+def initialize_broker(path, context=None, broker=None, lazy=False, pool=None, archive=None):
+    """
+    Creates the context of the archive or directory at ``path`` and adds it
+    to ``broker``, which is created if it isn't passed. The components of a
+    serialized archive are hydrated into the broker. When ``lazy`` is True,
+    each of them is only loaded the first time it's looked up in the broker.
+    Otherwise, the metadata of the components is read by ``pool`` if it's
+    passed. ``archive`` is passed to :func:`create_context`.
+
+    Returns:
+        tuple: the context and the broker.
+    """
+    ctx = create_context(path, context=context, archive=archive)
     broker = broker or dr.Broker()
     if isinstance(ctx, ClusterArchiveContext):
         return ctx, broker
 
     broker[ctx.__class__] = ctx
     if isinstance(ctx, SerializedArchiveContext):
-        h = Hydration(root=ctx.root, ctx=ctx)
-        broker = h.hydrate(broker=broker)
+        h = Hydration(root=ctx.root, ctx=ctx, pool=pool)
+        broker = h.hydrate(broker=broker, lazy=lazy)
     return ctx, broker
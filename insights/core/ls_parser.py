@@ -4,6 +4,21 @@ output when selinux is enabled or disabled and also skip "bad" lines.
 """
 
 import re
+import six
+import sys
+import threading
+
+try:
+    from collections.abc import ItemsView, KeysView, ValuesView
+except ImportError:  # pragma: no cover
+    from collections import ItemsView, KeysView, ValuesView
+
+# intern was a builtin until it moved to sys in python3
+try:
+    _intern = sys.intern
+except AttributeError:  # pragma: no cover
+    def _intern(s):
+        return intern(s) if type(s) is str else s  # noqa: F821
 
 
 def parse_path(path):
@@ -21,6 +36,15 @@ def parse_path(path):
     return path, link
 
 
+def _parse_selinux_context(context, result):
+    selinux = context.split(":")
+    lsel = len(selinux)
+    result["se_user"] = _intern(selinux[0])
+    result["se_role"] = _intern(selinux[1]) if lsel > 1 else None
+    result["se_type"] = _intern(selinux[2]) if lsel > 2 else None
+    result["se_mls"] = _intern(selinux[3]) if lsel > 3 else None
+
+
 def parse_non_selinux(parts):
     """
     Parse part of an ls output line that isn't selinux.
@@ -39,8 +63,8 @@ def parse_non_selinux(parts):
     links, owner, group, last = parts
     result = {
         "links": int(links),
-        "owner": owner,
-        "group": group,
+        "owner": _intern(owner),
+        "group": _intern(group),
     }
 
     # device numbers only go to 256.
@@ -55,7 +79,7 @@ def parse_non_selinux(parts):
         result["size"] = int(size)
 
     # The date part is always 12 characters regardless of content.
-    result["date"] = rest[:12]
+    result["date"] = _intern(rest[:12])
 
     # Jump over the date and the following space to get the path part.
     path, link = parse_path(rest[13:])
@@ -82,18 +106,13 @@ def parse_selinux(parts):
     """
 
     owner, group = parts[:2]
-    selinux = parts[2].split(":")
-    lsel = len(selinux)
     path, link = parse_path(parts[-1])
     result = {
-        "owner": owner,
-        "group": group,
-        "se_user": selinux[0],
-        "se_role": selinux[1] if lsel > 1 else None,
-        "se_type": selinux[2] if lsel > 2 else None,
-        "se_mls": selinux[3] if lsel > 3 else None,
-        "name": path,
+        "owner": _intern(owner),
+        "group": _intern(group),
     }
+    _parse_selinux_context(parts[2], result)
+    result["name"] = path
     if link:
         result["link"] = link
     return result
@@ -118,12 +137,10 @@ def parse_rhel8_selinux(parts):
     links, owner, group, last = parts
     result = {
         "links": int(links),
-        "owner": owner,
-        "group": group,
+        "owner": _intern(owner),
+        "group": _intern(group),
     }
-    selinux, last = parts[-1].split(None, 1)
-    selinux = selinux.split(":")
-    lsel = len(selinux)
+    selinux, last = last.split(None, 1)
     if "," in last:
         major, minor, last = last.split(None, 2)
         result['major'] = int(major.rstrip(","))
@@ -131,23 +148,118 @@ def parse_rhel8_selinux(parts):
     else:
         size, last = last.split(None, 1)
         result['size'] = int(size)
-    date = last[:12]
     path, link = parse_path(last[13:])
-    result.update(
-        {
-            "se_user": selinux[0],
-            "se_role": selinux[1] if lsel > 1 else None,
-            "se_type": selinux[2] if lsel > 2 else None,
-            "se_mls": selinux[3] if lsel > 3 else None,
-            "name": path,
-            "date": date,
-        }
-    )
+    _parse_selinux_context(selinux, result)
+    result["name"] = path
+    result["date"] = _intern(last[:12])
     if link:
         result["link"] = link
     return result
 
 
+class Entry(dict):
+    """
+    The dictionary of the fields of an entry of a directory listing.
+
+    The strings repeated across the entries, e.g. the owner, the group, the
+    date and the SELinux context, are interned.  The deprecated ``raw_entry``
+    isn't stored in the dictionary on python 3: it's the line of the listing
+    the entry was parsed from, returned when it's read.  This keeps the
+    listings of hundreds of thousands of files small.
+
+    Args:
+        fields (dict): The fields of the entry.
+        line (str): The line of the entry, or None if it has no ``raw_entry``.
+    """
+    __slots__ = ("_line",)
+
+    def __init__(self, fields=(), line=None):
+        super(Entry, self).__init__(fields)
+        self._line = None
+        if line is not None:
+            if six.PY2:  # pragma: no cover
+                # dict() copies only the stored items of a dict on python 2
+                dict.__setitem__(self, "raw_entry", line)
+            else:
+                self._line = line
+
+    def _has_raw(self):
+        return self._line is not None and not dict.__contains__(self, "raw_entry")
+
+    def __missing__(self, key):
+        if key == "raw_entry" and self._line is not None:
+            return self._line
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key == "raw_entry" and self._line is not None
+
+    def __iter__(self):
+        for key in dict.__iter__(self):
+            yield key
+        if self._has_raw():
+            yield "raw_entry"
+
+    def __len__(self):
+        return dict.__len__(self) + self._has_raw()
+
+    def __delitem__(self, key):
+        if key == "raw_entry" and self._has_raw():
+            self._line = None
+        else:
+            dict.__delitem__(self, key)
+            if key == "raw_entry":
+                self._line = None
+
+    def __eq__(self, other):
+        return self.copy() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (Entry, (list(dict.items(self)), self._line if self._has_raw() else None))
+
+    def __repr__(self):
+        return repr(self.copy())
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def pop(self, key, *default):
+        if key == "raw_entry" and self._has_raw():
+            line, self._line = self._line, None
+            return line
+        if key == "raw_entry":
+            self._line = None
+        return dict.pop(self, key, *default)
+
+    def copy(self):
+        """ Returns a plain dictionary of the fields, including ``raw_entry``. """
+        return dict(self.items())
+
+    def keys(self):
+        return KeysView(self) if six.PY3 else list(self)
+
+    def values(self):
+        return ValuesView(self) if six.PY3 else [self[k] for k in self]
+
+    def items(self):
+        return ItemsView(self) if six.PY3 else [(k, self[k]) for k in self]
+
+    if six.PY2:  # pragma: no cover
+        def iterkeys(self):
+            return iter(self)
+
+        def itervalues(self):
+            return (self[k] for k in self)
+
+        def iteritems(self):
+            return ((k, self[k]) for k in self)
+
+
 class Directory(dict):
     def __init__(self, name, total, body):
         dirs = []
@@ -162,13 +274,13 @@ class Directory(dict):
             parts = line.split(None, 4)
             perms = parts[0]
             typ = perms[0]
-            entry = {"type": typ, "perms": perms[1:]}
+            entry = {"type": typ, "perms": _intern(perms[1:])}
             if parts[1][0].isdigit():
                 # We have to split the line again to see if this is a RHEL8
                 # selinux stanza. This assumes that the context section will
                 # always have at least two pieces separated by ':'.
                 # '?' as the whole RHEL8 security context is also acceptable.
-                rhel8_selinux_ctx = line.split()[4].strip()
+                rhel8_selinux_ctx = parts[4].split(None, 1)[0]
                 if ":" in rhel8_selinux_ctx or '?' == rhel8_selinux_ctx:
                     rest = parse_rhel8_selinux(parts[1:])
                 else:
@@ -179,13 +291,12 @@ class Directory(dict):
             # Update our entry and put it into the correct buckets
             # based on its type.
             entry.update(rest)
+            entry["dir"] = name
+            nm = entry["name"]
             # TODO
             # - The `raw_entry` key is deprecated and will be removed from 3.6.0.
             #   Please use the `insights.parsers.ls.FileListingParser.raw_entry_of` instead.
-            entry["raw_entry"] = line
-            entry["dir"] = name
-            nm = entry["name"]
-            ents[nm] = entry
+            ents[nm] = Entry(entry, line)
             if typ not in "bcd":
                 files.append(nm)
             elif typ == "d":
@@ -205,51 +316,215 @@ class Directory(dict):
         )
 
 
-def parse(lines, root=None):
+def _stanzas(lines, root):
     """
-    Parses a list of lines from ls into dictionaries representing their
-    components.
-
-    Args:
-        lines (list): A list of lines generated by ls.
-        root (str): The directory name to be used for ls output stanzas that
-            don't have a name.
-
-    Returns:
-        A dictionary representing the ls output. It's keyed by the path
-        containing each ls stanza.
+    Find the stanzas of ls output in one pass over the lines, without parsing
+    their entries.
+
+    Yields:
+        tuple: The key of the stanza in the result of :func:`parse`, the name
+        of its directory, its total or None if the number of its entries is
+        used instead, and the offsets of the first line after its header and
+        of the line that ends it.
     """
-    doc = {}
-    entries = []
     name = None
     total = None
-    for line in lines:
+    start = 0
+    count = 0
+    for i, line in enumerate(lines):
         line = line.strip()
         # Skip empty line and non-exist dir line
         if not line or ': No such file or directory' in line:
             continue
-        if line and line[0] == "/" and line[-1] == ":":
+        if line[0] == "/" and line[-1] == ":":
             if name is None:
                 name = line[:-1]
-                if entries:
-                    d = Directory(name, total or len(entries), entries)
-                    doc[root] = d
+                if count:
+                    yield root, name, total or None, start, i
                     total = None
-                    entries = []
             else:
-                d = Directory(name, total or len(entries), entries)
-                doc[name or root] = d
+                yield name or root, name, total or None, start, i
                 total = None
-                entries = []
                 name = line[:-1]
+            start = i + 1
+            count = 0
             continue
         if line.startswith("total"):
             total = int(line.split(None, 1)[1])
             continue
-        entries.append(line)
-    name = name or root
-    total = total if total is not None else len(entries)
-    doc[name] = Directory(name, total, entries)
+        count += 1
+    yield name or root, name or root, total, start, len(lines)
+
+
+def _directory(lines, name, total, start, end):
+    body = []
+    for line in lines[start:end]:
+        line = line.strip()
+        if line and ': No such file or directory' not in line and not line.startswith("total"):
+            body.append(line)
+    return Directory(name, total if total is not None else len(body), body)
+
+
+_LOAD_LOCK = threading.RLock()
+
+
+class Listing(dict):
+    """
+    A dictionary of the directories of ls output by their path, like the one
+    :func:`parse` returns, that builds the :class:`Directory` of a path on
+    the first access to it.
+
+    :meth:`add_lines` only records where the stanza of each directory starts
+    and ends, so the time and memory a recursive listing costs are
+    proportional to the directories actually queried.  Iterating the listing
+    or its values builds all its directories.
+    """
+
+    _lines = None
+    _stanzas = None
+
+    def add_lines(self, lines, root=None):
+        """
+        Record the stanzas of ls output, replacing the directories of the same
+        paths.
+
+        Args:
+            lines (list): A list of lines generated by ls.
+            root (str): The directory name to be used for ls output stanzas
+                that don't have a name.
+        """
+        lines = lines if isinstance(lines, list) else list(lines)
+        with _LOAD_LOCK:
+            if self._stanzas is None:
+                self._stanzas = {}
+            offset = len(self._lines) if self._lines else 0
+            self._lines = self._lines + lines if self._lines else lines
+            for key, name, total, start, end in _stanzas(lines, root):
+                dict.pop(self, key, None)
+                self._stanzas[key] = (name, total, start + offset, end + offset)
+
+    def _load(self, key):
+        with _LOAD_LOCK:
+            stanza = self._stanzas.pop(key, None)
+            if stanza is not None:
+                dict.__setitem__(self, key, _directory(self._lines, *stanza))
+                if not self._stanzas:
+                    # all the directories are built
+                    self._lines = None
+            return dict.__getitem__(self, key)
+
+    def _load_all(self):
+        if self._stanzas:
+            for key in list(self._stanzas):
+                self._load(key)
+
+    def __missing__(self, key):
+        if self._stanzas and key in self._stanzas:
+            return self._load(key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or bool(self._stanzas) and key in self._stanzas
+
+    def __len__(self):
+        return dict.__len__(self) + len(self._stanzas or ())
+
+    def __iter__(self):
+        self._load_all()
+        return dict.__iter__(self)
+
+    def __setitem__(self, key, value):
+        if self._stanzas:
+            self._stanzas.pop(key, None)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        if self._stanzas and key in self._stanzas:
+            del self._stanzas[key]
+        else:
+            dict.__delitem__(self, key)
+
+    def __eq__(self, other):
+        self._load_all()
+        if isinstance(other, Listing):
+            other._load_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        self._load_all()
+        return dict.__repr__(self)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        self._load_all()
+        return dict.keys(self)
+
+    def items(self):
+        self._load_all()
+        return dict.items(self)
+
+    def values(self):
+        self._load_all()
+        return dict.values(self)
+
+    def copy(self):
+        self._load_all()
+        return dict.copy(self)
+
+    def pop(self, key, *default):
+        if key in self:
+            self[key]
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        self._load_all()
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        self._lines = self._stanzas = None
+        dict.clear(self)
+
+
+def parse(lines, root=None, lazy=False):
+    """
+    Parses a list of lines from ls into dictionaries representing their
+    components.
+
+    Args:
+        lines (list): A list of lines generated by ls.
+        root (str): The directory name to be used for ls output stanzas that
+            don't have a name.
+        lazy (bool): Return a :class:`Listing` that parses the entries of each
+            directory on the first access to it.
+
+    Returns:
+        A dictionary representing the ls output. It's keyed by the path
+        containing each ls stanza.
+    """
+    if lazy:
+        doc = Listing()
+        doc.add_lines(lines, root)
+        return doc
+    lines = lines if isinstance(lines, list) else list(lines)
+    doc = {}
+    for stanza in _stanzas(lines, root):
+        doc[stanza[0]] = _directory(lines, *stanza[1:])
     return doc
 
 
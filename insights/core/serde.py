@@ -8,7 +8,10 @@ to register as an observer on a :py:class:`Broker`.
 """
 import json as ser
 import logging
+import mmap
 import os
+import struct
+import threading
 import time
 import traceback
 
@@ -135,21 +138,139 @@ def unmarshal(data, root=None, ctx=None, ds=None):
     return deserialize(data, root=root, ctx=ctx, ds=ds)
 
 
+def _load_doc(path):
+    with open(path) as f:
+        return ser.load(f)
+
+
+def _identity(value):
+    return value
+
+
+def _try_load(load):
+    """
+    Returns the doc returned by `load` or the exception it raised, so a doc
+    that can't be loaded by a worker of a pool doesn't stop the others.
+    """
+    try:
+        return load()
+    except Exception as ex:
+        return ex
+
+
+META_PACK = "meta_data.pack"
+"""
+The name of the file holding the packed metadata of components, in the root
+of a serialized archive.
+"""
+_PACK_MAGIC = b"INSIGHTS-META-PACK-1\n"
+_PACK_FOOTER = struct.Struct("<Q")
+
+
+class MetaPackWriter(object):
+    """
+    Writes the metadata documents of components to a single file which can
+    be memory mapped by :class:`MetaPackReader`.
+
+    The file starts with a magic string followed by each document encoded as
+    JSON.  The index, a JSON object of each component name to the offset and
+    size of its document and whether it has results, is written by
+    :meth:`close`, followed by the offset of the index.  Documents can be
+    added by several threads at once.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        self._lock = threading.Lock()
+        self._file = open(path, "wb")
+        self._file.write(_PACK_MAGIC)
+
+    def add(self, name, doc):
+        """ Appends the `doc` of the component `name`. """
+        data = ser.dumps(doc).encode("utf-8")
+        with self._lock:
+            self.index[name] = (self._file.tell(), len(data), bool(doc.get("results")))
+            self._file.write(data)
+
+    def close(self):
+        """ Writes the index and closes the file. """
+        with self._lock:
+            if self._file.closed:
+                return
+            offset = self._file.tell()
+            self._file.write(ser.dumps(self.index).encode("utf-8"))
+            self._file.write(_PACK_FOOTER.pack(offset))
+            self._file.close()
+
+
+class MetaPackReader(object):
+    """
+    Reads the documents written by :class:`MetaPackWriter`.  The file is
+    memory mapped, only the index is parsed when it's opened and a document
+    is parsed when it's got by the name of its component.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            end = len(self._mm) - _PACK_FOOTER.size
+            if end < len(_PACK_MAGIC) or self._mm[:len(_PACK_MAGIC)] != _PACK_MAGIC:
+                raise ValueError("{} is not a metadata pack.".format(path))
+            offset = _PACK_FOOTER.unpack(self._mm[end:])[0]
+            self.index = ser.loads(self._mm[offset:end].decode("utf-8"))
+        except Exception:
+            self.close()
+            raise
+
+    def names(self):
+        """ Returns the sorted names of the components in the pack. """
+        return sorted(self.index)
+
+    def has_results(self, name):
+        """ Returns whether the document of the component `name` has results. """
+        entry = self.index[name]
+        return len(entry) < 3 or bool(entry[2])
+
+    def get(self, name):
+        """ Returns the document of the component `name`. """
+        offset, size = self.index[name][:2]
+        return ser.loads(self._mm[offset:offset + size].decode("utf-8"))
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 class Hydration(object):
     """
     The Hydration class is responsible for saving and loading insights
     components. It puts metadata about a component's evaluation in a metadata
     file for the component and allows the serializer for a component to put raw
     data beneath a working directory.
+
+    When `packed` is True, the metadata of all components is written to a
+    single :data:`META_PACK` file instead of a file per component, which is
+    finished by :meth:`close`.
     """
-    def __init__(self, root=None, ctx=None, meta_root="meta_data", data_root="data", pool=None):
+    def __init__(self, root=None, ctx=None, meta_root="meta_data", data_root="data", pool=None,
+                 packed=False):
         self.root = root
         self.ctx = ctx
         self.meta_root = os.path.join(root, meta_root) if root else None
         self.data_root = os.path.join(root, data_root) if root else None
+        self.pack_path = os.path.join(root, META_PACK) if root else None
         self.ser_name = dr.get_base_module_name(ser)
         self.created = False
         self.pool = pool
+        self.packed = packed
+        self._pack = None
+        self._pack_lock = threading.Lock()
 
     def _hydrate_one(self, doc):
         """ Returns (component, results, errors, duration) """
@@ -163,28 +284,115 @@ class Hydration(object):
         results = unmarshal(doc["results"], root=self.data_root, ctx=self.ctx, ds=key)
         return (key, results, exec_time, ser_time)
 
-    def hydrate(self, broker=None):
+    def _get_loaders(self, pack, names):
+        """ Returns (name, function that loads the doc of name) pairs. """
+        if pack:
+            names = pack.names() if names is None else [n for n in names if n in pack.index]
+            return [(n, partial(pack.get, n)) for n in names]
+
+        suffix = "." + self.ser_name
+        if names is None:
+            paths = sorted(glob(os.path.join(self.meta_root, "*")))
+        else:
+            paths = [os.path.join(self.meta_root, n + suffix) for n in names]
+            paths = [p for p in paths if os.path.isfile(p)]
+        loaders = []
+        for path in paths:
+            name = os.path.basename(path)
+            name = name[:-len(suffix)] if name.endswith(suffix) else name
+            loaders.append((name, partial(_load_doc, path)))
+        return loaders
+
+    def _load_lazy(self, load):
+        """ Returns (results, exec_time) of a lazily hydrated component. """
+        try:
+            comp, results, exec_time, ser_time = self._hydrate_one(load())
+            # the exec_time of a component added to the broker directly is None
+            return results, (exec_time or 0) + ser_time
+        except ContentException as ex:
+            log.debug(ex)
+        except ValueError as ve:
+            log.debug(ve)
+        except Exception as ex:
+            log.warning(ex)
+        return None, None
+
+    def _add_lazy(self, broker, name, load):
+        """ Registers the component `name` to be loaded from its document. """
+        comp = dr.get_component_by_name(name)
+        if comp is None:
+            log.debug("{} is not a loaded component.".format(name))
+            return
+        try:
+            broker.add_lazy(comp, partial(self._load_lazy, load))
+        except KeyError as ke:
+            log.warning(ke)
+
+    def hydrate(self, broker=None, names=None, lazy=False):
         """
         Loads a Broker from a previously saved one. A Broker is created if one
         isn't provided.
+
+        The metadata is loaded from the :data:`META_PACK` file when it exists.
+        When `names` is given, only the components of the names are loaded.
+        When `lazy` is True, the components with results are only registered
+        with :meth:`insights.core.dr.Broker.add_lazy`, and each one is
+        unmarshalled the first time it's looked up in the broker.  A document of
+        the pack is read then too, while the metadata files are read up front
+        to know which components have results.
+
+        The metadata files are read by the `pool` of the Hydration when it has
+        one, and the components are added to the broker in the same order as
+        without it.
         """
 
         broker = broker or dr.Broker()
-        for path in glob(os.path.join(self.meta_root, "*")):
+        pack = None
+        if self.pack_path and os.path.isfile(self.pack_path):
             try:
-                with open(path) as f:
-                    doc = ser.load(f)
+                pack = MetaPackReader(self.pack_path)
+            except Exception as ex:
+                log.warning(ex)
+        loaders = self._get_loaders(pack, names)
+
+        if lazy and pack:
+            # the pack is kept open by the loaders until they're all called
+            for name, load in loaders:
+                if pack.has_results(name):
+                    self._add_lazy(broker, name, load)
+            return broker
+
+        names = [name for name, _ in loaders]
+        loaders = [load for _, load in loaders]
+        if self.pool and not pack:
+            docs = self.pool.map(_try_load, loaders)
+        else:
+            docs = (_try_load(load) for load in loaders)
+
+        try:
+            for name, doc in zip(names, docs):
+                try:
+                    if isinstance(doc, Exception):
+                        raise doc
+                    if lazy:
+                        # a document without results isn't added to the broker
+                        if doc["results"]:
+                            self._add_lazy(broker, name, partial(_identity, doc))
+                        continue
                     res = self._hydrate_one(doc)
                     comp, results, exec_time, ser_time = res
                     if results:
                         broker[comp] = results
                         broker.exec_times[comp] = exec_time + ser_time
-            except ContentException as ex:
-                log.debug(ex)
-            except ValueError as ve:
-                log.debug(ve)
-            except Exception as ex:
-                log.warning(ex)
+                except ContentException as ex:
+                    log.debug(ex)
+                except ValueError as ve:
+                    log.debug(ve)
+                except Exception as ex:
+                    log.warning(ex)
+        finally:
+            if pack:
+                pack.close()
         return broker
 
     def dehydrate(self, comp, broker):
@@ -222,6 +430,12 @@ class Hydration(object):
             log.exception(ex)
         else:
             if doc is not None and (doc["results"] or doc["errors"]):
+                if self.packed:
+                    try:
+                        self._get_pack().add(name, doc)
+                    except Exception as boom:
+                        log.error("Could not serialize %s to %s: %r" % (name, META_PACK, boom))
+                    return
                 path = None
                 try:
                     path = os.path.join(self.meta_root, name + "." + self.ser_name)
@@ -232,6 +446,25 @@ class Hydration(object):
                     if path:
                         fs.remove(path)
 
+    def _get_pack(self):
+        """
+        Returns the :class:`MetaPackWriter` of the :data:`META_PACK` file,
+        which is created once when the components are persisted by several
+        threads.
+        """
+        with self._pack_lock:
+            if self._pack is None:
+                self._pack = MetaPackWriter(self.pack_path)
+            return self._pack
+
+    def close(self):
+        """
+        Finishes the :data:`META_PACK` file when the metadata is packed.
+        """
+        with self._pack_lock:
+            if self._pack:
+                self._pack.close()
+
     def make_persister(self, to_persist):
         """
         Returns a function that hydrates components as they are evaluated. The
@@ -1,4 +1,5 @@
 import codecs
+import io
 import itertools
 import logging
 import os
@@ -6,11 +7,13 @@ import re
 import shlex
 import signal
 import six
+import tempfile
+import time
 import traceback
 
 from collections import defaultdict
+from contextlib import contextmanager
 from glob import glob
-from subprocess import call
 
 from insights.cleaner import DEFAULT_OBFUSCATIONS
 from insights.cleaner.filters import AllowFilter
@@ -24,12 +27,25 @@ from insights.core.exceptions import (
 )
 from insights.core.plugins import component, datasource, is_datasource
 from insights.core.serde import deserializer, serializer
-from insights.util import fs, streams, which
+from insights.util import fs, streams, subproc, which
 from insights.util.mangle import mangle_command
 
 log = logging.getLogger(__name__)
 
 MAX_CONTENT_SIZE = 104857600 * 2  # 200 MB
+PREFILTER = os.environ.get("INSIGHTS_PREFILTER", "auto")
+"""
+How the files of filterable specs are pre-filtered when collecting data,
+unless the ``prefilter`` of the spec says otherwise:
+
+- "grep": by a ``grep -F`` process.
+- "native": in-process by :func:`insights.util.fs.filter_lines`, falling
+  back to "grep" for the files it cannot search.
+- "auto": in-process when the size of the file times the number of filters
+  is not greater than ``NATIVE_PREFILTER_MAX``, where it's faster than
+  starting "grep".
+"""
+NATIVE_PREFILTER_MAX = 8 * 1024 * 1024
 SAFE_ENV = {
     "PATH": os.path.pathsep.join(
         [
@@ -51,6 +67,112 @@ if "LANG" in os.environ:
 safe_open, encoding = (open, "utf-8") if six.PY3 else (codecs.open, None)
 
 
+def _reversed_output_lines(f):
+    """
+    Yields the lines of the command output in the binary file `f` from the
+    last line to the first, decoded and split as `ExecutionContext.shell_out`
+    does.
+    """
+    last = True
+    for piece in fs.read_pieces_reversed(f):
+        text = piece.decode("utf-8", "ignore")
+        # a piece that isn't the last one was ended by a newline
+        lines = text.splitlines() if last else (text + "\n").splitlines()
+        last = False
+        for idx in range(len(lines) - 1, -1, -1):
+            yield lines[idx]
+
+
+def _encode_line(line):
+    """
+    Returns the bytes of a line to write, the bytes it was read from for
+    the text of a file that isn't valid UTF-8.
+    """
+    if isinstance(line, six.text_type):
+        return line.encode("utf-8", "surrogateescape") if six.PY3 else line.encode("utf-8")
+    return line
+
+
+def _drop_last(lines):
+    """
+    Yields all but the last of the lines.
+    """
+    lines = iter(lines)
+    prev = next(lines, None)
+    for line in lines:
+        yield prev
+        prev = line
+
+
+_SHLEX_SPECIAL = re.compile(r"['\"\\]|[^\S \t\r\n]")
+"""
+Matches the characters that make `shlex.split` split a command other than
+by whitespace as `str.split` does.
+"""
+
+
+class CommandCache(object):
+    """
+    Memoizes the arguments of the commands of the providers and the paths
+    their command names resolve to, so the providers of a collection, e.g. of
+    a `foreach_execute` spec, don't split the same command and search the
+    same ``PATH`` again. :func:`insights.collect.collect` clears it at the
+    start of every collection.
+
+    Attributes:
+        hits (int): the number of resolutions that were found in the cache.
+        misses (int): the number of resolutions that searched the ``PATH``.
+        lookup_time (float): the seconds spent searching the ``PATH``.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._args = {}
+        self._paths = {}
+        self.hits = 0
+        self.misses = 0
+        self.lookup_time = 0.0
+
+    def split(self, cmd):
+        """
+        Returns the list of arguments ``shlex.split`` returns for ``cmd``.
+        """
+        args = self._args.get(cmd)
+        if args is None:
+            args = tuple(shlex.split(cmd) if _SHLEX_SPECIAL.search(cmd) else cmd.split())
+            self._args[cmd] = args
+        return list(args)
+
+    def which(self, name, env=None):
+        """
+        Returns the path :func:`insights.util.which` returns for the command
+        ``name`` and the ``PATH`` of ``env``.
+        """
+        key = (name, (env or os.environ).get("PATH"))
+        try:
+            path = self._paths[key]
+        except KeyError:
+            start = time.time()
+            path = self._paths[key] = which(name, env=env)
+            self.lookup_time += time.time() - start
+            self.misses += 1
+        else:
+            self.hits += 1
+        return path
+
+    @property
+    def saved_time(self):
+        """
+        The estimated seconds the cached resolutions saved.
+        """
+        return self.hits * self.lookup_time / self.misses if self.misses else 0.0
+
+
+COMMAND_CACHE = CommandCache()
+
+
 class ContentProvider(object):
     def __init__(self):
         self.cmd = None
@@ -79,6 +201,32 @@ class ContentProvider(object):
     def _stream(self):
         raise NotImplementedError()
 
+    def _clean_options(self):
+        """
+        Returns the names of the cleaning operations to apply to this spec
+        and the keyword arguments for the cleaner.
+        """
+        cleans = []
+        # Redacting?
+        no_red = getattr(self.ds, 'no_redact', False)
+        cleans.append("Redact") if not no_red else None
+        # Obfuscating?
+        no_obf = getattr(self.ds, 'no_obfuscate', [])
+        cleans.append("Obfuscate") if set(no_obf) != DEFAULT_OBFUSCATIONS else None
+        # Filtering?
+        allowlist = matcher = None
+        if self._filterable:
+            cleans.append("Filter")
+            allowlist = self._filters
+            matcher = filters.get_matcher(self.ds)
+        return cleans, dict(
+            no_obfuscate=no_obf,
+            allowlist=allowlist,
+            matcher=matcher,
+            no_redact=no_red,
+            width=self.relative_path.endswith("netstat_-neopa"),
+        )
+
     def _clean_content(self):
         """
         Clean (Redact, Filter, and Obfuscate) the Spec Content ONLY when
@@ -86,28 +234,11 @@ class ContentProvider(object):
         """
         content = self.content  # load first for debugging info order
         if content and isinstance(self.ctx, HostContext) and self.ds and self.cleaner:
-            cleans = []
-            # Redacting?
-            no_red = getattr(self.ds, 'no_redact', False)
-            cleans.append("Redact") if not no_red else None
-            # Obfuscating?
-            no_obf = getattr(self.ds, 'no_obfuscate', [])
-            cleans.append("Obfuscate") if set(no_obf) != DEFAULT_OBFUSCATIONS else None
-            # Filtering?
-            allowlist = None
-            if self._filterable:
-                cleans.append("Filter")
-                allowlist = self._filters
+            cleans, kwargs = self._clean_options()
             # Cleaning - Entry
             if cleans:
                 log.debug("Cleaning (%s) %s", "/".join(cleans), self.relative_path)
-                content = self.cleaner.clean_content(
-                    content,
-                    no_obfuscate=no_obf,
-                    allowlist=allowlist,
-                    no_redact=no_red,
-                    width=self.relative_path.endswith("netstat_-neopa"),
-                )
+                content = self.cleaner.clean_content(content, **kwargs)
                 if len(content) == 0:
                     log.debug("Skipping %s due to empty after cleaning", self.path)
                     raise ContentException("Empty after cleaning: %s" % self.path)
@@ -142,10 +273,9 @@ class ContentProvider(object):
     def write(self, dst):
         fs.ensure_path(os.path.dirname(dst))
         # Clean Spec Content when writing it down to disk before uploading
-        content = "\n".join(self._clean_content())
-        content = content.encode("utf-8") if six.PY3 else content
+        content = self._clean_content()
         with open(dst, "wb") as f:
-            f.write(content)
+            fs.write_lines(f, content)
 
         self.loaded = False
 
@@ -257,7 +387,7 @@ class RawFileProvider(FileProvider):
 
     def write(self, dst):
         fs.ensure_path(os.path.dirname(dst))
-        call([which("cp", env=SAFE_ENV), self.path, dst], env=SAFE_ENV)
+        fs.copy_file(self.path, dst)
 
 
 class TextFileProvider(FileProvider):
@@ -280,10 +410,37 @@ class TextFileProvider(FileProvider):
 
         return args
 
+    def _native_prefilter(self, out):
+        """
+        Writes the lines "grep" would output to the binary file `out` when
+        the pre-filtering is done in-process for this file, see
+        :data:`PREFILTER`.
+
+        Returns:
+            int: the return code of "grep", or None when "grep" has to be
+            run instead.
+        """
+        mode = getattr(self.ds, "prefilter", None) or PREFILTER
+        if mode == "grep":
+            return None
+        if mode != "native" and (
+            os.stat(self.path).st_size * len(self._filters) > NATIVE_PREFILTER_MAX
+        ):
+            return None
+        count = fs.filter_lines(self.path, self._filters, out)
+        if count is None:
+            return None
+        return 0 if count else 1
+
     def load(self):
         self.loaded = True
         args = self.create_args()
         if args:
+            out = io.BytesIO()
+            rc = self._native_prefilter(out)
+            if rc is not None:
+                self.rc = rc
+                return out.getvalue().decode("utf-8", "ignore").splitlines()
             rc, out = self.ctx.shell_out(args, keep_rc=True, env=SAFE_ENV)
             self.rc = rc
             return out
@@ -299,9 +456,87 @@ class TextFileProvider(FileProvider):
                 content = [l.rstrip("\n") for l in f]
             if not isinstance(self.ctx, HostContext) and self._filters:
                 # Post-filtering ONLY when processing data
-                content = AllowFilter.filter_content(content, self._filters)
+                content = AllowFilter.filter_content(
+                    content, self._filters, filters.get_matcher(self.ds)
+                )
             return content
 
+    @contextmanager
+    def _reversed_lines(self):
+        """
+        Yields a generator of the lines :meth:`load` would return, from the
+        last line to the first, without reading the whole content into
+        memory.  The output of the pre-filtering "grep" is spooled to a
+        temporary file.
+        """
+        args = self.create_args()
+        if args:
+            with tempfile.TemporaryFile() as out:
+                self.rc = self._native_prefilter(out)
+                if self.rc is None:
+                    pipeline = subproc.Pipeline(*args, timeout=self.ctx.timeout, env=SAFE_ENV)
+                    self.rc = pipeline.write(out, keep_rc=True)
+                out.flush()
+                yield _reversed_output_lines(out)
+            return
+
+        fsize = os.stat(self.path).st_size
+        start = max(fsize - MAX_CONTENT_SIZE, 0)
+        with open(self.path, "rb") as f:
+            lines = fs.read_lines_reversed(f, start=start, encoding=encoding, errors="surrogateescape")
+            if start:
+                # read the last ``MAX_CONTENT_SIZE`` MB only
+                log.debug("Extra-huge file is truncated %s", self.relative_path)
+                lines = _drop_last(lines)  # discard the first line which is broken
+            yield lines
+
+    def write(self, dst):
+        """
+        Clean the content while streaming it to `dst` when collecting data.
+
+        The content is read from the bottom up, like
+        :meth:`insights.cleaner.Cleaner.clean_content` processes it, and the
+        cleaned lines are spooled to a temporary file to be written in the
+        original order, so only a block of the content is held in memory.
+        Content that is already loaded is written as it is by
+        :meth:`ContentProvider.write`.
+        """
+        if self._content is not None or not (isinstance(self.ctx, HostContext) and self.ds and self.cleaner):
+            return super(TextFileProvider, self).write(dst)
+        if self._exception:
+            raise self._exception
+
+        fs.ensure_path(os.path.dirname(dst))
+        cleans, kwargs = self._clean_options()
+        with fs.ReversedSpool() as spool:
+            with self._reversed_lines() as lines:
+                first = next(lines, None)
+                if first is None:
+                    log.debug("File is empty (after filtering): %s", self.path)
+                    # Do not collect empty spec
+                    raise ContentException("Empty (after filtering): %s" % self.path)
+                lines = itertools.chain([first], lines)
+                if cleans:
+                    log.debug("Cleaning (%s) %s", "/".join(cleans), self.relative_path)
+                    lines = self.cleaner.clean_stream(lines, **kwargs)
+                else:
+                    log.debug("Skipping cleaning %s", self.relative_path)
+                kept = False
+                for line in lines:
+                    spool.write(_encode_line(line))
+                    kept = kept or bool(line)
+                if cleans and not kept:
+                    log.debug("Skipping %s due to empty after cleaning", self.path)
+                    raise ContentException("Empty after cleaning: %s" % self.path)
+
+            with open(dst, "wb") as f:
+                sep = b""
+                for line in spool:
+                    f.write(sep + line)
+                    sep = b"\n"
+
+        self.loaded = False
+
     def _stream(self):
         """
         Returns a generator of lines instead of a list of lines.
@@ -314,6 +549,17 @@ class TextFileProvider(FileProvider):
             else:
                 args = self.create_args()
                 if args:
+                    with tempfile.TemporaryFile() as out:
+                        if self._native_prefilter(out) is not None:
+                            out.seek(0)
+                            # the lines as the pipe of the "grep" gives them
+                            if six.PY3:
+                                f = io.open(out.fileno(), "r", closefd=False)
+                            else:
+                                f = os.fdopen(os.dup(out.fileno()), "rU")
+                            with f:
+                                yield f
+                            return
                     with streams.connect(*args, env=SAFE_ENV) as s:
                         yield s
                 else:
@@ -375,6 +621,7 @@ class CommandOutputProvider(ContentProvider):
 
         self._misc_settings()
         self._content = None
+        self._pending = None
         self._env = self.create_env()
         self._filterable = (
             any(s.filterable for s in dr.get_registry_points(self.ds))
@@ -391,8 +638,8 @@ class CommandOutputProvider(ContentProvider):
 
     def validate(self):
         # 1. No Such Command
-        cmd = shlex.split(self.cmd)[0]
-        if not which(cmd, env=self._env):
+        cmd = COMMAND_CACHE.split(self.cmd)[0]
+        if not COMMAND_CACHE.which(cmd, env=self._env):
             raise ContentException("Command not found: %s" % cmd)
         # 2. Check only when collecting
         if isinstance(self.ctx, HostContext):
@@ -405,7 +652,7 @@ class CommandOutputProvider(ContentProvider):
                 raise BlacklistedSpec()
 
     def create_args(self):
-        command = [shlex.split(self.cmd)]
+        command = [COMMAND_CACHE.split(self.cmd)]
 
         if self.split and self._filters:
             log.debug("Pre-filtering  %s", self.relative_path)
@@ -426,13 +673,38 @@ class CommandOutputProvider(ContentProvider):
         return env
 
     def load(self):
+        if self._pending is not None:
+            # the command was started by :meth:`schedule`
+            pending, self._pending = self._pending, None
+            return pending.result()
+        return self._execute()
+
+    def schedule(self, pool, timeout=None):
+        """
+        Starts the command in a thread of ``pool``. :meth:`load` waits for it
+        and returns its output or raises its exception.
+
+        Args:
+            pool (ThreadPoolExecutor): the pool running the command.
+            timeout (int): Maximum number of seconds the command may take,
+                when it's lower than the timeout of the spec or the context.
+
+        Returns:
+            Future: the future of the output of the command.
+        """
+        if self._pending is None:
+            limits = [t for t in (self.timeout or self.ctx.timeout, timeout) if t]
+            self._pending = pool.submit(self._execute, min(limits) if limits else None)
+        return self._pending
+
+    def _execute(self, timeout=None):
         command = self.create_args()
 
         raw = self.ctx.shell_out(
             command,
             split=self.split,
             keep_rc=self.keep_rc,
-            timeout=self.timeout,
+            timeout=timeout or self.timeout,
             env=self._env,
             signum=self.signum,
         )
@@ -449,7 +721,9 @@ class CommandOutputProvider(ContentProvider):
         if self._exception:
             raise self._exception
         try:
-            if self._content:
+            if self._pending is not None:
+                yield self.content
+            elif self._content:
                 yield self._content
             else:
                 command = self.create_args()
@@ -538,12 +812,14 @@ class RegistryPoint(object):
         no_obfuscate=None,
         no_redact=False,
         prio=0,
+        prefilter=None,
     ):
         self.metadata = metadata
         self.multi_output = multi_output
         self.no_obfuscate = [] if no_obfuscate is None else no_obfuscate
         self.no_redact = no_redact
         self.prio = prio
+        self.prefilter = prefilter
         self.raw = raw
         self.filterable = filterable
         self.__name__ = self.__class__.__name__
@@ -556,6 +832,7 @@ class RegistryPoint(object):
             no_obfuscate=self.no_obfuscate,
             no_redact=no_redact,
             prio=prio,
+            prefilter=prefilter,
         )(self)
 
     def __call__(self, broker):
@@ -645,6 +922,7 @@ def _resolve_registry_points(cls, base, dct):
                 v.no_obfuscate = delegate.no_obfuscate = point.no_obfuscate
                 v.no_redact = delegate.no_redact = point.no_redact
                 v.prio = delegate.prio = point.prio
+                v.prefilter = delegate.prefilter = point.prefilter
 
                 # the RegistryPoint gets the implementation datasource as a
                 # dependency
@@ -47,7 +47,7 @@ add_filter(Specs.ls_la_filtered, ['total '])
 add_filter(Specs.ls_lan_filtered, ['total '])
 
 
-class FileListing(CommandParser, dict):
+class FileListing(CommandParser, ls_parser.Listing):
     """
     Reads a series of concatenated directory listings and turns them into
     a dictionary of entities by name.  Stores all the information for
@@ -80,6 +80,9 @@ class FileListing(CommandParser, dict):
         - the SELinux user, role, type and MLS
         - the name, and link destination if it's a symlink
 
+    The entries of a directory are parsed on the first access to it, see
+    :class:`insights.core.ls_parser.Listing`.
+
     .. note::
         The :class:`FileListing` parses the content collected by
         diffirent ``ls_*`` specs. The ``ls_*`` specs collect the corresponding
@@ -173,7 +176,7 @@ class FileListing(CommandParser, dict):
         Called automatically to process the directory listing(s) contained in
         the content.
         """
-        self.update(ls_parser.parse(content, self.__root_path))
+        self.add_lines(content, self.__root_path)
 
     def files_of(self, directory):
         """
@@ -48,13 +48,22 @@ from __future__ import print_function
 import functools
 import logging
 import os
+import re
 import string
 import traceback
 from bisect import bisect_left
-from six import StringIO, with_metaclass
+from six import StringIO, string_types, with_metaclass
 
 log = logging.getLogger(__name__)
 
+# bumped whenever a parser that's part of a compiled grammar is changed
+_generation = 0
+
+
+def _invalidate():
+    global _generation
+    _generation += 1
+
 
 class Node(object):
     """
@@ -62,14 +71,20 @@ class Node(object):
     each instance containing a list of its children. Its main purpose is to
     simplify pretty printing.
     """
+    _compiled = False
+
     def __init__(self):
         self.children = []
 
     def add_child(self, child):
+        if self._compiled:
+            _invalidate()
         self.children.append(child)
         return self
 
     def set_children(self, children):
+        if self._compiled:
+            _invalidate()
         self.children = []
         for c in children:
             self.add_child(c)
@@ -141,6 +156,102 @@ def _debug_hook(func):
     return inner
 
 
+class _Fail(Exception):
+    """
+    Raised by the compiled form of a parser when it doesn't match. Any other
+    exception aborts the compiled run.
+    """
+
+
+def _function_error(ctx):
+    """
+    The message of the error raised by a mapped or lifted function.
+    """
+    pos, msg = ctx.function_error
+    lineno = ctx.line(pos) + 1
+    colno = ctx.col(pos) + 1
+    return "At line {0} column {1}: {2}".format(lineno, colno, msg)
+
+
+class _Debugging(Exception):
+    """
+    Raised when a grammar with debugging enabled is compiled.
+    """
+
+
+def _is_char(c):
+    return isinstance(c, string_types) and len(c) == 1
+
+
+def _char_class(chars, negate=False):
+    """
+    The regular expression matching a character in (or not in) chars.
+    """
+    if not chars:
+        return r"[\s\S]" if negate else r"(?!)"
+    return "[{0}{1}]".format("^" if negate else "", "".join(re.escape(c) for c in sorted(chars)))
+
+
+def _in_set(values):
+    def process(pos, text, ctx):
+        c = text[pos:pos + 1]
+        if c in values:
+            return (pos + 1, c)
+        raise _Fail()
+    return process
+
+
+class _Compiler(object):
+    """
+    Compiles a grammar into plain functions of ``(pos, text, ctx)`` that run
+    on the original string. Each parser builds its function with
+    ``_compile``, the parsers that can't are called through their regular
+    ``process`` on the list of characters.
+    """
+    def __init__(self):
+        self.memo = {}
+
+    def _check(self, node):
+        if node._debug:
+            raise _Debugging()
+        node._compiled = True
+
+    def char_class(self, node):
+        """
+        The set of characters a parser matches if it matches exactly one
+        character from a set, otherwise None.
+        """
+        self._check(node)
+        return node._char_class(self) if node._compilable else None
+
+    def __call__(self, node):
+        try:
+            return self.memo[node]
+        except KeyError:
+            pass
+        self._check(node)
+        func = node._compile(self) if node._compilable else None
+        if func is None:
+            func = self._fallback(node)
+        self.memo[node] = func
+        return func
+
+    @staticmethod
+    def _fallback(node):
+        def process(pos, text, ctx):
+            try:
+                data = ctx._chars
+            except AttributeError:
+                data = ctx._chars = list(text) + [None]
+            try:
+                return node.process(pos, data, ctx)
+            except Exception:
+                if ctx.function_error is not None:
+                    raise
+                raise _Fail()
+        return process
+
+
 class Backtrack(Exception):
     """
     Mapped or Lifted functions should Backtrack if they want to fail without
@@ -162,7 +273,10 @@ class Context(object):
         self.indents = []
         self.tags = []
         self.src = src
-        self.lines = [i for i, x in enumerate(lines) if x == "\n"]
+        if isinstance(lines, string_types):
+            self.lines = [m.start() for m in re.finditer("\n", lines)]
+        else:
+            self.lines = [i for i, x in enumerate(lines) if x == "\n"]
         self.parser_stack = []
         self.errors = []
         self.function_error = None
@@ -197,11 +311,14 @@ class Context(object):
 class _ParserMeta(type):
     """
     ParserMeta wraps every parser subclass's process function with the
-    ``_debug_hook`` decorator.
+    ``_debug_hook`` decorator. A subclass that implements process can be
+    compiled only if it also implements ``_compile``.
     """
     def __init__(cls, name, bases, clsdict):
         orig = getattr(cls, "process")
         setattr(cls, "process", _debug_hook(orig))
+        if "process" in clsdict:
+            cls._compilable = "_compile" in clsdict
 
 
 class Parser(with_metaclass(_ParserMeta, Node)):
@@ -213,11 +330,15 @@ class Parser(with_metaclass(_ParserMeta, Node)):
         self.name = None
         self._debug = False
 
+    _fast = None
+
     def debug(self, d=True):
         """
         Set to ``True`` to enable diagnostic messages before and after the
         parser is invoked.
         """
+        if self._compiled:
+            _invalidate()
         self._debug = d
         return self
 
@@ -315,7 +436,30 @@ class Parser(with_metaclass(_ParserMeta, Node)):
     def process(self, pos, data, ctx):
         raise NotImplementedError()
 
-    def __call__(self, data, src=None, Ctx=Context):
+    def _compile(self, compile):
+        """
+        Return a function of ``(pos, text, ctx)`` that does what process does
+        on the original string and raises ``_Fail`` if the parser doesn't
+        match, or None if the parser must be run through process. Use
+        ``compile(parser)`` to get the function of a child parser.
+        """
+        return None
+
+    def _char_class(self, compile):
+        return None
+
+    def _compiled_process(self):
+        fast = self._fast
+        if fast is None or fast[0] != _generation:
+            generation = _generation
+            try:
+                fast = (generation, _Compiler()(self))
+            except _Debugging:
+                fast = (generation, None)
+            self._fast = fast
+        return fast[1]
+
+    def __call__(self, data, src=None, Ctx=Context, fast=True):
         """
         Invoke the parser like a function on a regular string of characters.
 
@@ -323,7 +467,28 @@ class Parser(with_metaclass(_ParserMeta, Node)):
         the Context instance. You also can provide a Context subclass if your
         parsers have particular needs not covered by the default
         implementation that provides significant indent and tag stacks.
+
+        Unless ``fast`` is False or debugging is enabled for any of the
+        parsers, a string is parsed first by the compiled grammar, which runs
+        on the string itself without the debug hooks. If it doesn't match,
+        the input is parsed again the regular way for the error messages.
+        Errors raised by mapped or lifted functions aren't retried.
         """
+        process = self._compiled_process() if fast and isinstance(data, string_types) else None
+        if process is not None:
+            ctx = Ctx(data, src=src)
+            try:
+                _, ret = process(0, data, ctx)
+                if ctx.function_error is None:
+                    return ret
+            except _Fail:
+                pass
+            except Exception:
+                if ctx.function_error is None:
+                    raise
+            if ctx.function_error is not None:
+                raise Exception(_function_error(ctx))
+
         data = list(data)
         data.append(None)  # add a terminal so we don't overrun
         ctx = Ctx(data, src=src)
@@ -335,11 +500,7 @@ class Parser(with_metaclass(_ParserMeta, Node)):
             pass
 
         if ctx.function_error is not None:
-            pos, msg = ctx.function_error
-            lineno = ctx.line(pos) + 1
-            colno = ctx.col(pos) + 1
-            msg = "At line {0} column {1}: {2}".format(lineno, colno, msg)
-            raise Exception(msg)
+            raise Exception(_function_error(ctx))
 
         err = StringIO()
 
@@ -368,6 +529,14 @@ class AnyChar(Parser):
         ctx.set(pos, msg)
         raise Exception(msg)
 
+    def _compile(self, compile):
+        def process(pos, text, ctx):
+            c = text[pos:pos + 1]
+            if c:
+                return (pos + 1, c)
+            raise _Fail()
+        return process
+
 
 class Char(Parser):
     """
@@ -391,6 +560,20 @@ class Char(Parser):
         ctx.set(pos, msg)
         raise Exception(msg)
 
+    def _compile(self, compile):
+        char = self.char
+        if not _is_char(char):
+            return None
+
+        def process(pos, text, ctx):
+            if text.startswith(char, pos):
+                return (pos + 1, char)
+            raise _Fail()
+        return process
+
+    def _char_class(self, compile):
+        return set([self.char]) if _is_char(self.char) else None
+
     def __repr__(self):
         if self.name is None:
             return "Char({0})".format(self.char)
@@ -425,6 +608,13 @@ class InSet(Parser):
         ctx.set(pos, msg)
         raise Exception(msg)
 
+    def _compile(self, compile):
+        values = self._char_class(compile)
+        return _in_set(values) if values is not None else None
+
+    def _char_class(self, compile):
+        return self.values if all(_is_char(c) for c in self.values) else None
+
     def __repr__(self):
         if self.name is None:
             return "InSet({0!r})".format(sorted(self.values))
@@ -472,6 +662,28 @@ class String(Parser):
             raise Exception(msg)
         return pos, "".join(results)
 
+    def _compile(self, compile):
+        if not all(_is_char(c) for c in self.chars | self.echars):
+            return None
+        min_length = self.min_length
+        echars = self.echars
+        if echars:
+            # an escaped character is tried before a character of the set
+            match = re.compile(r"(?:\\{0}|{1})*".format(_char_class(echars), _char_class(self.chars))).match
+            unescape = re.compile(r"\\({0})".format(_char_class(echars))).sub
+        else:
+            match = re.compile(_char_class(self.chars) + "*").match
+
+        def process(pos, text, ctx):
+            end = match(text, pos).end()
+            value = text[pos:end]
+            if echars and "\\" in value:
+                value = unescape(r"\1", value)
+            if len(value) < min_length:
+                raise _Fail()
+            return end, value
+        return process
+
 
 class Literal(Parser):
     """
@@ -539,6 +751,29 @@ class Literal(Parser):
                     raise Exception(msg)
             return pos, ("".join(result) if self.value is self._NULL else self.value)
 
+    def _compile(self, compile):
+        chars = self.chars
+        if not isinstance(chars, string_types):
+            return None
+        value = self.value
+        length = len(chars)
+        if not self.ignore_case:
+            if value is self._NULL:
+                value = chars
+
+            def process(pos, text, ctx):
+                if text.startswith(chars, pos):
+                    return pos + length, value
+                raise _Fail()
+            return process
+
+        def process_ignore_case(pos, text, ctx):
+            s = text[pos:pos + length]
+            if len(s) == length and all(a.lower() == b for a, b in zip(s, chars)):
+                return pos + length, (s if value is self._NULL else value)
+            raise _Fail()
+        return process_ignore_case
+
 
 class Wrapper(Parser):
     """
@@ -553,6 +788,9 @@ class Wrapper(Parser):
     def process(self, pos, data, ctx):
         return self.children[0].process(pos, data, ctx)
 
+    def _compile(self, compile):
+        return compile(self.children[0])
+
 
 class Mark(object):
     """
@@ -578,6 +816,16 @@ class PosMarker(Wrapper):
         pos, result = super(PosMarker, self).process(pos, data, ctx)
         return pos, Mark(lineno, col, result)
 
+    def _compile(self, compile):
+        child = compile(self.children[0])
+
+        def process(pos, text, ctx):
+            lineno = ctx.line(pos) + 1
+            col = ctx.col(pos) + 1
+            pos, result = child(pos, text, ctx)
+            return pos, Mark(lineno, col, result)
+        return process
+
 
 class Sequence(Parser):
     """
@@ -628,6 +876,17 @@ class Sequence(Parser):
             results.append(res)
         return pos, results
 
+    def _compile(self, compile):
+        children = [compile(c) for c in self.children]
+
+        def process(pos, text, ctx):
+            results = []
+            for p in children:
+                pos, res = p(pos, text, ctx)
+                results.append(res)
+            return pos, results
+        return process
+
 
 class Choice(Parser):
     """
@@ -665,6 +924,30 @@ class Choice(Parser):
                 pass
         raise Exception()
 
+    def _compile(self, compile):
+        values = self._char_class(compile)
+        if values is not None:
+            return _in_set(values)
+        children = [compile(c) for c in self.children]
+
+        def process(pos, text, ctx):
+            for c in children:
+                try:
+                    return c(pos, text, ctx)
+                except _Fail:
+                    pass
+            raise _Fail()
+        return process
+
+    def _char_class(self, compile):
+        values = set()
+        for c in self.children:
+            chars = compile.char_class(c)
+            if chars is None:
+                return None
+            values |= chars
+        return values
+
 
 class Many(Parser):
     """
@@ -722,6 +1005,34 @@ class Many(Parser):
 
         return pos, results
 
+    def _compile(self, compile):
+        lower = self.lower
+        chars = compile.char_class(self.children[0])
+        if chars is not None:
+            match = re.compile(_char_class(chars) + "*").match
+
+            def process_chars(pos, text, ctx):
+                end = match(text, pos).end()
+                if end - pos < lower:
+                    raise _Fail()
+                return end, list(text[pos:end])
+            return process_chars
+
+        child = compile(self.children[0])
+
+        def process(pos, text, ctx):
+            results = []
+            while True:
+                try:
+                    pos, res = child(pos, text, ctx)
+                    results.append(res)
+                except _Fail:
+                    break
+            if len(results) < lower:
+                raise _Fail()
+            return pos, results
+        return process
+
     def __repr__(self):
         if not self.name:
             return "Many({0}, lower={1})".format(self.children[0], self.lower)
@@ -771,6 +1082,48 @@ class Until(Parser):
                 break
         return pos, results
 
+    def _compile(self, compile):
+        parser, pred = self.children
+        if parser is AnyChar:
+            compile(parser)
+            # any character up to the first one the predicate matches
+            chars = compile.char_class(pred)
+            if chars is not None:
+                match = re.compile(_char_class(chars, negate=True) + "*").match
+
+                def process_chars(pos, text, ctx):
+                    end = match(text, pos).end()
+                    return end, list(text[pos:end])
+                return process_chars
+            compile(pred)
+            if type(pred) is Literal and not pred.ignore_case and isinstance(pred.chars, string_types):
+                literal = pred.chars
+
+                def process_literal(pos, text, ctx):
+                    end = text.find(literal, pos)
+                    if end < 0:
+                        end = len(text)
+                    return end, list(text[pos:end])
+                return process_literal
+
+        parser, pred = compile(parser), compile(pred)
+
+        def process(pos, text, ctx):
+            results = []
+            while True:
+                try:
+                    pred(pos, text, ctx)
+                except _Fail:
+                    try:
+                        pos, res = parser(pos, text, ctx)
+                        results.append(res)
+                    except _Fail:
+                        break
+                else:
+                    break
+            return pos, results
+        return process
+
 
 class FollowedBy(Parser):
     """
@@ -799,6 +1152,15 @@ class FollowedBy(Parser):
         right.process(new, data, ctx)
         return new, res
 
+    def _compile(self, compile):
+        left, right = [compile(c) for c in self.children]
+
+        def process(pos, text, ctx):
+            new, res = left(pos, text, ctx)
+            right(new, text, ctx)
+            return new, res
+        return process
+
 
 class NotFollowedBy(Parser):
     """
@@ -832,6 +1194,18 @@ class NotFollowedBy(Parser):
             ctx.set(new, msg)
             raise Exception()
 
+    def _compile(self, compile):
+        left, right = [compile(c) for c in self.children]
+
+        def process(pos, text, ctx):
+            new, res = left(pos, text, ctx)
+            try:
+                right(new, text, ctx)
+            except _Fail:
+                return new, res
+            raise _Fail()
+        return process
+
 
 class KeepLeft(Parser):
     """
@@ -859,6 +1233,15 @@ class KeepLeft(Parser):
         pos, _ = right.process(pos, data, ctx)
         return pos, res
 
+    def _compile(self, compile):
+        left, right = [compile(c) for c in self.children]
+
+        def process(pos, text, ctx):
+            pos, res = left(pos, text, ctx)
+            pos, _ = right(pos, text, ctx)
+            return pos, res
+        return process
+
 
 class KeepRight(Parser):
     """
@@ -885,6 +1268,14 @@ class KeepRight(Parser):
         pos, _ = left.process(pos, data, ctx)
         return right.process(pos, data, ctx)
 
+    def _compile(self, compile):
+        left, right = [compile(c) for c in self.children]
+
+        def process(pos, text, ctx):
+            pos, _ = left(pos, text, ctx)
+            return right(pos, text, ctx)
+        return process
+
 
 class Opt(Parser):
     """
@@ -917,6 +1308,17 @@ class Opt(Parser):
         except Exception:
             return pos, self.default
 
+    def _compile(self, compile):
+        child = compile(self.children[0])
+        default = self.default
+
+        def process(pos, text, ctx):
+            try:
+                return child(pos, text, ctx)
+            except _Fail:
+                return pos, default
+        return process
+
 
 class Map(Parser):
     """
@@ -950,6 +1352,23 @@ class Map(Parser):
             ctx.function_error = (pos, msg)
             raise
 
+    def _compile(self, compile):
+        child = compile(self.children[0])
+        func = self.func
+
+        def process(pos, text, ctx):
+            pos, res = child(pos, text, ctx)
+            try:
+                return pos, func(res)
+            except Backtrack:
+                raise _Fail()
+            except Exception:
+                tb = traceback.format_exc()
+                msg = (self.name or "Map") + " raised{l}{tb}".format(l=os.linesep, tb=tb)
+                ctx.function_error = (pos, msg)
+                raise
+        return process
+
     def __repr__(self):
         if not self.name:
             return "Map({0}({1}))".format(self.func.__name__, self.children[0])
@@ -1010,6 +1429,26 @@ class Lift(Parser):
             ctx.function_error = (pos, msg)
             raise
 
+    def _compile(self, compile):
+        children = [compile(c) for c in self.children]
+        func = self.func
+
+        def process(pos, text, ctx):
+            results = []
+            for c in children:
+                pos, res = c(pos, text, ctx)
+                results.append(res)
+            try:
+                return pos, func(*results)
+            except Backtrack:
+                raise _Fail()
+            except Exception:
+                tb = traceback.format_exc()
+                msg = (self.name or "Lift") + " raised{l}{tb}".format(l=os.linesep, tb=tb)
+                ctx.function_error = (pos, msg)
+                raise
+        return process
+
 
 class Forward(Parser):
     """
@@ -1038,6 +1477,18 @@ class Forward(Parser):
     def process(self, pos, data, ctx):
         return self.children[0].process(pos, data, ctx)
 
+    def _compile(self, compile):
+        if not self.children:
+            return None
+        delegate = []
+
+        def process(pos, text, ctx):
+            return delegate[0](pos, text, ctx)
+        # the delegate may refer back to this parser
+        compile.memo[self] = process
+        delegate.append(compile(self.children[0]))
+        return process
+
 
 class EOF(Parser):
     """
@@ -1057,6 +1508,13 @@ class EOF(Parser):
         ctx.set(pos, msg)
         raise Exception(msg)
 
+    def _compile(self, compile):
+        def process(pos, text, ctx):
+            if pos >= len(text):
+                return pos, None
+            raise _Fail()
+        return process
+
 
 class EnclosedComment(Parser):
     """
@@ -1078,6 +1536,9 @@ class EnclosedComment(Parser):
     def process(self, pos, data, ctx):
         return self.children[0].process(pos, data, ctx)
 
+    def _compile(self, compile):
+        return compile(self.children[0])
+
 
 class OneLineComment(Parser):
     """
@@ -1098,6 +1559,9 @@ class OneLineComment(Parser):
     def process(self, pos, data, ctx):
         return self.children[0].process(pos, data, ctx)
 
+    def _compile(self, compile):
+        return compile(self.children[0])
+
 
 class WithIndent(Wrapper):
     """
@@ -1126,6 +1590,19 @@ class WithIndent(Wrapper):
         finally:
             ctx.indents.pop()
 
+    def _compile(self, compile):
+        ws = compile(WS)
+        child = compile(self.children[0])
+
+        def process(pos, text, ctx):
+            new, _ = ws(pos, text, ctx)
+            try:
+                ctx.indents.append(ctx.col(new))
+                return child(new, text, ctx)
+            finally:
+                ctx.indents.pop()
+        return process
+
 
 class HangingString(Parser):
     """
@@ -1163,6 +1640,29 @@ class HangingString(Parser):
         ret = " ".join(results)
         return pos, ret
 
+    def _compile(self, compile):
+        ws = compile(WS)
+        child = compile(self.children[0])
+
+        def process(pos, text, ctx):
+            old = pos
+            results = []
+            while ctx.indents:
+                try:
+                    if ctx.col(pos) > ctx.indents[-1]:
+                        pos, res = child(pos, text, ctx)
+                        # Remove any inline comments.
+                        results.append(res.split("#", 1)[0].rstrip(" \\"))
+                    else:
+                        pos = old
+                        break
+                    old = pos
+                    pos, _ = ws(pos, text, ctx)
+                except _Fail:
+                    break
+            return pos, " ".join(results)
+        return process
+
 
 class StartTagName(Wrapper):
     """
@@ -1175,6 +1675,15 @@ class StartTagName(Wrapper):
         ctx.tags.append(res)
         return pos, res
 
+    def _compile(self, compile):
+        child = compile(self.children[0])
+
+        def process(pos, text, ctx):
+            pos, res = child(pos, text, ctx)
+            ctx.tags.append(res)
+            return pos, res
+        return process
+
 
 class EndTagName(Wrapper):
     """
@@ -1203,6 +1712,20 @@ class EndTagName(Wrapper):
             raise Exception(msg)
         return pos, res
 
+    def _compile(self, compile):
+        child = compile(self.children[0])
+        ignore_case = self.ignore_case
+
+        def process(pos, text, ctx):
+            pos, res = child(pos, text, ctx)
+            if not ctx.tags:
+                raise _Fail()
+            expect = ctx.tags.pop()
+            if (res.lower() != expect.lower()) if ignore_case else (res != expect):
+                raise _Fail()
+            return pos, res
+        return process
+
 
 class EmptyQuotedString(Parser):
     def __init__(self, chars):
@@ -1214,6 +1737,9 @@ class EmptyQuotedString(Parser):
     def process(self, pos, data, ctx):
         return self.children[0].process(pos, data, ctx)
 
+    def _compile(self, compile):
+        return compile(self.children[0])
+
 
 def _make_number(sign, int_part, frac_part):
     tmp = sign + int_part + ("".join(frac_part) if frac_part else "")
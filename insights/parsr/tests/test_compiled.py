@@ -0,0 +1,116 @@
+import string
+
+from insights.parsr import (AnyChar, Char, EndTagName, EOF, EOL, EnclosedComment, Forward, HangingString,
+                            InSet, Letters, Literal, Many, Mark, Number, OneLineComment, Opt, PosMarker, QuotedString,
+                            StartTagName, String, WithIndent, WS, WSChar)
+
+
+def plain(value):
+    if isinstance(value, Mark):
+        return (value.lineno, value.col, value.value)
+    if isinstance(value, list):
+        return [plain(v) for v in value]
+    return value
+
+
+def both(parser, data):
+    results = []
+    for fast in (False, True):
+        try:
+            results.append(plain(parser(data, fast=fast)))
+        except Exception as ex:
+            lines = str(ex).splitlines()
+            # the tracebacks of function errors are from different frames
+            results.append((lines[0], lines[-1]) if " raised" in lines[0] else str(ex))
+    assert results[0] == results[1]
+    return results[1]
+
+
+def boom(_):
+    raise Exception("Boom")
+
+
+def test_compiled_strings():
+    escaped = Char('"') >> String(set(string.printable) - set('"\\'), '"\\') << Char('"')
+    for data in ['"abc"', r'"a\"b\\c\d"', '"a\\', '"', '""']:
+        both(escaped, data)
+    assert both(escaped, r'"a\"b\\c"') == r'a"b\c'
+
+    word = String(string.ascii_letters, min_length=3)
+    assert both(word, "abcd1") == "abcd"
+    assert both(word, "ab1").startswith("At line 1 column 1")
+
+    assert both(QuotedString, "'a b'") == "a b"
+    assert both(Literal("true", value=True, ignore_case=True), "TRUE") is True
+    assert both(Literal("true", ignore_case=True), "TrUe") == "TrUe"
+    assert both(Literal("true") << EOF, "true") == "true"
+    both(Literal("true") << EOF, "tru")
+
+
+def test_compiled_many_and_until():
+    assert both(Many(WSChar | EOL, lower=1), " \t\n\rx") == [" ", "\t", "\n", "\r"]
+    both(Many(WSChar | EOL, lower=1), "x")
+    assert both(Many(Char("a") + Char("b")), "ababa") == [["a", "b"], ["a", "b"]]
+    assert both(AnyChar.until(InSet("\r\n")), "abc\ndef") == list("abc")
+    assert both(AnyChar.until(Literal("*/")), "a*b*/c") == list("a*b")
+    assert both(AnyChar.until(Literal("*/")), "abc") == list("abc")
+    assert both(AnyChar.until(EOF), "abc") == list("abc")
+    assert both(Char("a").until(Char("b")), "aaabc") == list("aaa")
+    assert both(EnclosedComment("/*", "*/"), "/* x */") == " x "
+    assert both(OneLineComment("#") << Opt(EOL), "# x\n") == [" ", "x"]
+
+
+def test_compiled_context():
+    tag = Char("<") >> StartTagName(Letters) << Char(">")
+    end = Char("<") >> Char("/") >> EndTagName(Letters, ignore_case=True) << Char(">")
+    doc = Forward()
+    doc <= tag + Many(doc) + end
+    assert both(doc, "<a><b></B></a>")
+    both(doc, "<a><b></a></b>")
+
+    key = WS >> PosMarker(String(string.ascii_letters)) << WS
+    value = WS >> HangingString(set(string.printable) - set("\r\n"))
+    pair = WithIndent(key + Opt(Char("=") >> value))
+    data = "a = 1\n  2 # c\nb = 3\n"
+    assert both(Many(pair), data) == [[(1, 1, "a"), "1 2"], [(3, 1, "b"), "3"]]
+
+
+def test_compiled_errors():
+    number = WS >> Number << WS
+    both(number, "1.5")
+    assert both(number, "x").startswith("At line 1 column 1")
+    assert both(Char("a").map(boom), "a")[1] == "Exception: Boom"
+    assert both(Opt(Char("a").map(boom)) + Char("a"), "a")[1] == "Exception: Boom"
+
+
+def test_compiled_function_error_not_retried():
+    calls = []
+
+    def count(_):
+        calls.append(1)
+        raise Exception("Boom")
+
+    p = Many(Char("a")).map(count)
+    for fast in (False, True):
+        del calls[:]
+        try:
+            p("aa", fast=fast)
+        except Exception as ex:
+            assert str(ex).startswith("At line 1 column 3: Map raised")
+            assert "Boom" in str(ex)
+        else:
+            assert False, "Boom wasn't raised"
+        assert len(calls) == 1
+
+
+def test_compiled_grammar_changes():
+    a = Char("a")
+    seq = a + a
+    assert seq("aa") == ["a", "a"]
+    # the Sequence accumulates the parser
+    seq + Char("b")
+    assert seq("aab") == ["a", "a", "b"]
+    seq.debug()
+    assert seq._compiled_process() is None
+    seq.debug(False)
+    assert seq._compiled_process() is not None
@@ -10,12 +10,87 @@ template to ensure it is loaded.
 """
 
 import os
+import signal
 import time
 
 DEFAULT_SHELL_TIMEOUT = 10
 """ int: Default timeout in seconds for ctx.shell_out() commands, must be provided as an arg """
 
 
+class PackageCache(object):
+    """
+    Memoizes the RPM packages owning files, so the datasources of a collection
+    resolve and query a batch of files with a single ``readlink -e`` and a
+    single ``rpm -qf`` instead of two commands per file.
+    :func:`insights.collect.collect` clears it at the start of every
+    collection.
+
+    Attributes:
+        queries (int): the number of ``readlink`` and ``rpm`` commands run.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._resolved = {}
+        self._packages = {}
+        self.queries = 0
+
+    def _lookup(self, ctx, cmd, args, cache, failed, **kwargs):
+        args = sorted(set(a for a in args if a not in cache))
+        if not args:
+            return
+        self.queries += 1
+        rc, output = ctx.shell_out(
+            "{0} {1}".format(cmd, " ".join(args)), timeout=DEFAULT_SHELL_TIMEOUT, keep_rc=True, **kwargs
+        )
+        if len(args) == 1:
+            cache[args[0]] = output[0] if rc == 0 and output else None
+        elif len(output) == len(args):
+            # a line per argument in order, the errors among them
+            cache.update((a, None if rc and failed(a, l) else l) for a, l in zip(args, output))
+        else:
+            # the lines can't be matched to the arguments when a file is
+            # missing or owned by several packages, query the halves
+            # separately
+            half = len(args) // 2
+            self._lookup(ctx, cmd, args[:half], cache, failed, **kwargs)
+            self._lookup(ctx, cmd, args[half:], cache, failed, **kwargs)
+
+    def get_packages(self, ctx, file_paths):
+        """
+        Get the RPM packages that own the specified files
+
+        Arguments:
+            ctx: The current execution context
+            file_paths(list): The full paths of the files for RPM query
+
+        Returns:
+            dict: The name of the RPM package that provides each file in
+            ``file_paths``, or None if the file is not associated with an RPM.
+        """
+        self._lookup(ctx, "/usr/bin/readlink -e", file_paths, self._resolved,
+                     lambda path, line: not line.startswith("/"))
+        resolved = dict((p, self._resolved[p]) for p in file_paths)
+        # the errors of rpm name the file, the package names never do
+        self._lookup(ctx, "/usr/bin/rpm -qf", filter(None, resolved.values()), self._packages,
+                     lambda path, line: path in line, signum=signal.SIGTERM)
+        return dict((p, self._packages[r] if r else None) for p, r in resolved.items())
+
+
+PACKAGE_CACHE = PackageCache()
+""" PackageCache: The RPM packages owning the files queried in the collection """
+
+
+def get_packages(ctx, file_paths):
+    """
+    Get the RPM packages that own the specified files, see
+    :meth:`PackageCache.get_packages`.
+    """
+    return PACKAGE_CACHE.get_packages(ctx, file_paths)
+
+
 def get_running_commands(ps, ctx, commands):
     """
     Search for a list of commands in Ps combiner output and returns the full path
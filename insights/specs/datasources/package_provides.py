@@ -3,7 +3,6 @@ Custom datasource for package_provides
 """
 
 import logging
-import signal
 
 from insights.combiners.ps import Ps
 from insights.core.context import HostContext
@@ -13,7 +12,7 @@ from insights.core.plugins import datasource
 from insights.core.spec_factory import DatasourceProvider
 from insights.specs import Specs
 
-from . import get_running_commands, DEFAULT_SHELL_TIMEOUT
+from . import get_packages, get_running_commands
 
 logger = logging.getLogger(__name__)
 
@@ -30,18 +29,7 @@ def get_package(ctx, file_path):
         str: The name of the RPM package that provides the ``file``
         or None if file is not associated with an RPM.
     """
-    rc, resolved = ctx.shell_out(
-        "/usr/bin/readlink -e {0}".format(file_path), timeout=DEFAULT_SHELL_TIMEOUT, keep_rc=True
-    )
-    if rc == 0 and resolved:
-        rc, pkg = ctx.shell_out(
-            "/usr/bin/rpm -qf {0}".format(resolved[0]),
-            timeout=DEFAULT_SHELL_TIMEOUT,
-            keep_rc=True,
-            signum=signal.SIGTERM,
-        )
-        if rc == 0 and pkg:
-            return pkg[0]
+    return get_packages(ctx, [file_path])[file_path]
 
 
 @datasource(Ps, HostContext)
@@ -70,8 +58,10 @@ def cmd_and_pkg(broker):
 
     if commands:
         pkg_cmd = list()
-        for cmd in get_running_commands(broker[Ps], broker[HostContext], list(commands)):
-            pkg = get_package(broker[HostContext], cmd)
+        cmds = get_running_commands(broker[Ps], broker[HostContext], list(commands))
+        pkgs = get_packages(broker[HostContext], cmds)
+        for cmd in cmds:
+            pkg = pkgs[cmd]
             if pkg is not None:
                 pkg_cmd.append("{0} {1}".format(cmd, pkg))
         if pkg_cmd:
@@ -45,11 +45,24 @@ client:
     - name: insights.specs.Specs
       enabled: true
 
+  # Write the metadata of the persisted components to a single indexed
+  # "meta_data.pack" file instead of a file per component under "meta_data".
+  packed_meta: false
+
   run_strategy:
     name: serial
     args:
       max_workers: null
 
+  # Set "enabled" to true to run the commands of the persisted command specs in
+  # a pool of threads while the other components are evaluated. "timeout" is
+  # the maximum number of seconds any command may take. A command runs until
+  # the smaller of this timeout and the timeout of its spec or its context.
+  command_scheduler:
+    enabled: false
+    max_workers: 4
+    timeout: null
+
 plugins:
   # disable everything by default
   # defaults to false if not specified.
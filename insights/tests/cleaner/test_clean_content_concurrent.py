@@ -0,0 +1,153 @@
+import re
+import sys
+import threading
+import time
+
+from six.moves import queue
+
+from insights.cleaner import Cleaner
+from insights.client.config import InsightsConfig
+
+HOSTNAME = 'test1.abc.com'
+KEYWORDS = ['secret', 'project']
+
+
+def spec(i):
+    # specs share most of the addresses, so threads race to add them
+    return [
+        "test1 10.0.%d.%d via 10.1.0.%d dev eth0 lite%d.abc.com\n" % (i % 5, j, j % 7, j % 11)
+        + "link/ether 52:54:00:%02x:%02x:0a inet6 2001:db8::%x:%x secret project%d\n" % (i % 9, j, i % 13, j, j)
+        for j in range(30)
+    ]
+
+
+def cleaner():
+    conf = InsightsConfig(obfuscate=True, obfuscate_hostname=True, obfuscation_list=['ipv4', 'ipv6', 'hostname', 'mac'],
+                          hostname=HOSTNAME)
+    return Cleaner(conf, {'keywords': KEYWORDS}, HOSTNAME)
+
+
+def clean_in_threads(pp, specs, workers):
+    """
+    Cleans the `specs` with a number of threads, and returns the results in
+    the order of the `specs`.
+    """
+    todo = queue.Queue()
+    for i in range(len(specs)):
+        todo.put(i)
+    results = {}
+
+    def clean():
+        while True:
+            try:
+                i = todo.get_nowait()
+            except queue.Empty:
+                return
+            results[i] = pp.clean_content(specs[i])
+
+    threads = [threading.Thread(target=clean) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return [results[i] for i in range(len(specs))]
+
+
+def test_clean_content_concurrently():
+    specs = [spec(i) for i in range(120)]
+    serial = cleaner()
+    expected = [serial.clean_content(s) for s in specs]
+
+    pp = cleaner()
+    # switch between the threads as often as possible to widen the races
+    if hasattr(sys, 'setswitchinterval'):
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+    else:  # pragma: no cover # python 2
+        interval = sys.getcheckinterval()
+        sys.setcheckinterval(1)
+    try:
+        results = clean_in_threads(pp, specs, 8)
+    finally:
+        if hasattr(sys, 'setswitchinterval'):
+            sys.setswitchinterval(interval)
+        else:  # pragma: no cover # python 2
+            sys.setcheckinterval(interval)
+
+    def mapping(c, name):
+        return sorted((m['original'], m['obfuscated']) for m in c.obfuscate[name].mapping())
+
+    # the hashed addresses and keywords don't depend on the order
+    for name in ('ipv6', 'mac', 'keyword'):
+        assert mapping(pp, name) == mapping(serial, name)
+
+    for name in ('ipv4', 'hostname'):
+        originals, obfuscated = zip(*mapping(pp, name))
+        assert list(originals) == [m[0] for m in mapping(serial, name)]
+        # a single obfuscated value for each original
+        assert len(set(obfuscated)) == len(obfuscated)
+
+    # the numbered IPs and hosts are given without gaps
+    ipv4 = pp.obfuscate['ipv4'].mapping()
+    assert sorted(int(m['obfuscated'].split('.')[-1]) for m in ipv4) == list(range(1, len(ipv4) + 1))
+    hosts = sorted(int(re.match(r'host(\d+)\.', m['obfuscated']).group(1))
+                   for m in pp.obfuscate['hostname'].mapping() if m['obfuscated'].startswith('host'))
+    assert hosts == list(range(2, len(hosts) + 2))
+
+    # the contents are cleaned with the same mapping
+    ips = dict((m['original'], m['obfuscated']) for m in ipv4)
+    hns = dict((m['original'], m['obfuscated']) for m in pp.obfuscate['hostname'].mapping())
+    for s, result, exp in zip(specs, results, expected):
+        assert len(result) == len(exp)
+        for line, cleaned, serial_cleaned in zip(s, result, exp):
+            original_ips = re.findall(r'10\.\d+\.\d+\.\d+', line)
+            assert re.findall(r'10\.230\.230\.\d+', cleaned) == [ips[ip] for ip in original_ips]
+            lite = re.search(r'lite\d+\.abc\.com', line).group(0)
+            assert hns[lite] in cleaned
+            assert cleaned.split('inet6')[1] == serial_cleaned.split('inet6')[1]
+            assert cleaned.split('link/ether')[1].split()[0] == serial_cleaned.split('link/ether')[1].split()[0]
+
+
+class YieldingDict(dict):
+    """
+    Switches to the other threads on lookups to widen the race windows.
+    """
+    def get(self, key, default=None):
+        value = super(YieldingDict, self).get(key, default)
+        time.sleep(0.001)
+        return value
+
+    def __contains__(self, key):
+        found = super(YieldingDict, self).__contains__(key)
+        time.sleep(0.001)
+        return found
+
+
+def test_clean_content_concurrently_threads():
+    pp = cleaner()
+    ipv4, hostname = pp.obfuscate['ipv4'], pp.obfuscate['hostname']
+    ipv4._ip_idx = YieldingDict(ipv4._ip_idx)
+    hostname._hn_idx = YieldingDict(hostname._hn_idx)
+    start = threading.Event()
+    results = {}
+
+    def clean(i):
+        start.wait()
+        results[i] = pp.clean_content("10.0.0.%d 10.0.1.%d lite%d.abc.com" % (i % 4, i, i % 4))
+
+    threads = [threading.Thread(target=clean, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    start.set()
+    for t in threads:
+        t.join()
+
+    ips = ipv4.mapping()
+    assert len(ips) == 20
+    assert sorted(m['obfuscated'] for m in ips) == sorted(set(m['obfuscated'] for m in ips))
+    hosts = hostname.mapping()
+    # the system hostname and the 4 others
+    assert len(hosts) == 5
+    assert len(set(m['obfuscated'] for m in hosts)) == 5
+    for i, result in results.items():
+        assert result == pp.clean_content("10.0.0.%d 10.0.1.%d lite%d.abc.com" % (i % 4, i, i % 4))
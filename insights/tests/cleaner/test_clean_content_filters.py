@@ -1,6 +1,10 @@
+from collections import OrderedDict
+
+from mock.mock import patch
 from pytest import mark
 
 from insights.cleaner import Cleaner
+from insights.cleaner.filters import AllowFilter, AllowMatcher
 from insights.client.config import InsightsConfig
 
 test_data = 'testabc\nabcd\n \n\n1234\npwd: p4ssw0rd\ntest123\npwd:abc\n'.splitlines()
@@ -42,3 +46,104 @@ def test_clean_content_filters_allowlist_not(obfuscate):
     ret = pp.clean_content(test_data, allowlist=None)
     # content IS NOT changed
     assert test_data == ret
+
+
+def _filter_content(lines, allowlist):
+    # the plain per-key check which filter_content must agree with
+    allowlist = allowlist.copy()
+    result = []
+    for line in reversed(lines):
+        for a_key in list(allowlist.keys()):
+            if a_key in line:
+                allowlist[a_key] -= 1
+                allowlist.pop(a_key) if allowlist[a_key] == 0 else None
+                result.append(line)
+                break
+    result.reverse()
+    return result
+
+
+@mark.parametrize("scan_max_keys", [50, 0])
+def test_allow_matcher_first(scan_max_keys):
+    with patch.object(AllowMatcher, 'scan_max_keys', scan_max_keys):
+        matcher = AllowMatcher(OrderedDict((k, 1) for k in ('he', 'she', 'his', 'hers', 'x')))
+        empty = AllowMatcher(OrderedDict([('', 1), ('hers', 1)]))
+    everything = dict.fromkeys(matcher.keys, 1)
+    # the first key in the order of the allowlist
+    assert matcher.first('ushers', everything) == 'he'
+    assert matcher.first('ushers', {'she': 1, 'hers': 1}) == 'she'
+    assert matcher.first('ushers', {'hers': 1}) == 'hers'
+    assert matcher.first('ahishers', {'his': 1, 'hers': 1}) == 'his'
+    assert matcher.first('this x', {'x': 1, 'she': 1}) == 'x'
+    assert matcher.first('ushers', {'his': 1}) is None
+    assert matcher.first('nothing', everything) is None
+    assert matcher.first('', everything) is None
+    assert empty.first('ushers', {'hers': 1}) == 'hers'
+    assert empty.first('anything', {'': 1, 'hers': 1}) == ''
+    assert empty.first('', {'': 1}) == ''
+
+
+ALLOWLISTS = [
+    {'test': 2, 'pwd': 1},
+    {'pwd': 1, 'test': 2, 'abc': 1},
+    {'abc': 3, 'bc': 1, 'c': 2, '12': 1},
+    {'p4': 1, 'pwd:': 5, 'd: p': 1},
+    {'': 2, 'test': 1},
+    {'no such key': 1},
+    {},
+]
+
+
+def _many_keys_allowlist():
+    words = ['kernel', 'error', 'failed', 'usb', 'eth0', 'link', 'pwd', 'test', 'sd', 'abc']
+    allowlist = OrderedDict(('%s%d' % (words[i % len(words)], i), i % 3 + 1) for i in range(300))
+    allowlist.update([('test', 2), ('pwd:', 1), ('p', 4), ('k', 1)])
+    return allowlist
+
+
+@mark.parametrize("scan_max_keys", [1000, 0])
+def test_filter_content_many_keys(scan_max_keys):
+    allowlist = _many_keys_allowlist()
+    lines = test_data * 5 + ['%s and %s' % (k, l) for k in sorted(allowlist) for l in ('kernel1', 'usb33', '')]
+    with patch.object(AllowMatcher, 'scan_max_keys', scan_max_keys):
+        matcher = AllowMatcher(allowlist)
+    assert (matcher._prefixes is None) == bool(scan_max_keys)
+    assert AllowFilter.filter_content(lines, allowlist, matcher) == _filter_content(lines, allowlist)
+
+
+@mark.parametrize("scan_max_keys", [50, 0])
+@mark.parametrize("allowlist", ALLOWLISTS)
+def test_filter_content_matcher(allowlist, scan_max_keys):
+    lines = test_data * 5 + ['abcpwd: test', 'xyz p4ssw0rd abc']
+    expected = _filter_content(lines, allowlist)
+    assert AllowFilter.filter_content(lines, allowlist) == expected
+    with patch.object(AllowMatcher, 'scan_max_keys', scan_max_keys):
+        matcher = AllowMatcher(allowlist)
+    assert AllowFilter.filter_content(lines, allowlist, matcher) == expected
+    # the matcher is reusable
+    assert AllowFilter.filter_content(lines, allowlist, matcher) == expected
+    # a matcher of other allowlist is not used
+    assert AllowFilter.filter_content(lines, allowlist, AllowMatcher({'1234': 1})) == expected
+
+
+@mark.parametrize("allowlist", ALLOWLISTS)
+def test_clean_content_matcher(allowlist):
+    lines = [l for l in test_data * 5 if l] + ['abcpwd: test', 'xyz p4ssw0rd abc']
+    expected = _filter_content(lines, allowlist)
+    pp = Cleaner(InsightsConfig(), None)
+    # the lines are kept by AllowFilter.parse_line with the matcher
+    assert pp.clean_content(lines, allowlist=allowlist, matcher=AllowMatcher(allowlist)) == expected
+    assert pp.clean_content(lines, allowlist=allowlist) == expected
+    # a matcher of other allowlist is not used
+    assert pp.clean_content(lines, allowlist=allowlist, matcher=AllowMatcher({'1234': 1})) == expected
+
+
+def test_parse_line_matcher_cached():
+    allowlist = {'test': 2, 'pwd': 1}
+    allow_filter = AllowFilter()
+    with patch('insights.cleaner.filters.AllowMatcher', wraps=AllowMatcher) as matcher:
+        kept = [allow_filter.parse_line(line, allowlist=allowlist) for line in reversed(test_data)]
+        assert matcher.call_count == 1
+        allow_filter.parse_line('test', allowlist={'test': 1})
+        assert matcher.call_count == 2
+    assert [l for l in reversed(kept) if l] == ['testabc', 'test123', 'pwd:abc']
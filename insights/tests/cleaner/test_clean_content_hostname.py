@@ -56,3 +56,24 @@ def test_obfuscate_hostname_empty_line(hn):
     pp = Cleaner(c, {})  # passed empty hostname to cleaner, determain it
     actual = pp.clean_content(line)
     assert actual == line
+
+
+def test_obfuscate_hostname_many_unique():
+    count = 10000
+    hostname = 'test1.abc.com'
+    c = InsightsConfig(obfuscate=True, obfuscate_hostname=True, hostname=hostname)
+    pp = Cleaner(c, {}, hostname)
+    nodes = ["node%d.abc.com" % i for i in range(count)]
+    lines = ["connected to %s\n" % node for node in nodes]
+
+    result = pp.clean_content(lines + lines)
+
+    assert result[:count] == result[count:]
+    assert len(set(result)) == count
+    mapping = dict((m['original'], m['obfuscated']) for m in pp.obfuscate['hostname'].mapping())
+    # the system hostname plus every node
+    assert set(mapping) == set(nodes + [hostname])
+    assert len(set(mapping.values())) == count + 1
+    # lines are processed in reverse order
+    assert mapping[nodes[-1]] == "host2.example.com"
+    assert result[:count] == ["connected to %s\n" % mapping[node] for node in nodes]
@@ -167,3 +167,22 @@ def test_obfuscate_ipv4_false_positive(_ip2db, obfuscate, obfuscation_list, orig
     # "no_obfuscate=['ipv4']
     actual = pp.clean_content(original, no_obfuscate=['ipv4'])
     assert actual == original
+
+
+def test_obfuscate_ipv4_many_unique():
+    count = 10000
+    c = InsightsConfig(obfuscation_list=['ipv4'])
+    pp = Cleaner(c, {})
+    ips = ["172.%d.%d.%d" % (16 + (i >> 16), (i >> 8) & 255, i & 255) for i in range(count)]
+    lines = ["tcp 0 0 %s:22 ESTABLISHED\n" % ip for ip in ips]
+
+    result = pp.clean_content(lines + lines)
+
+    assert result[:count] == result[count:]
+    assert len(set(result)) == count
+    mapping = dict((m['original'], m['obfuscated']) for m in pp.obfuscate['ipv4'].mapping())
+    assert set(mapping) == set(ips)
+    assert len(set(mapping.values())) == count
+    # lines are processed in reverse order
+    assert mapping[ips[-1]] == '10.230.230.1'
+    assert result[:count] == ["tcp 0 0 %s:22 ESTABLISHED\n" % mapping[ip] for ip in ips]
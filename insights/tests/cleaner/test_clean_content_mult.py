@@ -1,3 +1,5 @@
+from mock import patch
+
 from insights.cleaner import Cleaner
 from insights.client.config import InsightsConfig
 
@@ -27,3 +29,41 @@ def test_clean_content_keyword_with_hostname_and_ip():
     assert 'day' not in result
     assert 'keyword0' in result
     assert 'keyword1' in result
+
+
+def test_clean_content_prescreen_identical():
+    hostname = 'test1.abc.com'
+    lines = [
+        "",
+        "nothing to see here\n",
+        "test1 booted\n",
+        "test1.abc.com, 10.0.0.1 test1.abc.loc, 20.1.4.7 smtp.abc.com, 10.1.2.7 lite.abc.com\n",
+        "what's your name? what day is today? 127.0.0.1\n",
+        "password=abc123 for link/ether 52:54:00:3f:5e:a1 brd ff:ff:ff:ff:ff:ff\n",
+        "inet6 2001:db8:85a3::8a2e:370:7334/64 scope global\n",
+        "12:34:56.789 timestamp only\n",
+        "a line to be redacted\n",
+    ]
+    conf = InsightsConfig(obfuscate=True, obfuscate_ipv6=True, obfuscate_hostname=True, obfuscate_mac=True, hostname=hostname)
+    rm_conf = {'keywords': ['name', 'day'], 'patterns': ['redacted']}
+
+    def unscreened(parsers):
+        return [(p, kw, None) for p, kw in parsers], None
+
+    for allowlist in (None, {}, {'password': 1, 'day': 2, '10.': 5, '52:54': 1, 'inet6': 1}):
+        for no_obfuscate in (None, ['hostname', 'password']):
+            expected = Cleaner(conf, rm_conf, hostname)
+            with patch('insights.cleaner._compile_parsers', unscreened):
+                expected = expected.clean_content(lines, no_obfuscate=no_obfuscate, allowlist=allowlist)
+            result = Cleaner(conf, rm_conf, hostname).clean_content(lines, no_obfuscate=no_obfuscate, allowlist=allowlist)
+            assert result == expected
+
+
+def test_clean_content_prescreen_regex_patterns():
+    conf = InsightsConfig()
+    lines = ["abcd\n", "a1b\n", "xyz\n"]
+    pp = Cleaner(conf, {'patterns': {'regex': ['a[0-9]b', 'zz$']}})
+    assert pp.clean_content(lines) == ["abcd\n", "xyz\n"]
+    # groups can't be combined, the patterns are tried one by one
+    pp = Cleaner(conf, {'patterns': {'regex': ['(a)[0-9]b', 'y(z)']}})
+    assert pp.clean_content(lines) == ["abcd\n"]
@@ -57,7 +57,7 @@ def test_clean_file_obfuscate_disabled_by_no_obfuscate():
     arch.delete_archive_dir()
 
 
-@patch("insights.cleaner.Cleaner.clean_content")
+@patch("insights.cleaner.Cleaner.clean_stream", return_value=[])
 def test_clean_file_non_exist(func):
     conf = InsightsConfig(obfuscate=True)
     arch = InsightsArchive(conf)
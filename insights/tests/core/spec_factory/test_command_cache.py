@@ -0,0 +1,79 @@
+import shlex
+
+import pytest
+from mock.mock import patch
+
+from insights.core.context import HostContext
+from insights.core.dr import Broker
+from insights.core.exceptions import ContentException
+from insights.core.plugins import datasource
+from insights.core.spec_factory import COMMAND_CACHE, SAFE_ENV, CommandCache, foreach_execute
+from insights.util import which
+
+
+@datasource(HostContext)
+def pids(broker):
+    return [str(i) for i in range(50)]
+
+
+each_pid = foreach_execute(pids, "echo /proc/%s/status")
+
+
+@pytest.fixture()
+def command_cache():
+    COMMAND_CACHE.clear()
+    yield COMMAND_CACHE
+    COMMAND_CACHE.clear()
+
+
+@pytest.mark.parametrize("cmd", [
+    "ls -la /tmp",
+    "\tls  -la\n/tmp ",
+    "echo 'a b' \"c d\"",
+    "echo a\\ b",
+    "echo a\x0bb",
+    "",
+])
+def test_command_cache_split(cmd):
+    cache = CommandCache()
+    assert cache.split(cmd) == shlex.split(cmd)
+    args = cache.split(cmd)
+    args.append("x")
+    assert cache.split(cmd) == shlex.split(cmd)
+
+
+def test_command_cache_which():
+    cache = CommandCache()
+    with patch("insights.core.spec_factory.which", side_effect=which) as which_:
+        assert cache.which("sh", env=SAFE_ENV) == which("sh", env=SAFE_ENV)
+        assert cache.which("sh", env=SAFE_ENV) == which("sh", env=SAFE_ENV)
+        assert cache.which("no_such_command", env=SAFE_ENV) is None
+        assert cache.which("no_such_command", env=SAFE_ENV) is None
+        # another PATH
+        assert cache.which("sh", env={"PATH": "/no/such/dir"}) is None
+    assert which_.call_count == 3
+    assert (cache.hits, cache.misses) == (2, 3)
+    assert cache.saved_time >= 0
+
+    cache.clear()
+    assert (cache.hits, cache.misses, cache.saved_time) == (0, 0, 0)
+
+
+def test_command_cache_foreach_execute(command_cache):
+    broker = Broker()
+    broker[HostContext] = HostContext()
+    broker[pids] = pids(broker)
+    with patch("insights.core.spec_factory.which", side_effect=which) as which_:
+        providers = each_pid(broker)
+    assert len(providers) == 50
+    assert which_.call_count == 1
+    assert (command_cache.hits, command_cache.misses) == (49, 1)
+    assert providers[3].create_args() == [["echo", "/proc/3/status"]]
+    assert providers[3].content == ["/proc/3/status"]
+
+    with patch("insights.core.spec_factory.which", return_value=None):
+        # the cached path is used
+        each_pid(broker)
+        command_cache.clear()
+        with pytest.raises(ContentException):
+            each_pid(broker)
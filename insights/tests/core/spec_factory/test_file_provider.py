@@ -1,8 +1,10 @@
 import os
 import os.path
 import pytest
+import subprocess
+from mock.mock import patch
 
-from insights.core.spec_factory import FileProvider
+from insights.core.spec_factory import FileProvider, RawFileProvider
 
 
 @pytest.fixture(scope="module")
@@ -26,3 +28,17 @@ def test_repr(sample_file):
     provider = DummyFileProvider(relpath, root=root)
     # example: DummyFileProvider('/tmp/pytest0/test_file_provider/sample_file.txt')
     assert repr(provider) == "DummyFileProvider('%s/%s')" % (root, relpath)
+
+
+def test_raw_file_provider_write(tmpdir):
+    root = str(tmpdir.mkdir("root"))
+    data = b"raw \x00\xff data\n" * 10000
+    with open(os.path.join(root, "raw_file"), "wb") as f:
+        f.write(data)
+    provider = RawFileProvider("raw_file", root=root)
+    dst = str(tmpdir.join("out", "raw_file"))
+    with patch.object(subprocess, "Popen") as popen:
+        provider.write(dst)
+    assert not popen.called
+    with open(dst, "rb") as f:
+        assert f.read() == data
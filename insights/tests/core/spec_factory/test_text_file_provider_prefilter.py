@@ -0,0 +1,134 @@
+# -*- coding: UTF-8 -*-
+import os
+from collections import defaultdict
+
+import pytest
+from mock.mock import patch
+
+from insights.core import filters
+from insights.core.context import HostContext
+from insights.core.filters import add_filter
+from insights.core.spec_factory import SAFE_ENV, RegistryPoint, SpecSet, TextFileProvider, simple_file
+from insights.util import fs, subproc
+
+SAMPLE_FILE = "sample_file.log"
+
+
+class Specs(SpecSet):
+    filtered_file = RegistryPoint(filterable=True)
+    grep_file = RegistryPoint(filterable=True, prefilter="grep")
+
+
+class Stuff(Specs):
+    filtered_file = simple_file(SAMPLE_FILE)
+    grep_file = simple_file(SAMPLE_FILE)
+
+
+@pytest.fixture()
+def reset_filters():
+    original_cache = filters._CACHE
+    original_filters = filters.FILTERS
+    filters._CACHE = {}
+    filters.FILTERS = defaultdict(dict)
+    yield
+    filters._CACHE = original_cache
+    filters.FILTERS = original_filters
+
+
+def sample(tmpdir, data):
+    root = str(tmpdir.mkdir("root"))
+    with open(os.path.join(root, SAMPLE_FILE), 'wb') as fd:
+        fd.write(data)
+    return root
+
+
+def provider(root, ds=Stuff.filtered_file):
+    return TextFileProvider(SAMPLE_FILE, root=root, ds=ds, ctx=HostContext())
+
+
+def stream(root):
+    try:
+        return list(provider(root).stream())
+    except Exception as ex:
+        # e.g. the content cannot be decoded
+        return type(ex)
+
+
+SAMPLE_DATA = b''.join(
+    b'- %d test data from 10.0.%d.%d\r\n' % (i, i % 7, i % 250) for i in range(3000)
+) + b'password=secret\rnew line \xe2\x9c\x93 \xff\n\ndata last line without a newline'
+
+
+@pytest.mark.parametrize("patterns", [
+    ["data from 10.0.3"],
+    ["10.0.1.", "- 29", "newline"],
+    ["data"],
+    ["not found"],
+    ["✓", "\r"],
+    ["from\n.1"],
+])
+def test_prefilter_native_is_identical(reset_filters, tmpdir, patterns):
+    root = sample(tmpdir, SAMPLE_DATA)
+    for pattern in patterns:
+        add_filter(Specs.filtered_file, pattern)
+
+    with patch('insights.core.spec_factory.PREFILTER', 'grep'):
+        grep = provider(root)
+        expected = grep.load()
+        expected_rc = grep.rc
+        expected_stream = stream(root)
+    with patch('insights.core.spec_factory.PREFILTER', 'native'):
+        native = provider(root)
+        with patch.object(subproc, 'call') as call:
+            assert native.load() == expected
+            assert stream(root) == expected_stream
+        assert native.rc == expected_rc
+        assert not call.called
+
+
+def test_prefilter_native_chunks(tmpdir):
+    root = sample(tmpdir, SAMPLE_DATA)
+    path = os.path.join(root, SAMPLE_FILE)
+    patterns = ["data from 10.0.3", "- 29", "\xff", "line"]
+    args = ["grep", "-F", "--", "\n".join(patterns), path]
+    expected = subproc.call([args], env=SAFE_ENV, keep_rc=True, encoding='latin-1')[1]
+
+    with open(str(tmpdir.join("out")), 'w+b') as out:
+        count = fs.filter_lines(path, patterns, out, chunksize=100)
+        out.seek(0)
+        result = out.read()
+    assert result.decode('latin-1') == expected
+    assert count == expected.count("\n")
+
+
+@pytest.mark.parametrize("data", [b'', b'binary\0 data\n'])
+def test_prefilter_native_falls_back_to_grep(reset_filters, tmpdir, data):
+    root = sample(tmpdir, data)
+    add_filter(Specs.filtered_file, "data")
+
+    with patch('insights.core.spec_factory.PREFILTER', 'native'):
+        p = provider(root)
+        with patch.object(p.ctx, 'shell_out', return_value=(1, [])) as shell_out:
+            assert p.load() == []
+        assert shell_out.called
+
+
+@pytest.mark.parametrize("mode, native", [("native", True), ("auto", True), ("grep", False)])
+def test_prefilter_mode(reset_filters, tmpdir, mode, native):
+    root = sample(tmpdir, SAMPLE_DATA)
+    add_filter(Specs.filtered_file, "data")
+    add_filter(Specs.grep_file, "data")
+
+    with patch('insights.core.spec_factory.PREFILTER', mode):
+        with patch('insights.core.spec_factory.fs.filter_lines', return_value=None) as filter_lines:
+            provider(root).load()
+            assert filter_lines.called is native
+            # the spec pre-filtered by grep only
+            filter_lines.reset_mock()
+            provider(root, Stuff.grep_file).load()
+            assert not filter_lines.called
+        with patch('insights.core.spec_factory.NATIVE_PREFILTER_MAX', 1024):
+            with patch('insights.core.spec_factory.fs.filter_lines', return_value=None) as filter_lines:
+                # too large for "auto"
+                provider(root).load()
+                assert filter_lines.called is (mode == "native")
@@ -0,0 +1,111 @@
+import os
+from collections import defaultdict
+
+import pytest
+from mock.mock import patch
+
+from insights.cleaner import Cleaner
+from insights.client.config import InsightsConfig
+from insights.core import filters
+from insights.core.context import HostContext
+from insights.core.exceptions import ContentException
+from insights.core.filters import add_filter
+from insights.core.spec_factory import RegistryPoint, SpecSet, TextFileProvider, simple_file
+
+SAMPLE_FILE = "sample_file.log"
+
+
+class Specs(SpecSet):
+    plain_file = RegistryPoint(filterable=False)
+    filtered_file = RegistryPoint(filterable=True)
+
+
+class Stuff(Specs):
+    plain_file = simple_file(SAMPLE_FILE)
+    filtered_file = simple_file(SAMPLE_FILE)
+
+
+@pytest.fixture()
+def reset_filters():
+    original_cache = filters._CACHE
+    original_filters = filters.FILTERS
+    filters._CACHE = {}
+    filters.FILTERS = defaultdict(dict)
+    yield
+    filters._CACHE = original_cache
+    filters.FILTERS = original_filters
+
+
+@pytest.fixture()
+def sample_file(tmpdir):
+    root = str(tmpdir.mkdir("root"))
+    with open(os.path.join(root, SAMPLE_FILE), 'wb') as fd:
+        for i in range(2000):
+            fd.write(b'- %d test data from 10.0.%d.%d\r\n' % (i, i % 7, i % 250))
+            if i % 100 == 0:
+                fd.write(b'password=secret%d\rnew line \xe2\x9c\x93\n\n' % i)
+        fd.write(b'the last line without a newline 192.168.0.1')
+    return root
+
+
+def provider(root, ds):
+    conf = InsightsConfig(obfuscate=True)
+    return TextFileProvider(SAMPLE_FILE, root=root, ds=ds, ctx=HostContext(), cleaner=Cleaner(conf, {}))
+
+
+def written(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("max_size", [None, 4096])
+def test_write_streaming_is_identical(reset_filters, sample_file, tmpdir, max_size):
+    max_size = max_size or os.path.getsize(os.path.join(sample_file, SAMPLE_FILE))
+    with patch('insights.core.spec_factory.MAX_CONTENT_SIZE', max_size):
+        streamed = provider(sample_file, Stuff.plain_file)
+        streamed.write(str(tmpdir.join("streamed")))
+        assert streamed._content is None
+
+        loaded = provider(sample_file, Stuff.plain_file)
+        assert loaded.content
+        loaded.write(str(tmpdir.join("loaded")))
+
+    assert written(str(tmpdir.join("streamed"))) == written(str(tmpdir.join("loaded")))
+
+
+def test_write_streaming_filtered_is_identical(reset_filters, sample_file, tmpdir):
+    add_filter(Specs.filtered_file, "data from 10.0.3", max_match=20)
+    add_filter(Specs.filtered_file, ["password", "last line"])
+
+    streamed = provider(sample_file, Stuff.filtered_file)
+    streamed.write(str(tmpdir.join("streamed")))
+    loaded = provider(sample_file, Stuff.filtered_file)
+    assert loaded.content
+    loaded.write(str(tmpdir.join("loaded")))
+
+    result = written(str(tmpdir.join("streamed")))
+    assert result == written(str(tmpdir.join("loaded")))
+    # the newest matches are kept
+    assert result.count(b"data from") == 20
+    assert b"- 1998 test data" in result
+    assert b"secret" not in result
+
+
+def test_write_streaming_empty_after_filtering(reset_filters, sample_file, tmpdir):
+    add_filter(Specs.filtered_file, "no such line")
+    p = provider(sample_file, Stuff.filtered_file)
+    with pytest.raises(ContentException):
+        p.write(str(tmpdir.join("streamed")))
+    assert not os.path.exists(str(tmpdir.join("streamed")))
+
+
+def test_write_streaming_not_utf8(reset_filters, tmpdir):
+    root = str(tmpdir.mkdir("root"))
+    with open(os.path.join(root, SAMPLE_FILE), 'wb') as fd:
+        fd.write(b'caf\xe9 from 10.0.0.1\n\xff\xfe binary\nlast line')
+
+    p = provider(root, Stuff.plain_file)
+    p.write(str(tmpdir.join("streamed")))
+    assert p._content is None
+    # the bytes that aren't UTF-8 are written back as they were read
+    assert written(str(tmpdir.join("streamed"))) == b'caf\xe9 from 10.230.230.1\n\xff\xfe binary\nlast line'
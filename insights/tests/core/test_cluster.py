@@ -0,0 +1,155 @@
+import os
+import tarfile
+from contextlib import closing
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("ansible")
+futures = pytest.importorskip("concurrent.futures")
+
+from pandas.testing import assert_frame_equal  # noqa: E402
+
+from insights import dr  # noqa: E402
+from insights.core import cluster  # noqa: E402
+from insights.core.context import HostArchiveContext  # noqa: E402
+from insights.core.plugins import fact  # noqa: E402
+from insights.core.spec_factory import RegistryPoint, SpecSet, simple_file  # noqa: E402
+from insights.specs import Specs  # noqa: E402
+
+HOSTS = ["host%d" % i for i in range(5)]
+
+
+class ClusterSpecs(SpecSet):
+    numbers = RegistryPoint()
+
+
+class ClusterArchiveSpecs(ClusterSpecs):
+    numbers = simple_file("numbers", context=HostArchiveContext)
+
+
+@fact(Specs.hostname, ClusterSpecs.numbers)
+def numbers(hostname, ds):
+    return [{"host": hostname.content[0], "number": int(n)} for n in ds.content]
+
+
+@fact(ClusterSpecs.numbers)
+def count(ds):
+    return {"count": len(ds.content)}
+
+
+@fact(ClusterSpecs.numbers)
+def unused(ds):
+    return {"unused": True}
+
+
+def _make_archives(tmpdir):
+    archives = []
+    for i, host in enumerate(HOSTS):
+        base = tmpdir.mkdir(host).mkdir("insights-%s" % host)
+        base.mkdir("insights_commands").join("hostname_-f").write(host)
+        base.join("numbers").write("\n".join(str(i * 10 + n) for n in range(i + 1)))
+        path = str(tmpdir.join("%s.tar" % host))
+        with closing(tarfile.open(path, "w")) as tf:
+            tf.add(str(base), os.path.basename(str(base)))
+        archives.append(path)
+    return archives
+
+
+def _graph():
+    # the machine ids are read from the hostname of the archives
+    dr.load_components("insights.specs.default", "insights.specs.insights_archive")
+    graph = dr.get_dependency_graph(cluster.machine_id)
+    graph.update(dr.get_dependency_graph(numbers))
+    graph.update(dr.get_dependency_graph(count))
+    return graph
+
+
+class CountingPool(object):
+    """
+    Evaluates the work in ``submit`` and counts the results that weren't
+    consumed yet.
+    """
+    def __init__(self):
+        self.submitted = 0
+        self.pending = 0
+        self.most_pending = 0
+
+    def submit(self, func, *args):
+        self.submitted += 1
+        self.pending += 1
+        self.most_pending = max(self.most_pending, self.pending)
+        pool = self
+        value = func(*args)
+
+        class Done(object):
+            def result(self):
+                pool.pending -= 1
+                return value
+
+        return Done()
+
+
+def test_process_cluster_pool(tmpdir):
+    archives = _make_archives(tmpdir)
+    graph = _graph()
+    serial = cluster.process_cluster(graph, archives, dr.Broker())
+
+    with futures.ThreadPoolExecutor(max_workers=3) as pool:
+        parallel = cluster.process_cluster(graph, archives, dr.Broker(), pool=pool, max_extractions=2)
+
+    for comp in (numbers, count):
+        assert_frame_equal(parallel[comp], serial[comp])
+    # the rows are in the order of the archives
+    assert list(parallel[count]["machine_id"]) == HOSTS
+    assert list(parallel[count]["count"]) == [1, 2, 3, 4, 5]
+    assert list(parallel[numbers]["number"]) == [0, 10, 11, 20, 21, 22, 30, 31, 32, 33, 40, 41, 42, 43, 44]
+    assert (parallel[numbers]["host"] == parallel[numbers]["machine_id"]).all()
+    assert unused not in parallel
+
+
+def test_process_archives_parallel_max_extractions(tmpdir):
+    archives = _make_archives(tmpdir)
+    pool = CountingPool()
+    results = list(cluster.process_archives_parallel(_graph(), archives, pool, max_extractions=2))
+
+    assert pool.submitted == len(archives)
+    assert pool.most_pending == 2
+    assert [r[count][0]["machine_id"] for r in results] == HOSTS
+
+
+def test_process_archives_only_graph(tmpdir):
+    archives = _make_archives(tmpdir)
+    graph = _graph()
+    for broker in cluster.process_archives(graph, archives[1:2]):
+        assert broker[count] == {"count": 2}
+        assert len(broker[numbers]) == 2
+        # the loaded components that aren't in the graph aren't evaluated
+        assert unused not in broker
+
+    extracted = tmpdir.mkdir("extracted")
+    with closing(tarfile.open(archives[1])) as tf:
+        tf.extractall(str(extracted))
+    for broker in cluster.process_archives(graph, [str(extracted)]):
+        assert broker[count] == {"count": 2}
+        assert unused not in broker
+
+
+def test_fact_frames():
+    assert cluster.FactFrames().chunk_size == cluster.FACT_CHUNK_SIZE
+    frames = cluster.FactFrames(chunk_size=3)
+    frames.add({numbers: [{"number": 0}, {"number": 1}], count: [{"count": 2}]})
+    assert not frames.frames
+    frames.add({numbers: [{"number": 2}, {"number": 3}], unused: []})
+    # converted once the chunk size is reached
+    assert len(frames.frames[numbers]) == 1
+    assert numbers not in frames.rows
+    frames.add({numbers: [{"number": 4}]})
+    frames.add({numbers: [{"number": 5}, {"number": 6}]})
+    assert len(frames.frames[numbers]) == 2
+
+    results = frames.finish()
+    assert_frame_equal(results[numbers], pd.DataFrame({"number": list(range(7))}))
+    assert_frame_equal(results[count], pd.DataFrame({"count": [2]}))
+    assert results[unused].empty
+    assert not frames.rows and not frames.frames
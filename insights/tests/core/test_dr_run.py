@@ -1,7 +1,13 @@
 import os
+import pickle
+import pytest
+import six
 import sys
-from insights import run, make_fail, make_pass
+
+from collections import defaultdict
+from insights import get_pool, run, make_fail, make_pass
 from insights.core import dr
+from insights.core.context import HostArchiveContext, HostContext, SerializedArchiveContext
 from insights.plugins import always_fires, never_fires
 from insights.specs import Specs
 from mock import patch
@@ -32,6 +38,21 @@ def stage4(common):
     return common
 
 
+@stage("boom")
+def stage5(boom):
+    raise Exception("stage5 failed")
+
+
+@stage(stage5)
+def stage6(s5):
+    return s5
+
+
+@stage(stage3)
+def stage7(s3):
+    return s3 + 1
+
+
 def test_run():
     broker = dr.Broker()
     broker["common"] = 3
@@ -46,6 +67,125 @@ def test_run():
     assert broker[stage4] == 3
 
 
+def test_run_lazy():
+    loaded = []
+
+    def load(value):
+        loaded.append(value)
+        return value, 0.1
+
+    broker = dr.Broker()
+    broker.add_lazy("common", lambda: load(3))
+    broker.add_lazy("dep1", lambda: load(None))
+    broker.add_lazy("other", lambda: load(5))
+    graph = dr.get_dependency_graph(stage3)
+    graph.update(dr.get_dependency_graph(stage1))
+    broker = dr.run(graph, broker)
+
+    assert broker[stage3] == 3
+    # empty results aren't added to the broker
+    assert stage1 in broker.missing_requirements
+    assert "dep1" not in broker
+    # only the lazy components looked up by the graph are loaded
+    assert sorted(loaded, key=str) == [3, None]
+    assert list(broker.lazy) == ["other"]
+    # looking a component up loads it
+    assert "other" in broker
+    assert broker.lazy == {}
+    assert loaded[-1] == 5
+    assert broker["other"] == 5
+    assert len(loaded) == 3
+
+
+def test_run_lazy_failed():
+    def fail():
+        raise Exception("boom")
+
+    broker = dr.Broker()
+    broker[HostContext] = HostContext()
+    broker.add_lazy("common", fail)
+    broker.add_lazy("dep1", lambda: (1, 0.1))
+    assert "common" not in broker
+    assert broker.lazy == {"dep1": broker.lazy["dep1"]}
+    assert broker.get("common") is None
+
+    # the dependencies of a hydrated component that can't be loaded are
+    # still evaluated
+    broker = dr.Broker()
+    broker[SerializedArchiveContext] = SerializedArchiveContext("/")
+    broker["common"] = 3
+    broker.add_lazy(stage7, fail)
+    broker.add_lazy(stage4, lambda: (4, 0.1))
+    graph = dr.get_dependency_graph(stage7)
+    graph.update(dr.get_dependency_graph(stage4))
+    broker = dr.run(graph, broker)
+    assert broker[stage3] == 3
+    assert broker[stage7] == 4
+    assert broker[stage4] == 4
+    assert stage7 not in broker.missing_requirements
+
+
+def test_run_lazy_unread():
+    loaded = []
+
+    def load(value):
+        loaded.append(value)
+        return value, 0.1
+
+    broker = dr.Broker()
+    broker[HostContext] = HostContext()
+    broker.add_lazy("common", lambda: load(3))
+    broker.add_lazy("dep1", lambda: load(1))
+    broker.add_lazy(stage4, lambda: load(4))
+    graph = dr.get_dependency_graph(stage3)
+    graph.update(dr.get_dependency_graph(stage1))
+    broker = dr.run(dr.prune(graph, broker), broker)
+
+    assert broker[stage3] == 3
+    assert broker[stage1] == "stage1"
+    # stage4 isn't in the graph
+    assert sorted(loaded) == [1, 3]
+    assert list(broker.lazy) == [stage4]
+
+    # the lazy components are loaded when the broker is pickled
+    broker = pickle.loads(pickle.dumps(broker))
+    assert broker.lazy == {}
+    assert broker[stage4] == 4
+
+
+def test_get_by_type():
+    broker = dr.Broker()
+    broker["common"] = 3
+    broker.add_lazy(stage1, lambda: ("stage1", 0.1))
+    broker[stage2] = "stage2"
+    assert broker.get_by_type(stage) == {stage1: "stage1", stage2: "stage2"}
+    assert broker.get_by_type(None) == {"common": 3}
+
+    del broker[stage1]
+    result = broker.get_by_type(stage)
+    assert result == {stage2: "stage2"}
+    # the result is a copy
+    result.clear()
+    assert dr.Broker(broker).get_by_type(stage) == {stage2: "stage2"}
+
+
+def test_fire_observers():
+    observed = []
+    broker = dr.Broker()
+    broker.add_observer(lambda c, b: observed.append(("any", c)))
+    broker.fire_observers(stage1)
+    assert observed == [("any", stage1)]
+
+    # the dispatch table of the type is updated
+    broker.add_observer(lambda c, b: observed.append(("stage", c)), stage)
+    broker.fire_observers(stage1)
+    assert sorted(observed[1:]) == [("any", stage1), ("stage", stage1)]
+
+    broker.observers = defaultdict(set)
+    broker.fire_observers(stage1)
+    assert len(observed) == 3
+
+
 def test_run_incremental():
     broker = dr.Broker()
     broker["dep1"] = 1
@@ -61,6 +201,178 @@ def test_run_incremental():
     assert len(brokers) == 3
 
 
+def test_execution_plan_cached():
+    plan = dr.get_execution_plan([stage3, stage4])
+    assert dr.get_execution_plan([stage4, stage3]) is plan
+    assert dr.get_execution_plan(dict(plan.graph)) is not plan
+    assert plan.order.index("common") < plan.order.index(stage3)
+    assert plan.delegates[stage3] is dr.get_delegate(stage3)
+
+    broker = dr.Broker()
+    broker["common"] = 3
+    broker = dr.run([stage3, stage4], broker)
+    assert broker[stage3] == 3
+    assert broker[stage4] == 3
+
+
+def test_execution_plan_invalidated():
+    plan = dr.get_execution_plan(stage3)
+    assert dr.get_execution_plan(stage3) is plan
+
+    dr.set_enabled(stage3, False)
+    try:
+        assert dr.get_execution_plan(stage3) is not plan
+        broker = dr.Broker()
+        broker["common"] = 3
+        assert stage3 not in dr.run(stage3, broker)
+    finally:
+        dr.set_enabled(stage3, True)
+
+    plan = dr.get_execution_plan(stage3)
+    dr.load_components("insights.plugins.always_fires")
+    assert dr.get_execution_plan(stage3) is not plan
+
+
+def test_execution_plan_graph_changed():
+    graph = dr.get_dependency_graph(stage3)
+    plan = dr.get_execution_plan(graph)
+    graph[stage3] = set(["dep1"])
+    graph["dep1"] = set()
+    graph.pop("common")
+    assert dr.get_execution_plan(graph) is not plan
+
+
+@stage(HostContext)
+def host_only(ctx):
+    return "host"
+
+
+@stage(HostArchiveContext)
+def archive_only(ctx):
+    return "archive"
+
+
+@stage([host_only, archive_only])
+def either(h, a):
+    return h or a
+
+
+@stage(host_only)
+def report_host(h):
+    return h
+
+
+def test_prune():
+    graph = {}
+    for c in (either, report_host):
+        graph.update(dr.get_dependency_graph(c))
+
+    broker = dr.Broker()
+    assert dr.prune(graph, broker) == graph
+    assert broker.pruned == 0
+
+    broker = dr.Broker()
+    broker[HostArchiveContext] = HostArchiveContext()
+    pruned = dr.prune(graph, broker)
+    assert set(pruned) == set([HostArchiveContext, archive_only, either, report_host])
+    assert pruned[either] == set([archive_only])
+    assert broker.pruned == len(graph) - 4 > 0
+
+    broker = dr.run(pruned, broker)
+    assert broker[either] == "archive"
+    assert report_host in broker.missing_requirements
+    assert host_only not in broker.exec_times
+
+    broker = dr.Broker()
+    broker[HostContext] = HostContext()
+    dr.set_enabled(host_only, False)
+    try:
+        pruned = dr.prune(graph, broker, targets=[either])
+    finally:
+        dr.set_enabled(host_only, True)
+    assert set(pruned) == set([either])
+    assert broker.pruned == len(graph) - 1
+
+
+def test_work_unit():
+    for comp in (stage3, "common", HostContext):
+        key = dr.component_key(comp)
+        assert pickle.loads(pickle.dumps(key)) == key
+        assert dr.resolve_key(key) is comp
+
+    graph = dr.get_dependency_graph(stage3)
+    unit = dr.make_work_unit(graph, {}, True)
+    assert unit["graph"] == {dr.component_key(stage3): [("str", "common")], ("str", "common"): []}
+    assert unit["enabled"][dr.component_key(stage3)] is True
+    assert unit["store_skips"] is True
+
+    # a component that can't be found by its name in another process
+    def local(common):
+        return common
+
+    assert dr.component_key(local) is None
+    assert dr.make_work_unit({local: set(["common"])}, {}, False) is None
+
+
+@pytest.mark.skipif(six.PY2, reason="concurrent.futures is not available")
+def test_run_all_process_pool():
+    broker = dr.Broker()
+    broker["dep1"] = 1
+    broker["dep2"] = 2
+    broker["common"] = 3
+    broker["boom"] = 4
+
+    graph = {}
+    for c in (stage1, stage2, stage3, stage4, stage6):
+        graph.update(dr.get_dependency_graph(c))
+
+    observed = []
+    broker.add_observer(lambda c, b: observed.append(c), stage)
+
+    with get_pool("process", "test-pool", {"max_workers": 2}) as pool:
+        assert dr._is_process_pool(pool)
+        brokers = dr.run_all(graph, broker, pool)
+
+    assert len(brokers) == 4
+    assert all(b is broker for b in brokers)
+    assert broker[stage1] == "stage1"
+    assert broker[stage2] == "stage2"
+    assert broker[stage3] == 3
+    assert broker[stage4] == 3
+    assert stage5 not in broker
+    assert stage6 not in broker
+
+    ex = broker.exceptions[stage5][0]
+    assert str(ex) == "stage5 failed"
+    assert "stage5 failed" in broker.tracebacks[ex]
+    assert stage6 in broker.missing_requirements
+    assert broker.missing_requirements[stage6] == ([stage5], [])
+
+    for c in (stage1, stage2, stage3, stage4, stage5, stage6):
+        assert c in broker.exec_times
+        assert c in observed
+    assert observed.index(stage5) < observed.index(stage6)
+
+
+@pytest.mark.skipif(six.PY2, reason="concurrent.futures is not available")
+def test_run_all_process_pool_local_components():
+    @stage("dep1")
+    def local(dep1):
+        return dep1 + 1
+
+    broker = dr.Broker()
+    broker["dep1"] = 1
+    graph = dr.get_dependency_graph(local)
+    graph.update(dr.get_dependency_graph(stage2))
+
+    with get_pool("process", "test-pool", {"max_workers": 1}) as pool:
+        dr.run_all(graph, broker, pool)
+
+    # local can't be found by name in a worker, so it runs in this process
+    assert broker[local] == 2
+    assert stage2 in broker.missing_requirements
+
+
 ALWAYS_FIRES_RESULT = make_pass("ALWAYS_FIRES", kernel="this is junk")
 NEVER_FIRES_RESULT = {
     'rule_fqdn': 'insights.plugins.never_fires.report',
@@ -101,6 +413,15 @@ def test_run_command(tmpdir):
     assert Specs.redhat_release in broker
     assert broker[Specs.redhat_release].content == [REDHAT_RELEASE]
 
+    broker = run(
+        [Specs.redhat_release, always_fires.report, never_fires.report], root=tmpdir.strpath,
+        parallel="process"
+    )
+    assert broker is not None
+    assert broker[always_fires.report] == ALWAYS_FIRES_RESULT
+    assert broker[never_fires.report] == NEVER_FIRES_RESULT
+    assert broker[Specs.redhat_release].content == [REDHAT_RELEASE]
+
     testargs = ["insights-run", "-p", "insights.plugins"]
     with patch.object(sys, 'argv', testargs):
         broker = run(print_summary=True)
@@ -121,6 +442,14 @@ def test_run_command(tmpdir):
         assert Specs.uname in broker
         assert broker[Specs.uname].content == [UNAME]
 
+    testargs = ["insights-run", "--parallel-processes", "-p", "insights.plugins", tmpdir.strpath]
+    with patch.object(sys, 'argv', testargs):
+        broker = run(print_summary=True)
+        assert broker is not None
+        assert broker[always_fires.report] == ALWAYS_FIRES_RESULT
+        assert broker[never_fires.report] == NEVER_FIRES_RESULT
+        assert broker[Specs.uname].content == [UNAME]
+
 
 SAMPLE_LOG = """
 1 line one
@@ -1,12 +1,19 @@
+import io
 import os
+import pytest
 import shlex
 import subprocess
+import tarfile
 import tempfile
 import zipfile
 from contextlib import closing
+from mock.mock import patch
 
-from insights.core.hydration import get_all_files
+from insights import dr, run
+from insights.core.context import HostArchiveContext
+from insights.core.hydration import create_context, get_all_files
 from insights.core.archives import extract
+from insights.parsers.redhat_release import RedhatRelease
 
 
 def test_with_zip():
@@ -46,3 +53,117 @@ def test_with_zip():
         os.unlink("/tmp/test.zip")
 
     subprocess.call(shlex.split("rm -rf %s" % tmp_dir))
+
+
+def _make_archive(tmpdir, fmt):
+    root = tmpdir.mkdir("archive")
+    base = root.mkdir("insights-host")
+    base.mkdir("etc").join("redhat-release").write("Red Hat Enterprise Linux release 8.10 (Ootpa)")
+    base.mkdir("insights_commands").join("uname_-a").write("Linux host 4.18.0-553.el8.x86_64")
+    logs = base.mkdir("var").mkdir("log")
+    for i in range(3):
+        logs.join("messages-%d" % i).write("log %d" % i)
+    os.symlink("messages-0", str(logs.join("messages")))
+
+    path = str(tmpdir.join("archive." + fmt))
+    if fmt == "zip":
+        with closing(zipfile.ZipFile(path, "w")) as zf:
+            for f in get_all_files(str(root)):
+                zf.write(f, os.path.relpath(f, str(root)))
+    else:
+        with closing(tarfile.open(path, "w")) as tf:
+            tf.add(str(base), "insights-host")
+    return path
+
+
+@pytest.mark.parametrize("fmt", ["tar", "zip"])
+def test_extract_on_demand(tmpdir, fmt):
+    path = _make_archive(tmpdir, fmt)
+    with extract(path) as ex:
+        expected = create_context(ex.tmp_dir)
+        logs = sorted(os.listdir(os.path.join(expected.root, "var/log")))
+        expected_files = len(expected.all_files)
+
+    with extract(path, on_demand=True) as ex:
+        assert list(get_all_files(ex.tmp_dir)) == []
+        ctx = create_context(ex.tmp_dir, archive=ex.archive)
+        assert isinstance(ctx, HostArchiveContext)
+        assert os.path.relpath(ctx.root, ex.tmp_dir) == os.path.relpath(expected.root, os.path.dirname(expected.root))
+        assert len(ctx.all_files) == expected_files
+
+        # only the located files are extracted
+        ctx.locate_path("/etc/redhat-release")
+        ctx.locate_path("/var/log/messages-[12]")
+        assert sorted(os.path.relpath(f, ctx.root) for f in get_all_files(ex.tmp_dir)) == [
+            "etc/redhat-release", "var/log/messages-1", "var/log/messages-2"]
+        ctx.locate_path(os.path.join(ctx.root, "var/log"))
+        assert sorted(os.listdir(os.path.join(ctx.root, "var/log"))) == logs
+        tmp_dir = ex.tmp_dir
+    assert not os.path.exists(tmp_dir)
+
+
+def test_extract_on_demand_symlink(tmpdir):
+    path = _make_archive(tmpdir, "tar")
+    with extract(path, on_demand=True) as ex:
+        ctx = create_context(ex.tmp_dir, archive=ex.archive)
+        ctx.locate_path("/var/log/messages")
+        with open(os.path.join(ctx.root, "var/log/messages")) as f:
+            assert f.read() == "log 0"
+
+
+def _add_member(tf, name, content=None, linkname=None):
+    info = tarfile.TarInfo(name)
+    if linkname is not None:
+        info.type = tarfile.SYMTYPE
+        info.linkname = linkname
+        tf.addfile(info)
+    else:
+        info.size = len(content)
+        tf.addfile(info, io.BytesIO(content))
+
+
+@pytest.mark.parametrize("extract_members", [
+    lambda index: index.extract_matching(os.path.join(index.tmp_dir, "insights-host/*")),
+    lambda index: index.extract_matching(os.path.join(index.tmp_dir, "insights-host/etc")),
+    lambda index: index.extract_all(),
+])
+def test_extract_on_demand_through_symlink(tmpdir, extract_members):
+    victim = tmpdir.mkdir("victim")
+    path = str(tmpdir.join("evil.tar"))
+    with closing(tarfile.open(path, "w")) as tf:
+        _add_member(tf, "insights-host/etc", linkname=str(victim))
+        _add_member(tf, "insights-host/etc/pwned", b"pwned")
+        _add_member(tf, "insights-host/up", linkname="../..")
+        _add_member(tf, "insights-host/up/pwned", b"pwned")
+        _add_member(tf, "insights-host/var/log/messages", b"log")
+
+    with extract(path, on_demand=True) as ex:
+        extract_members(ex.archive)
+        ex.archive.extract_matching(os.path.join(ex.tmp_dir, "insights-host/up/pwned"))
+        ex.archive.extract_matching(os.path.join(ex.tmp_dir, "insights-host/var/log/messages"))
+        with open(os.path.join(ex.tmp_dir, "insights-host/var/log/messages")) as f:
+            assert f.read() == "log"
+        assert not os.path.exists(os.path.join(os.path.dirname(ex.tmp_dir), "pwned"))
+    assert victim.listdir() == []
+
+
+@pytest.mark.parametrize("fmt", ["tar", "zip"])
+def test_run_on_demand(tmpdir, fmt):
+    dr.load_components("insights.specs.default", "insights.specs.insights_archive")
+    path = _make_archive(tmpdir, fmt)
+    broker = run(RedhatRelease, root=path, on_demand=True)
+    assert broker[RedhatRelease].version == "8.10"
+
+
+@pytest.mark.parametrize("fmt", ["insights.formats.text", "insights.formats._markdown"])
+def test_run_dropped(tmpdir, fmt):
+    path = _make_archive(tmpdir, "tar")
+    argv = ["insights-run", "-p", "insights.parsers.redhat_release", "-f", fmt, "--dropped", path]
+    with patch("sys.argv", argv):
+        broker = run(print_summary=True)
+    ctx = broker[HostArchiveContext]
+    # the files are listed before the extracted archive is removed
+    assert not os.path.exists(ctx.root)
+    assert sorted(os.path.relpath(f, ctx.root) for f in ctx.all_files) == [
+        "etc/redhat-release", "insights_commands/uname_-a",
+        "var/log/messages-0", "var/log/messages-1", "var/log/messages-2"]
@@ -246,3 +246,17 @@ def test_get_filters():
 
     assert filters.get_filters(None) == set()
     assert filters.get_filters(None, True) == dict()
+
+
+def test_get_matcher():
+    filters.add_filter(LocalSpecs.has_filters, ['abc', 'bcd'], 2)
+
+    matcher = filters.get_matcher(LocalSpecs.has_filters)
+    assert matcher.allowlist == {'abc': 2, 'bcd': 2}
+    assert filters.get_matcher(LocalSpecs.has_filters) is matcher
+
+    # adding filters rebuilds it
+    filters.add_filter(LocalSpecs.has_filters, 'xyz')
+    new = filters.get_matcher(LocalSpecs.has_filters)
+    assert new is not matcher
+    assert new.allowlist == {'abc': 2, 'bcd': 2, 'xyz': filters.MAX_MATCH}
@@ -2,8 +2,10 @@ import pytest
 import sys
 import tempfile
 
-from insights.core.hydration import get_all_files
-from os import chmod, makedirs
+from insights.core.context import (HostArchiveContext, JDRContext, SerializedArchiveContext,
+                                   SosArchiveContext)
+from insights.core.hydration import create_context, get_all_files, identify, probe
+from os import chmod, makedirs, symlink
 from os.path import join
 from shutil import rmtree
 
@@ -44,3 +46,71 @@ def test_get_all_files_oserror(caplog):
     chmod(join(tmp_dir, "sys"), 0o777)
     chmod(d, 0o777)
     rmtree(tmp_dir, ignore_errors=True)
+
+
+def _make_tree(tmp_dir, paths):
+    for path in paths:
+        path = join(tmp_dir, path)
+        if path.endswith("/"):
+            makedirs(path)
+            continue
+        d = path.rsplit("/", 1)[0]
+        try:
+            makedirs(d)
+        except OSError:
+            pass
+        with open(path, "w") as f:
+            f.write("data")
+
+
+@pytest.mark.parametrize("paths, root, context", [
+    (["host/insights_commands/uname_-a", "host/etc/hosts"], "host", HostArchiveContext),
+    (["host/insights_commands/uname_-a", "host/insights_archive.txt"], "host", SerializedArchiveContext),
+    (["sosreport/sos_commands/kernel/uname_-a", "sosreport/etc/hosts"], "sosreport", SosArchiveContext),
+    (["a/b/jdr/JBOSS_HOME/standalone/x.xml", "a/b/jdr/sos_commands/"], "a/b/jdr", JDRContext),
+    # only an empty marker
+    (["a/etc/hosts", "a/etc/insights_commands/"], None, None),
+    # not near the top
+    (["a/b/c/d/e/insights_commands/uname_-a"], None, None),
+])
+def test_probe(paths, root, context):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        _make_tree(tmp_dir, paths)
+        if context is None:
+            assert probe(tmp_dir) == (None, None)
+        else:
+            assert probe(tmp_dir) == identify(list(get_all_files(tmp_dir))) == (join(tmp_dir, root), context)
+    finally:
+        rmtree(tmp_dir, ignore_errors=True)
+
+
+def test_probe_symlink():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        _make_tree(tmp_dir, ["host/etc/hosts", "host/commands/uname_-a"])
+        symlink("commands", join(tmp_dir, "host/insights_commands"))
+        assert probe(tmp_dir) == (None, None)
+    finally:
+        rmtree(tmp_dir, ignore_errors=True)
+
+
+@pytest.mark.parametrize("paths, root, context", [
+    (["insights-host/insights_commands/uname_-a", "insights-host/etc/hosts"], "insights-host", HostArchiveContext),
+    # the marker isn't near the top
+    (["a/b/c/d/host/insights_commands/uname_-a", "a/b/c/d/host/etc/hosts"], "a/b/c/d/host", HostArchiveContext),
+    (["a/b/c/d/sos/sos_commands/kernel/uname_-a", "a/b/c/d/sos/etc/hosts"], "a/b/c/d/sos", SosArchiveContext),
+])
+def test_create_context(paths, root, context):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        _make_tree(tmp_dir, paths)
+        ctx = create_context(tmp_dir)
+        assert type(ctx) is context
+        assert ctx.root == join(tmp_dir, root)
+        expected = sorted(join(tmp_dir, p) for p in paths)
+        assert sorted(ctx.all_files) == expected
+    finally:
+        rmtree(tmp_dir, ignore_errors=True)
+    # the files are still listed once the directory is removed
+    assert sorted(ctx.all_files) == expected
@@ -1,14 +1,21 @@
 import json
 import os
+import pytest
+import six
+import threading
+import time
 
 from tempfile import mkdtemp
 
+from insights import get_pool, run
 from insights.core import dr
 from insights.core.exceptions import ContentException
 from insights.core.plugins import component, datasource, make_info, rule
-from insights.core.serde import Hydration, deserializer, marshal, serializer, unmarshal
+from insights.core.serde import (META_PACK, Hydration, MetaPackReader, deserializer, marshal, serializer,
+                                 unmarshal)
 from insights.core.spec_factory import RegistryPoint, SpecSet
 from insights.util import fs
+from mock.mock import patch
 
 
 class Foo(object):
@@ -32,6 +39,26 @@ def thing():
     return Foo()
 
 
+@component()
+def other_thing():
+    return Foo()
+
+
+@component(thing)
+def uses_thing(t):
+    return t.a + t.b
+
+
+def _many_thing(i):
+    def many_thing():
+        return Foo()
+    many_thing.__name__ = many_thing.__qualname__ = "many_thing_%d" % i
+    return component()(many_thing)
+
+
+MANY_THINGS = [_many_thing(i) for i in range(16)]
+
+
 @serializer(Foo)
 def serialize_foo(obj, root=None):
     return {"a": obj.a, "b": obj.b}
@@ -265,3 +292,236 @@ def test_dehydrate():
             assert "Fake Datasource" in tb
     finally:
         fs.remove(tmp_path)
+
+
+def test_round_trip_packed():
+    tmp_path = mkdtemp()
+    try:
+        h = Hydration(tmp_path, packed=True)
+
+        broker = dr.Broker()
+        broker[thing] = Foo()
+        broker[other_thing] = Foo()
+        broker.exec_times[thing] = 0.5
+        broker.exec_times[other_thing] = 0.1
+        h.dehydrate(thing, broker)
+        h.dehydrate(other_thing, broker)
+        h.close()
+        assert os.listdir(h.meta_root) == []
+
+        with MetaPackReader(os.path.join(tmp_path, META_PACK)) as pack:
+            assert pack.names() == sorted([dr.get_name(thing), dr.get_name(other_thing)])
+            assert pack.get(dr.get_name(thing))["results"]["object"] == {"a": 1, "b": 2}
+
+        broker = Hydration(tmp_path).hydrate()
+        assert thing in broker
+        assert other_thing in broker
+        assert broker.exec_times[thing] >= 0.5
+        foo = broker[thing]
+        assert foo.a == 1
+        assert foo.b == 2
+
+        # only the components of the names
+        broker = Hydration(tmp_path).hydrate(names=[dr.get_name(other_thing), "not.a.component"])
+        assert thing not in broker
+        assert other_thing in broker
+    finally:
+        fs.remove(tmp_path)
+
+
+class YieldingFile(object):
+    """
+    Switches to the other threads when the file is opened and its offset is
+    got to widen the race windows.
+    """
+    def __init__(self, f):
+        time.sleep(0.01)
+        self._file = f
+
+    def tell(self):
+        pos = self._file.tell()
+        time.sleep(0.001)
+        return pos
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def test_dehydrate_packed_concurrently():
+    tmp_path = mkdtemp()
+    try:
+        broker = dr.Broker()
+        for i, comp in enumerate(MANY_THINGS):
+            broker[comp] = Foo()
+            broker[comp].a = i
+        h = Hydration(tmp_path, packed=True)
+        start = threading.Event()
+
+        def dehydrate(comp):
+            start.wait()
+            h.dehydrate(comp, broker)
+
+        threads = [threading.Thread(target=dehydrate, args=(c,)) for c in MANY_THINGS]
+        with patch("insights.core.serde.open", create=True, side_effect=lambda *a: YieldingFile(open(*a))) as open_:
+            for t in threads:
+                t.start()
+            start.set()
+            for t in threads:
+                t.join()
+            h.close()
+        # a single pack is written
+        assert open_.call_count == 1
+
+        with MetaPackReader(os.path.join(tmp_path, META_PACK)) as pack:
+            assert pack.names() == sorted(dr.get_name(c) for c in MANY_THINGS)
+            for i, comp in enumerate(MANY_THINGS):
+                assert pack.get(dr.get_name(comp))["results"]["object"] == {"a": i, "b": 2}
+    finally:
+        fs.remove(tmp_path)
+
+
+def test_hydrate_names():
+    tmp_path = mkdtemp()
+    try:
+        h = Hydration(tmp_path)
+
+        broker = dr.Broker()
+        broker[thing] = Foo()
+        broker[other_thing] = Foo()
+        h.dehydrate(thing, broker)
+        h.dehydrate(other_thing, broker)
+
+        broker = h.hydrate(names=[dr.get_name(thing)])
+        assert thing in broker
+        assert other_thing not in broker
+    finally:
+        fs.remove(tmp_path)
+
+
+def test_hydrate_bad_pack():
+    tmp_path = mkdtemp()
+    try:
+        h = Hydration(tmp_path)
+
+        broker = dr.Broker()
+        broker[thing] = Foo()
+        h.dehydrate(thing, broker)
+        with open(os.path.join(tmp_path, META_PACK), "wb") as f:
+            f.write(b"not a pack")
+
+        # falls back to the meta_data files
+        assert thing in h.hydrate()
+    finally:
+        fs.remove(tmp_path)
+
+
+def test_hydrate_lazy():
+    for packed in (False, True):
+        tmp_path = mkdtemp()
+        try:
+            h = Hydration(tmp_path, packed=packed)
+
+            broker = dr.Broker()
+            broker[thing] = Foo()
+            broker[other_thing] = Foo()
+            broker.exec_times[thing] = 0.5
+            broker.exec_times[other_thing] = 0.1
+            h.dehydrate(thing, broker)
+            h.dehydrate(other_thing, broker)
+            h.close()
+
+            loaded = []
+            h = Hydration(tmp_path)
+            _hydrate_one = h._hydrate_one
+            h._hydrate_one = lambda doc: loaded.append(doc["name"]) or _hydrate_one(doc)
+
+            broker = h.hydrate(lazy=True)
+            assert loaded == []
+            assert set(broker.lazy) == set([thing, other_thing])
+
+            foo = broker[thing]
+            assert foo.a == 1
+            assert loaded == [dr.get_name(thing)]
+            assert broker.exec_times[thing] >= 0.5
+            assert other_thing not in broker.instances
+
+            # everything is loaded once the broker is iterated
+            assert set(broker) == set([thing, other_thing])
+            assert sorted(loaded) == sorted([dr.get_name(thing), dr.get_name(other_thing)])
+            assert broker.lazy == {}
+        finally:
+            fs.remove(tmp_path)
+
+
+def test_hydrate_lazy_errors():
+    tmp_path = mkdtemp()
+    try:
+        h = Hydration(tmp_path)
+
+        broker = dr.Broker()
+        broker[thing] = Foo()
+        h.dehydrate(thing, broker)
+        with open(os.path.join(h.meta_root, dr.get_name(thing) + ".json"), "w") as f:
+            f.write("not json")
+
+        broker = h.hydrate(lazy=True)
+        assert thing not in broker
+        assert broker.get(thing) is None
+        assert broker.lazy == {}
+    finally:
+        fs.remove(tmp_path)
+
+
+@pytest.mark.skipif(six.PY2, reason="concurrent.futures is not available")
+@pytest.mark.parametrize("parallel", ["thread", "process"])
+def test_hydrate_pool(parallel):
+    tmp_path = mkdtemp()
+    try:
+        h = Hydration(tmp_path)
+
+        broker = dr.Broker()
+        broker[thing] = Foo()
+        broker[other_thing] = Foo()
+        broker.exec_times[thing] = 0.5
+        broker.exec_times[other_thing] = 0.1
+        h.dehydrate(thing, broker)
+        h.dehydrate(other_thing, broker)
+        with open(os.path.join(h.meta_root, "not.json"), "w") as f:
+            f.write("not json")
+
+        expected = Hydration(tmp_path).hydrate()
+        with get_pool(parallel, "test-hydrate", {"max_workers": 2}) as pool:
+            broker = Hydration(tmp_path, pool=pool).hydrate()
+        assert list(broker.instances) == list(expected.instances) == sorted([thing, other_thing], key=dr.get_name)
+        assert broker.exec_times == expected.exec_times
+        assert broker[thing].a == 1
+    finally:
+        fs.remove(tmp_path)
+
+
+@pytest.mark.parametrize("parallel", [
+    False,
+    pytest.param("thread", marks=pytest.mark.skipif(six.PY2, reason="concurrent.futures is not available")),
+])
+@pytest.mark.parametrize("lazy", [False, True])
+def test_run_serialized_archive(parallel, lazy):
+    tmp_path = mkdtemp()
+    try:
+        h = Hydration(tmp_path)
+        broker = dr.Broker()
+        broker[thing] = Foo()
+        broker[other_thing] = Foo()
+        h.dehydrate(thing, broker)
+        h.dehydrate(other_thing, broker)
+        with open(os.path.join(tmp_path, "insights_archive.txt"), "w") as f:
+            f.write("")
+
+        broker = run(uses_thing, root=tmp_path, parallel=parallel, lazy=lazy)
+        assert broker[uses_thing] == 3
+        # other_thing is only loaded up front when the run isn't lazy
+        assert (other_thing in broker.instances) is not lazy
+        assert (other_thing in broker.lazy) is lazy
+        assert other_thing in broker
+        assert other_thing in broker.instances
+    finally:
+        fs.remove(tmp_path)
@@ -9,6 +9,7 @@ from insights.core.exceptions import SkipComponent
 from insights.core.spec_factory import DatasourceProvider
 from insights.parsers.ps import PsEoCmd
 from insights.specs import Specs
+from insights.specs.datasources import PACKAGE_CACHE, get_packages
 from insights.specs.datasources.package_provides import cmd_and_pkg, get_package
 from insights.tests import context_wrap
 
@@ -19,58 +20,31 @@ JAVA_PATH_ERR = '/error/java'
 JAVA_PKG_2 = 'java-1.8.0-openjdk-headless-1.8.0.292.b10-1.el7_9.x86_64'
 HTTPD_PATH = '/usr/sbin/httpd'
 HTTPD_PKG = 'httpd-2.4.6-97.el7_9.x86_64'
+SHARED_PATH = '/usr/share/shared'
 
 
 class FakeContext(HostContext):
+    def __init__(self, *args, **kwargs):
+        super(FakeContext, self).__init__(*args, **kwargs)
+        self.commands = []
+
     def shell_out(self, cmd, split=True, timeout=None, keep_rc=False, env=None, signum=None):
+        self.commands.append(cmd)
         tmp_cmd = cmd.strip().split()
         shell_cmd = tmp_cmd[0]
         arg = tmp_cmd[-1]
-        if 'readlink' in shell_cmd:
-            if arg == JAVA_PATH_1:
-                return (
-                    0,
-                    [
-                        JAVA_PATH_2,
-                    ],
-                )
-            elif arg == JAVA_PATH_ERR:
-                return (
-                    1,
-                    [
-                        'file not found',
-                    ],
-                )
-            elif arg.startswith('/'):
-                return (
-                    0,
-                    [
-                        arg,
-                    ],
-                )
-        elif 'rpm' in shell_cmd:
-            if arg == JAVA_PATH_2:
-                return (
-                    0,
-                    [
-                        JAVA_PKG_2,
-                    ],
-                )
-            elif arg == HTTPD_PATH:
-                return (
-                    0,
-                    [
-                        HTTPD_PKG,
-                    ],
-                )
-            else:
-                return (
-                    1,
-                    [
-                        'file {0} is not owned by any package'.format(arg),
-                    ],
-                )
-        elif 'which' in shell_cmd:
+        if 'readlink' in shell_cmd or 'rpm' in shell_cmd:
+            # like the real commands, the lines of all the arguments with
+            # the errors of rpm mixed in, readlink -e fails silently
+            rc, output = 0, []
+            for arg in tmp_cmd[2:]:
+                lines = self.readlink(arg) if 'readlink' in shell_cmd else self.rpm(arg)
+                if lines is None:
+                    rc = 1
+                    lines = ['file {0} is not owned by any package'.format(arg)] if 'rpm' in shell_cmd else []
+                output.extend(lines)
+            return rc, output
+        if 'which' in shell_cmd:
             if 'exception' in arg:
                 raise Exception()
             elif arg.startswith('/'):
@@ -88,8 +62,23 @@ class FakeContext(HostContext):
 
         raise Exception()
 
+    def readlink(self, arg):
+        if arg == JAVA_PATH_1:
+            return [JAVA_PATH_2]
+        elif arg.startswith('/') and arg != JAVA_PATH_ERR:
+            return [arg]
+
+    def rpm(self, arg):
+        if arg == JAVA_PATH_2:
+            return [JAVA_PKG_2]
+        elif arg == HTTPD_PATH:
+            return [HTTPD_PKG]
+        elif arg == SHARED_PATH:
+            return [JAVA_PKG_2, HTTPD_PKG]
+
 
 def setup_function(func):
+    PACKAGE_CACHE.clear()
     if func is test_cmd_and_pkg:
         filters.add_filter(Specs.package_provides_command, ['httpd', 'java'])
     elif func is test_cmd_and_pkg_not_found:
@@ -127,6 +116,33 @@ def test_get_package_err():
     assert result is None
 
 
+def test_get_packages():
+    ctx = FakeContext()
+    paths = [JAVA_PATH_1, JAVA_PATH_2, JAVA_PATH_BAD, JAVA_PATH_ERR, HTTPD_PATH, SHARED_PATH]
+
+    result = get_packages(ctx, paths)
+    assert result == {
+        JAVA_PATH_1: JAVA_PKG_2,
+        JAVA_PATH_2: JAVA_PKG_2,
+        JAVA_PATH_BAD: None,
+        JAVA_PATH_ERR: None,
+        HTTPD_PATH: HTTPD_PKG,
+        SHARED_PATH: JAVA_PKG_2,
+    }
+    assert PACKAGE_CACHE.queries == len(ctx.commands)
+
+    del ctx.commands[:]
+    assert get_packages(ctx, paths) == result
+    assert ctx.commands == []
+
+    PACKAGE_CACHE.clear()
+    assert get_packages(ctx, [HTTPD_PATH, JAVA_PATH_2]) == {HTTPD_PATH: HTTPD_PKG, JAVA_PATH_2: JAVA_PKG_2}
+    assert ctx.commands == [
+        '/usr/bin/readlink -e {0} {1}'.format(JAVA_PATH_2, HTTPD_PATH),
+        '/usr/bin/rpm -qf {0} {1}'.format(JAVA_PATH_2, HTTPD_PATH),
+    ]
+
+
 PS_EO_CMD = """
    PID  PPID NLWP COMMAND
      1     0    1 /usr/lib/systemd/systemd --switched-root --system --deserialize 22
@@ -165,6 +181,14 @@ def test_cmd_and_pkg():
     result = cmd_and_pkg(broker)
     assert result is not None
     assert sorted(result.content) == sorted(EXPECTED.content)
+    # a single readlink and rpm for all the commands
+    ctx = broker[HostContext]
+    assert [c.split()[0] for c in ctx.commands if 'which' not in c] == ['/usr/bin/readlink', '/usr/bin/rpm']
+
+    # cached for the rest of the collection
+    del ctx.commands[:]
+    assert get_package(ctx, JAVA_PATH_1) == JAVA_PKG_2
+    assert ctx.commands == []
 
 
 def test_cmd_and_pkg_no_filters():
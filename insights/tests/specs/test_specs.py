@@ -381,9 +381,10 @@ def test_filter_starts_with_minus_sign():
     assert '    filter_message = "{}"'.format(filter_message) in broker[self_spec].content
 
 
+@pytest.mark.parametrize("scheduler", [True, False])
 @pytest.mark.parametrize("obfuscate", [True, False])
 @patch('insights.cleaner.Cleaner.generate_report', return_value=None)
-def test_specs_collect(gen, obfuscate):
+def test_specs_collect(gen, obfuscate, scheduler):
     add_filter(Stuff.many_glob_filter, " ")
     add_filter(Stuff.many_foreach_exe_filter, " ")
     add_filter(Stuff.many_foreach_clc_filter, " ")
@@ -395,6 +396,7 @@ def test_specs_collect(gen, obfuscate):
     add_filter(Stuff.cmd_w_args_filter, [" ", ":"])
     # Preparation
     manifest = collect.load_manifest(specs_manifest)
+    manifest["client"]["command_scheduler"] = {"enabled": scheduler, "max_workers": 2}
     for pkg in manifest.get("plugins", {}).get("packages", []):
         dr.load_components(pkg, exclude=None)
     # For verifying convenience, test obfuscate=False only
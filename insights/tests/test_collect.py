@@ -1,12 +1,18 @@
 import os
 import tempfile
+import time
+import pytest
+import six
 import yaml
 
 from mock.mock import Mock
 
-from insights.collect import load_manifest, generate_archive_name, _parse_broker_exceptions
+from insights import get_pool
+from insights.collect import CommandScheduler, load_manifest, generate_archive_name, _parse_broker_exceptions
+from insights.core.context import HostContext
 from insights.core.dr import Broker
-from insights.core.exceptions import ContentException
+from insights.core.exceptions import CalledProcessError, ContentException
+from insights.core.spec_factory import CommandOutputProvider
 from insights.specs.manifests import default_manifest
 
 
@@ -62,6 +68,49 @@ def test_load_manifest():
     os.remove(tmpfile.name)
 
 
+def test_default_manifest_opt_ins():
+    client = load_manifest(default_manifest)["client"]
+    assert client["packed_meta"] is False
+    assert client["command_scheduler"]["enabled"] is False
+
+
 def test_generate_archive_name():
     archive_name = generate_archive_name()
     assert archive_name.startswith("insights-")
+
+
+@pytest.mark.skipif(six.PY2, reason="concurrent.futures is not available")
+def test_command_scheduler():
+    broker = Broker()
+    ctx = HostContext()
+    persisted = []
+
+    def persister(comp, broker):
+        value = broker[comp]
+        persisted.append((comp, [p.content for p in value] if isinstance(value, list) else value))
+
+    with get_pool(True, "insights-command-pool", {"max_workers": 4}) as pool:
+        scheduler = CommandScheduler(pool, persister, set(["cmds", "other"]))
+        start = time.time()
+        broker["cmds"] = [CommandOutputProvider("sh -c 'sleep 0.5; echo %d'" % i, ctx) for i in range(4)]
+        scheduler("cmds", broker)
+        # persisted right away while the commands run
+        broker["other"] = "other"
+        scheduler("other", broker)
+        assert persisted == [("other", "other")]
+        scheduler.flush()
+        assert time.time() - start < 2
+
+    assert persisted[1] == ("cmds", [["0"], ["1"], ["2"], ["3"]])
+
+
+@pytest.mark.skipif(six.PY2, reason="concurrent.futures is not available")
+def test_command_scheduler_timeout():
+    ctx = HostContext(timeout=None)
+    cmd = CommandOutputProvider("sleep 5", ctx, timeout=10)
+    with get_pool(True, "insights-command-pool", {"max_workers": 1}) as pool:
+        start = time.time()
+        cmd.schedule(pool, timeout=1)
+        with pytest.raises(CalledProcessError):
+            cmd.content
+        assert time.time() - start < 4
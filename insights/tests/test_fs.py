@@ -1,9 +1,13 @@
+# -*- coding: UTF-8 -*-
+import errno
+import io
 import shutil
 import tempfile
 from contextlib import closing
 
 import os
 import pytest
+from mock.mock import patch
 
 from insights.util import fs
 
@@ -75,3 +79,73 @@ def test_touch_times():
     assert os.stat(path).st_atime == 1259798405
     assert os.stat(path).st_mtime == 1259798400
     fs.remove(path)
+
+
+@pytest.mark.parametrize("size", [0, 1, 100000, 3 * 1024 * 1024 + 7])
+def test_copy_file(tmpdir, size):
+    src = str(tmpdir.join("src"))
+    dst = str(tmpdir.join("dst"))
+    data = os.urandom(size)
+    with open(src, "wb") as f:
+        f.write(data)
+    os.chmod(src, 0o750)
+
+    assert fs.copy_file(src, dst, blocksize=65536) == size
+    with open(dst, "rb") as f:
+        assert f.read() == data
+    umask = os.umask(0)
+    os.umask(umask)
+    assert os.stat(dst).st_mode & 0o777 == 0o750 & ~umask
+
+    # an existing file is truncated
+    with open(src, "wb") as f:
+        f.write(b"short")
+    fs.copy_file(src, dst)
+    with open(dst, "rb") as f:
+        assert f.read() == b"short"
+
+
+def test_copy_file_without_kernel_copy(tmpdir):
+    src = str(tmpdir.join("src"))
+    dst = str(tmpdir.join("dst"))
+    data = os.urandom(200000)
+    with open(src, "wb") as f:
+        f.write(data)
+
+    def unsupported(*args):
+        raise OSError(errno.EXDEV, "unsupported")
+
+    with patch.object(os, "copy_file_range", unsupported, create=True):
+        with patch.object(os, "sendfile", unsupported, create=True):
+            assert fs.copy_file(src, dst, blocksize=4096) == len(data)
+    with open(dst, "rb") as f:
+        assert f.read() == data
+
+
+@pytest.mark.parametrize("data", [b"", b"a", b"a\n", b"a\r\nb\rc\n\nd", b"\xff\n\xe2\x9c\x93\r\n"])
+@pytest.mark.parametrize("keepends", [False, True])
+def test_read_lines_reversed(data, keepends):
+    lines = list(fs.read_lines_reversed(io.BytesIO(data), errors="replace", keepends=keepends))
+    text = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", errors="replace")
+    assert lines[::-1] == [l if keepends else l.rstrip("\n") for l in text]
+
+    # the bytes of the lines as a file of Python 2 gives them
+    lines = list(fs.read_lines_reversed(io.BytesIO(data), encoding=None, keepends=keepends))
+    assert lines[::-1] == [l if keepends else l.rstrip(b"\n") for l in io.BytesIO(data)]
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="no /proc")
+def test_copy_file_proc(tmpdir):
+    dst = str(tmpdir.join("status"))
+    assert fs.copy_file("/proc/self/status", dst) > 0
+    with open(dst) as f:
+        assert f.readline().startswith("Name:")
+
+
+@pytest.mark.parametrize("lines", [[], [""], ["a"], ["a", "", u"b\u2713"], ["%d" % i for i in range(10000)], "abc"])
+def test_write_lines(tmpdir, lines):
+    path = str(tmpdir.join("out"))
+    with open(path, "wb") as f:
+        fs.write_lines(f, lines, chunksize=7)
+    with open(path, "rb") as f:
+        assert f.read() == "\n".join(lines).encode("utf-8")
@@ -1,6 +1,9 @@
 # -*- coding: UTF-8 -*-
+import json
+import pickle
 import six
-from insights.core.ls_parser import parse
+from insights.core.ls_parser import Directory, Listing, parse, parse_non_selinux
+from insights.core.plugins import make_fail
 
 
 SINGLE_DIRECTORY = """
@@ -349,3 +352,120 @@ def test_rhel8_selinux():
     assert res["date"] == "Apr  8 16:41"
     assert res["name"] == "abcd-efgh-ijkl-mnop"
     assert res["dir"] == "/var/lib/nova/instances"
+
+
+def test_entries_are_mappings():
+    results = parse(MULTIPLE_DIRECTORIES.splitlines(), None)
+    entries = results["/etc/sysconfig"]["entries"]
+    res = entries["grub"]
+    expected = {
+        "type": "l",
+        "perms": "rwxrwxrwx.",
+        "links": 1,
+        "owner": "0",
+        "group": "0",
+        "size": 17,
+        "date": "Jul  6 23:32",
+        "name": "grub",
+        "link": "/etc/default/grub",
+        "raw_entry": "lrwxrwxrwx.  1 0 0   17 Jul  6 23:32 grub -> /etc/default/grub",
+        "dir": "/etc/sysconfig",
+    }
+    assert res == expected
+    assert expected == res
+    assert res != entries["cbq"]
+    assert dict(res) == expected
+    assert sorted(res.keys()) == sorted(expected)
+    assert len(res) == len(expected)
+    assert "link" in res
+    assert "major" not in entries["cbq"]
+    assert entries["cbq"].get("link") is None
+    assert pickle.loads(pickle.dumps(res)) == expected
+
+    # the strings repeated across the entries are shared
+    assert entries["cbq"]["owner"] is entries["console"]["owner"]
+    assert entries["cbq"]["perms"] is entries["console"]["perms"]
+
+
+def test_entries_are_dicts():
+    results = parse(MULTIPLE_DIRECTORIES.splitlines(), None)
+    entries = results["/etc/sysconfig"]["entries"]
+    res = entries["grub"]
+    raw = "lrwxrwxrwx.  1 0 0   17 Jul  6 23:32 grub -> /etc/default/grub"
+    assert isinstance(res, dict)
+    assert res["raw_entry"] == res.get("raw_entry") == raw
+    assert res.copy() == dict(res.items())
+    assert type(res.copy()) is dict
+    assert json.loads(json.dumps(res)) == res
+    assert json.loads(json.dumps({"entries": entries})) == {"entries": dict((k, v.copy()) for k, v in entries.items())}
+    response = make_fail("LS_ENTRY", entry=res)
+    assert json.loads(json.dumps(response))["entry"] == res
+    assert pickle.loads(pickle.dumps(res)).copy() == res.copy()
+
+    # the raw entry is the line of the listing
+    if six.PY3:
+        assert not dict.__contains__(res, "raw_entry")
+    assert res.pop("raw_entry") == raw
+    assert "raw_entry" not in res
+    assert res.get("raw_entry") is None
+    assert "raw_entry" not in json.loads(json.dumps(res))
+    res["raw_entry"] = "replaced"
+    assert list(res).count("raw_entry") == 1
+    assert res.copy()["raw_entry"] == "replaced"
+    del res["raw_entry"]
+    assert "raw_entry" not in res.copy()
+
+
+def test_parse_non_selinux():
+    assert parse_non_selinux(["2", "root", "root", "6 Sep 16  2015 a -> b"]) == {
+        "links": 2,
+        "owner": "root",
+        "group": "root",
+        "size": 6,
+        "date": "Sep 16  2015",
+        "name": "a",
+        "link": "b",
+    }
+
+
+def test_parse_lazy():
+    for content, root in [
+        (MULTIPLE_DIRECTORIES, None),
+        (MULTIPLE_DIRECTORIES_WITH_BREAK, None),
+        (SINGLE_DIRECTORY, "/etc"),
+        (COMPLICATED_FILES, "/tmp"),
+    ]:
+        expected = parse(content.splitlines(), root)
+        results = parse(content.splitlines(), root, lazy=True)
+        assert isinstance(results, Listing)
+        assert len(results) == len(expected)
+        assert results == expected
+        assert sorted(results) == sorted(expected)
+
+    results = parse(MULTIPLE_DIRECTORIES_WITH_BREAK.splitlines(), None, lazy=True)
+    assert "/etc/sysconfig" in results
+    assert "/etc/sysconfig/" not in results
+    assert results.get("/etc/sysconfig/") is None
+    # only the directories accessed are built
+    assert not dict.__contains__(results, "/etc/sysconfig")
+    stanza = results["/etc/sysconfig"]
+    assert isinstance(stanza, Directory)
+    assert stanza["total"] == 96
+    assert stanza["entries"]["grub"]["link"] == "/etc/default/grub"
+    assert results.get("/etc/rc.d/rc3.d")["files"] == ["K50netconsole", "S10network", "S97rhnsd"]
+    assert dict.__len__(results) == 2
+
+    del results["/etc"]
+    assert "/etc" not in results
+    results["/etc"] = {}
+    assert results["/etc"] == {}
+    assert sorted(results.keys()) == ["/etc", "/etc/rc.d/rc3.d", "/etc/sysconfig"]
+
+
+def test_listing_add_lines():
+    results = Listing()
+    results.add_lines(MULTIPLE_DIRECTORIES.splitlines())
+    results.add_lines(SINGLE_DIRECTORY_WITH_ENTRY.splitlines())
+    assert len(results) == 3
+    assert results["/etc"] == parse(SINGLE_DIRECTORY_WITH_ENTRY.splitlines())["/etc"]
+    assert results["/etc/sysconfig"] == parse(MULTIPLE_DIRECTORIES.splitlines())["/etc/sysconfig"]
@@ -1,7 +1,10 @@
 # -*- coding: UTF-8 -*-
+import pickle
+
 import pytest
+from mock.mock import patch
 
-from insights.core import TextFileOutput
+from insights.core import TextFileOutput, default_parser_deserializer, default_parser_serializer
 from insights.tests import context_wrap
 
 
@@ -162,3 +165,74 @@ def test_lines_2():
     ctx = context_wrap(MESSAGES_ROLLOVER_YEAR, path='/var/log/messages')
     log = FakeMessagesClass(ctx)
     assert len(log.lines) == 18
+
+
+class IndexedMessagesClass(TextFileOutput):
+    pass
+
+
+IndexedMessagesClass.keep_scan('puppet_master_logs', 'puppet-master')
+IndexedMessagesClass.keep_scan('nrpe_first_2', ['START', 'nrpe'], num=2)
+IndexedMessagesClass.last_scan('rsyslogd_last', ['rsyslogd', 'lost'], check=any)
+IndexedMessagesClass.token_scan('pulp_error', ['pulp', 'ERROR'])
+IndexedMessagesClass.token_scan('kernel', 'kernel')
+IndexedMessagesClass.scan('line_count', lambda self: len(self.lines))
+IndexedMessagesClass.keep_scan('exit_last_2', 'EXIT', num=2, reverse=True)
+IndexedMessagesClass.keep_scan('nrpe_or_pulp', ['nrpe', 'pulp'], check=any, reverse=True)
+IndexedMessagesClass.token_scan('no_start', ['START'], check=lambda found: not any(found))
+
+
+@pytest.mark.parametrize("s, check", [
+    ('puppet-master', all),
+    ('kernel', all),
+    (['START', 'nrpe'], all),
+    (['START', 'nrpe'], any),
+    (['rsyslogd', 'lost', 'pulp'], any),
+    (['pulp', 'ERROR', 'lost'], all),
+    (['puppet-master', 'not indexed'], all),
+])
+@pytest.mark.parametrize("num", [None, 0, 1, 3])
+@pytest.mark.parametrize("reverse", [False, True])
+def test_lines_index(s, check, num, reverse):
+    content = MESSAGES + MESSAGES_ROLLOVER_YEAR
+    with patch.object(IndexedMessagesClass, 'index_max_postings', 0):
+        scanned = IndexedMessagesClass(context_wrap(content))
+        expected = scanned.get(s, check, num, reverse), s in scanned
+        assert scanned._index() is None
+    indexed = IndexedMessagesClass(context_wrap(content))
+
+    assert (indexed.get(s, check, num, reverse), s in indexed) == expected
+    assert indexed._index() is not None
+
+
+@pytest.mark.parametrize("content", [MESSAGES, MESSAGES_ROLLOVER_YEAR, ""])
+def test_lines_fused_scanners(content):
+    fused = IndexedMessagesClass(context_wrap(content))
+    with patch.object(IndexedMessagesClass, '_fused_scan', lambda self, keys: [
+            self.scanners[key](self) for key in keys]):
+        scanned = IndexedMessagesClass(context_wrap(content))
+
+    for key in IndexedMessagesClass.scanners:
+        assert getattr(fused, key) == getattr(scanned, key)
+
+
+def test_lines_index_lines_replaced():
+    log = IndexedMessagesClass(context_wrap(MESSAGES))
+    assert len(log.get('puppet-master')) == 6
+    log.lines = log.lines[:9]
+    assert len(log.get('puppet-master')) == 2
+
+
+def test_lines_index_not_serialized():
+    log = IndexedMessagesClass(context_wrap(MESSAGES))
+    assert len(log.get('puppet-master')) == 6
+    assert '_postings' in vars(log)
+
+    data = default_parser_serializer(log)
+    assert '_postings' not in data
+    restored = default_parser_deserializer(IndexedMessagesClass, data)
+    assert len(restored.get('puppet-master')) == 6
+
+    restored = pickle.loads(pickle.dumps(log))
+    assert '_postings' not in vars(restored)
+    assert len(restored.get('puppet-master')) == 6
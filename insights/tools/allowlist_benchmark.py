@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Compare the time the filtering of pre-filtered lines per allowlist takes by
+checking the keys one by one and by :class:`insights.cleaner.filters.AllowMatcher`,
+and check they keep the same lines.
+
+Only the lines containing any key are filtered, as they are after the
+pre-filtering of the collection.  Without filters, the allowlist is made of
+`--keys` words of the files.
+
+Examples:
+    python -m insights.tools.allowlist_benchmark -f kernel -f error /var/log/messages
+    python -m insights.tools.allowlist_benchmark -s insights.specs.Specs.messages messages.txt
+    python -m insights.tools.allowlist_benchmark -k 300 /var/log/messages
+"""
+from __future__ import print_function
+import argparse
+import io
+import random
+import sys
+import timeit
+
+from insights import dr
+from insights.cleaner.filters import AllowFilter, AllowMatcher
+from insights.core import filters
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Compare filtering lines per allowlist key by key and in one pass.")
+    p.add_argument("files", nargs="+", help="Files to filter.")
+    p.add_argument("-f", "--filter", action="append", default=[],
+                   help="A filter string, can be repeated.")
+    p.add_argument("-s", "--spec", help="Use the filters of this spec.")
+    p.add_argument("-k", "--keys", type=int, default=100,
+                   help="Number of words of the files used as filters when no filters are specified.")
+    p.add_argument("-m", "--max-match", type=int, default=10000,
+                   help="Max number of lines kept per filter.")
+    p.add_argument("-n", "--number", type=int, default=10,
+                   help="Number of times the lines are filtered.")
+    return p.parse_args()
+
+
+def key_by_key(lines, allowlist):
+    # the filtering before AllowMatcher
+    allowlist = dict(allowlist)
+    result = []
+    for idx in range(len(lines) - 1, -1, -1):
+        for a_key in list(allowlist.keys()):
+            if a_key in lines[idx]:
+                allowlist[a_key] -= 1
+                allowlist.pop(a_key) if allowlist[a_key] == 0 else None
+                result.append(lines[idx])
+                break
+    result.reverse()
+    return result
+
+
+def read_lines(path):
+    with io.open(path, encoding="utf-8", errors="ignore") as f:
+        return f.read().splitlines()
+
+
+def main():
+    args = parse_args()
+    patterns = list(args.filter)
+    if args.spec:
+        # the filters are added by the parsers and combiners of the spec
+        for package in ("insights.specs", "insights.parsers", "insights.combiners"):
+            dr.load_components(package, continue_on_error=False)
+        patterns.extend(filters.get_filters(dr.get_component(args.spec)))
+    contents = [(path, read_lines(path)) for path in args.files]
+    if not patterns:
+        words = sorted(set(w for _, lines in contents for line in lines for w in line.split()))
+        patterns = random.Random(0).sample(words, min(args.keys, len(words)))
+    if not patterns:
+        print("No filters.", file=sys.stderr)
+        sys.exit(1)
+    allowlist = dict((p, args.max_match) for p in patterns)
+    matcher = AllowMatcher(allowlist)
+
+    print("{0} keys, the lines are checked {1}".format(
+        len(allowlist), "key by key" if matcher._prefixes is None else "in one pass"))
+    print("{0:>10} {1:>14} {2:>14}  {3}".format("lines", "by key (ms)", "matcher (ms)", "file"))
+    for path, lines in contents:
+        # pre-filtered
+        lines = [line for line in lines if any(p in line for p in patterns)]
+        if AllowFilter.filter_content(lines, allowlist, matcher) != key_by_key(lines, allowlist):
+            print("Different lines are kept in %s" % path, file=sys.stderr)
+            sys.exit(1)
+        b = timeit.timeit(lambda: key_by_key(lines, allowlist), number=args.number)
+        m = timeit.timeit(lambda: AllowFilter.filter_content(lines, allowlist, matcher), number=args.number)
+        print("{0:>10} {1:>14.3f} {2:>14.3f}  {3}".format(
+            len(lines), b * 1000 / args.number, m * 1000 / args.number, path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Compare the time :meth:`insights.core.dr.Broker.get_by_type` and
+:meth:`insights.core.dr.Broker.fire_observers` take with the per-type index
+of the broker and by scanning every instance or observer, for a broker holding
+an instance of every component of the default plugins, parsers, and combiners.
+
+Examples:
+    python -m insights.tools.broker_benchmark
+    python -m insights.tools.broker_benchmark -n 20 -p examples.rules
+"""
+from __future__ import print_function
+import argparse
+import timeit
+
+from insights import load_default_plugins, parse_plugins
+from insights.core import dr
+from insights.core.plugins import combiner, condition, datasource, incident, parser, rule
+
+
+TYPES = (datasource, parser, combiner, rule, condition, incident)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark the broker lookups by component type.")
+    p.add_argument("-p", "--plugins", default="",
+                   help="Comma-separated list without spaces of package(s) or module(s) containing plugins.")
+    p.add_argument("-n", "--number", type=int, default=10,
+                   help="Number of times each benchmark is run.")
+    return p.parse_args()
+
+
+def scan_by_type(broker, _type):
+    r = {}
+    for k, v in broker.items():
+        if dr.get_component_type(k) is _type:
+            r[k] = v
+    return r
+
+
+def scan_observers(broker, component):
+    _type = dr.get_component_type(component)
+    if not _type:
+        return
+    for k, v in broker.observers.items():
+        if issubclass(_type, k):
+            for o in v:
+                o(component, broker)
+
+
+def make_broker():
+    broker = dr.Broker()
+    for _type in (dr.ComponentType,) + TYPES[1:]:
+        broker.add_observer(lambda c, b: None, _type)
+    for comp in dr.DELEGATES:
+        broker[comp] = True
+    return broker
+
+
+def main():
+    args = parse_args()
+    load_default_plugins()
+    for package in ["insights.parsers", "insights.combiners"] + parse_plugins(args.plugins):
+        dr.load_components(package, continue_on_error=True)
+
+    broker = make_broker()
+    for _type in TYPES:
+        assert broker.get_by_type(_type) == scan_by_type(broker, _type)
+    components = list(broker.instances)
+
+    def get_by_type(func):
+        return lambda: [func(_type) for _type in TYPES]
+
+    def fire_observers(func):
+        return lambda: [func(c) for c in components]
+
+    benchmarks = [
+        ("get_by_type", get_by_type(broker.get_by_type),
+         get_by_type(lambda t: scan_by_type(broker, t))),
+        ("fire_observers", fire_observers(broker.fire_observers),
+         fire_observers(lambda c: scan_observers(broker, c))),
+    ]
+
+    print("%d components" % len(components))
+    print("{0:>16} {1:>12} {2:>12}".format("", "scan (ms)", "index (ms)"))
+    for name, indexed, scan in benchmarks:
+        s = timeit.timeit(scan, number=args.number)
+        i = timeit.timeit(indexed, number=args.number)
+        print("{0:>16} {1:>12.3f} {2:>12.3f}".format(name, s * 1000 / args.number, i * 1000 / args.number))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Time the obfuscation of lines with many unique IPv4 addresses and hostnames
+by :class:`insights.cleaner.Cleaner`, to check it grows linearly with the
+number of addresses and hostnames.
+
+Every line is cleaned twice, so each address or hostname is looked up once
+after it was added to the obfuscation database.
+
+Examples:
+    python -m insights.tools.cleaner_benchmark
+    python -m insights.tools.cleaner_benchmark -c 10000 -c 100000 -k ipv4
+"""
+from __future__ import print_function
+import argparse
+import time
+
+from insights.cleaner import Cleaner
+from insights.client.config import InsightsConfig
+
+HOSTNAME = "test1.abc.com"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Time obfuscating many unique IPv4 addresses and hostnames.")
+    p.add_argument("-c", "--count", type=int, action="append",
+                   help="Number of unique addresses or hostnames, can be repeated. "
+                        "Defaults to 1000, 10000 and 100000.")
+    p.add_argument("-k", "--kind", choices=["ipv4", "hostname"], action="append",
+                   help="What is obfuscated, can be repeated. Defaults to both.")
+    return p.parse_args()
+
+
+def ipv4(count):
+    cleaner = Cleaner(InsightsConfig(obfuscation_list=["ipv4"]), {})
+    lines = ["tcp 0 0 172.%d.%d.%d:22 ESTABLISHED\n" % (16 + (i >> 16), (i >> 8) & 255, i & 255)
+             for i in range(count)]
+    return cleaner, lines
+
+
+def hostname(count):
+    conf = InsightsConfig(obfuscate=True, obfuscate_hostname=True, hostname=HOSTNAME)
+    cleaner = Cleaner(conf, {}, HOSTNAME)
+    lines = ["connected to node%d.abc.com\n" % i for i in range(count)]
+    return cleaner, lines
+
+
+def main():
+    args = parse_args()
+    counts = args.count or [1000, 10000, 100000]
+    kinds = args.kind or ["ipv4", "hostname"]
+    makers = {"ipv4": ipv4, "hostname": hostname}
+
+    print("{0:>10} {1:>10} {2:>12} {3:>14}".format("kind", "count", "time (s)", "per line (us)"))
+    for kind in kinds:
+        for count in counts:
+            cleaner, lines = makers[kind](count)
+            lines = lines + lines
+            start = time.time()
+            cleaner.clean_content(lines)
+            elapsed = time.time() - start
+            print("{0:>10} {1:>10} {2:>12.3f} {3:>14.2f}".format(
+                kind, count, elapsed, elapsed * 1e6 / len(lines)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Compare the time the collection takes to copy raw files with a ``cp`` process
+per file and in-process with :func:`insights.util.fs.copy_file`, and the
+memory the writing of command output takes when the lines are joined as a
+whole and with :func:`insights.util.fs.write_lines`.
+
+Examples:
+    python -m insights.tools.file_copy_benchmark
+    python -m insights.tools.file_copy_benchmark -f 2000 -s 65536
+"""
+from __future__ import print_function
+import argparse
+import gc
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from insights.util import fs, which
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark the writing of collected files.")
+    p.add_argument("-f", "--files", type=int, default=500,
+                   help="Number of files copied.")
+    p.add_argument("-s", "--size", type=int, default=4096,
+                   help="Size in bytes of each file.")
+    p.add_argument("-l", "--lines", type=int, default=1000000,
+                   help="Number of lines of the command output.")
+    return p.parse_args()
+
+
+def make_files(root, count, size):
+    paths = []
+    for i in range(count):
+        path = os.path.join(root, "file%d" % i)
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        paths.append(path)
+    return paths
+
+
+def copy_with_cp(paths, dst):
+    cp = which("cp")
+    for path in paths:
+        subprocess.call([cp, path, os.path.join(dst, os.path.basename(path))])
+
+
+def copy_in_process(paths, dst):
+    for path in paths:
+        fs.copy_file(path, os.path.join(dst, os.path.basename(path)))
+
+
+def timed(func, *args):
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+
+def write_joined(lines, path):
+    with open(path, "wb") as f:
+        f.write("\n".join(lines).encode("utf-8"))
+
+
+def write_chunked(lines, path):
+    with open(path, "wb") as f:
+        fs.write_lines(f, lines)
+
+
+def peak_memory(func, *args):
+    gc.collect()
+    tracemalloc.start()
+    start = time.time()
+    func(*args)
+    elapsed = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    args = parse_args()
+    root = tempfile.mkdtemp(prefix="insights-copy-")
+    try:
+        src = os.path.join(root, "src")
+        os.mkdir(src)
+        paths = make_files(src, args.files, args.size)
+        copies = []
+        for name in ("cp", "copy_file"):
+            os.mkdir(os.path.join(root, name))
+        copies.append(timed(copy_with_cp, paths, os.path.join(root, "cp")))
+        copies.append(timed(copy_in_process, paths, os.path.join(root, "copy_file")))
+
+        lines = ["line %d of the output of a command" % i for i in range(args.lines)]
+        out = os.path.join(root, "output")
+        joined = peak_memory(write_joined, lines, out)
+        chunked = peak_memory(write_chunked, lines, out)
+    finally:
+        shutil.rmtree(root)
+
+    print("%d files of %d bytes" % (args.files, args.size))
+    print("{0:>12} {1:>12}".format("", "time (s)"))
+    for name, elapsed in zip(("cp", "copy_file"), copies):
+        print("{0:>12} {1:>12.3f}".format(name, elapsed))
+    print()
+    print("%d lines" % args.lines)
+    print("{0:>12} {1:>12} {2:>12}".format("", "time (s)", "peak (MB)"))
+    for name, (elapsed, peak) in (("join", joined), ("write_lines", chunked)):
+        print("{0:>12} {1:>12.3f} {2:>12.1f}".format(name, elapsed, peak / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Measure the time :func:`insights.core.ls_parser.parse` takes for a synthetic
+``ls -lanR`` listing, and the memory its result keeps with the entries stored
+as :class:`insights.core.ls_parser.Entry` and as dictionaries that store
+their ``raw_entry``.  The lazy parsing is measured with the access to a
+single directory.
+
+Examples:
+    python -m insights.tools.ls_parser_benchmark
+    python -m insights.tools.ls_parser_benchmark -l 100000 --selinux
+"""
+from __future__ import print_function
+import argparse
+import gc
+import time
+import tracemalloc
+
+from insights.core import ls_parser
+
+
+OWNERS = ("0", "0", "0", "48", "993", "1000")
+PERMS = ("-rw-r--r--.", "-rwxr-xr-x.", "drwxr-xr-x.", "lrwxrwxrwx.", "crw-rw----.", "-rw-------.")
+CONTEXTS = ("system_u:object_r:etc_t:s0", "system_u:object_r:bin_t:s0", "unconfined_u:object_r:user_home_t:s0")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark the parsing of large directory listings.")
+    p.add_argument("-l", "--lines", type=int, default=1000000,
+                   help="Number of entries in the listing.")
+    p.add_argument("-d", "--dir-size", type=int, default=1000,
+                   help="Number of entries per directory.")
+    p.add_argument("--selinux", action="store_true",
+                   help="List the SELinux context of the entries as on RHEL 8.")
+    return p.parse_args()
+
+
+def listing(lines, dir_size, selinux):
+    for i in range(lines):
+        if i % dir_size == 0:
+            yield ""
+            yield "/var/lib/dir%d:" % (i // dir_size)
+            yield "total %d" % dir_size
+        perms = PERMS[i % len(PERMS)]
+        owner = OWNERS[i % len(OWNERS)]
+        context = " " + CONTEXTS[i % len(CONTEXTS)] if selinux else ""
+        size = "10, %3d" % (i % 256) if perms[0] == "c" else "%d" % (i * 7 % 100000)
+        name = "file%d" % i
+        if perms[0] == "l":
+            name += " -> ../target%d" % i
+        yield "%s %2d %s %s%s %s Jul  6 23:32 %s" % (perms, i % 5 + 1, owner, owner, context, size, name)
+
+
+def as_dicts(doc):
+    for d in doc.values():
+        d["entries"] = dict((k, v.copy()) for k, v in d["entries"].items())
+    return doc
+
+
+def parse_lazily(lines):
+    doc = ls_parser.parse(lines, lazy=True)
+    doc["/var/lib/dir0"]
+    return doc
+
+
+def memory(func, *args):
+    gc.collect()
+    tracemalloc.start()
+    result = func(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    args = parse_args()
+    lines = list(listing(args.lines, args.dir_size, args.selinux))
+    start = time.time()
+    doc = ls_parser.parse(lines)
+    elapsed = time.time() - start
+    del doc
+
+    start = time.time()
+    doc = parse_lazily(lines)
+    lazy_elapsed = time.time() - start
+    del doc
+
+    # the memory the result keeps, the tracing slows down the parsing
+    entries = memory(ls_parser.parse, lines)[1]
+    dicts = memory(lambda: as_dicts(ls_parser.parse(lines)))[1]
+    lazy = memory(parse_lazily, lines)[1]
+    print("%d entries" % args.lines)
+    print("{0:>10} {1:>12} {2:>12}".format("", "time (s)", "memory (MB)"))
+    print("{0:>10} {1:>12.3f} {2:>12.1f}".format("Entry", elapsed, entries / 1e6))
+    print("{0:>10} {1:>12} {2:>12.1f}".format("dict", "", dicts / 1e6))
+    print("{0:>10} {1:>12.3f} {2:>12.1f}".format("lazy", lazy_elapsed, lazy / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Compare the time the pre-filtering of files takes by "grep" and in-process by
+:func:`insights.util.fs.filter_lines`, and check they keep the same lines.
+
+Examples:
+    python -m insights.tools.prefilter_benchmark -f kernel -f error /var/log/messages
+    python -m insights.tools.prefilter_benchmark -s insights.specs.Specs.ps_auxww ps_auxww.txt
+"""
+from __future__ import print_function
+import argparse
+import io
+import sys
+import timeit
+
+from insights import dr
+from insights.core import filters
+from insights.core.spec_factory import SAFE_ENV
+from insights.util import fs, subproc
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Compare pre-filtering files by grep and in-process.")
+    p.add_argument("files", nargs="+", help="Files to pre-filter.")
+    p.add_argument("-f", "--filter", action="append", default=[],
+                   help="A filter string, can be repeated.")
+    p.add_argument("-s", "--spec", help="Use the filters of this spec.")
+    p.add_argument("-n", "--number", type=int, default=10,
+                   help="Number of times each file is pre-filtered.")
+    return p.parse_args()
+
+
+def grep(path, patterns):
+    args = ["grep", "-F", "--", "\n".join(patterns), path]
+    return subproc.call([args], keep_rc=True, env=SAFE_ENV)[1]
+
+
+def native(path, patterns):
+    out = io.BytesIO()
+    if fs.filter_lines(path, patterns, out) is None:
+        return None
+    return out.getvalue().decode("utf-8", "ignore")
+
+
+def main():
+    args = parse_args()
+    patterns = list(args.filter)
+    if args.spec:
+        # the filters are added by the parsers and combiners of the spec
+        for package in ("insights.specs", "insights.parsers", "insights.combiners"):
+            dr.load_components(package, continue_on_error=False)
+        patterns.extend(filters.get_filters(dr.get_component(args.spec)))
+    if not patterns:
+        print("No filters.", file=sys.stderr)
+        sys.exit(1)
+
+    print("{0:>12} {1:>12} {2:>12}  {3}".format("size", "grep (ms)", "native (ms)", "file"))
+    for path in args.files:
+        result = native(path, patterns)
+        if result is None:
+            print("{0:>12} {1:>12} {2:>12}  {3}".format(fs.size(path), "", "unsupported", path))
+            continue
+        if result != grep(path, patterns):
+            print("Different lines are kept in %s" % path, file=sys.stderr)
+            sys.exit(1)
+        g = timeit.timeit(lambda: grep(path, patterns), number=args.number)
+        n = timeit.timeit(lambda: native(path, patterns), number=args.number)
+        print("{0:>12} {1:>12.3f} {2:>12.3f}  {3}".format(
+            fs.size(path), g * 1000 / args.number, n * 1000 / args.number, path))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 import errno
 import hashlib
+import mmap
 import os
+import stat
+import struct
+import tempfile
 
 from insights.util import subproc
 
@@ -119,3 +123,326 @@ def size(path):
     """
 
     return os.stat(path).st_size
+
+
+def read_pieces_reversed(f, start=0, end=None, blocksize=65536):
+    """Yield the pieces of a file separated by newlines, last piece first.
+
+    Only one block and the piece being assembled are held in memory.
+
+    Parameters
+    ----------
+    f : file
+        a seekable file object opened in binary mode.
+    start : int
+        offset of the first byte to read.
+    end : int
+        offset after the last byte to read.  Defaults to the end of the file.
+    blocksize : int
+        number of bytes read at a time.
+
+    Returns
+    -------
+    generator
+        the bytes between newlines, without the newlines.  The first piece
+        yielded is the one after the last newline, which may be empty.
+    """
+    if end is None:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+    pos = end
+    tail = b""
+    while pos > start:
+        size = min(blocksize, pos - start)
+        pos -= size
+        f.seek(pos)
+        pieces = (f.read(size) + tail).split(b"\n")
+        tail = pieces[0]
+        for idx in range(len(pieces) - 1, 0, -1):
+            yield pieces[idx]
+    yield tail
+
+
+def read_lines_reversed(f, start=0, end=None, encoding="utf-8", errors="strict", keepends=False):
+    """Yield the lines of a file, last line first.
+
+    Lines are split the same way as iterating over the file opened in text
+    mode with universal newlines does, so "\\n", "\\r\\n", and "\\r" all end
+    a line.
+
+    Parameters
+    ----------
+    f : file
+        a seekable file object opened in binary mode.
+    start : int
+        offset of the first byte to read.
+    end : int
+        offset after the last byte to read.  Defaults to the end of the file.
+    encoding : str
+        encoding used to decode the lines.  It must be ASCII compatible.
+        If None, the lines are not decoded and only "\\n" ends a line, as
+        for the iteration over a file in Python 2.
+    errors : str
+        error handling scheme used to decode the lines.
+    keepends : bool
+        If True, each line that is ended keeps a "\\n".
+
+    Returns
+    -------
+    generator
+        the decoded lines, or the bytes of the lines if `encoding` is None.
+    """
+    last = True
+    for piece in read_pieces_reversed(f, start=start, end=end):
+        if not encoding:
+            # only "\n" ends the lines of a file read in Python 2
+            if keepends and not last:
+                piece += b"\n"
+            if piece or not last:
+                yield piece
+            last = False
+            continue
+        text = piece.decode(encoding, errors)
+        if last and not text:
+            last = False
+            continue
+        ended = not last or text.endswith("\r")
+        last = False
+        if text.endswith("\r"):
+            text = text[:-1]
+        lines = text.split("\r")
+        for idx in range(len(lines) - 1, -1, -1):
+            line = lines[idx]
+            if keepends and (ended or idx < len(lines) - 1):
+                line += "\n"
+            yield line
+
+
+def filter_lines(path, patterns, out, chunksize=16 * 1024 * 1024):
+    """Write the lines of a file containing any of the fixed strings.
+
+    The same lines as ``grep -F`` run with ``LC_ALL=C`` are written, each
+    ended by a newline, without starting a process.  The file is mapped in
+    memory and searched a chunk of lines at a time, so only the positions of
+    the matched lines of one chunk are held in memory.
+
+    Parameters
+    ----------
+    path : str
+        path of the file to search.
+    patterns : list
+        the fixed strings (str or bytes) to search for.  Like the pattern
+        argument of ``grep``, a string containing newlines is taken as
+        several strings.
+    out : file
+        a file object opened in binary mode to write the lines to.
+    chunksize : int
+        approximate number of bytes searched at a time.
+
+    Returns
+    -------
+    int or None
+        the number of lines written.  None is returned and nothing is
+        written when the file cannot be searched this way, i.e. when it
+        is empty as per its size (like files under /proc), cannot be
+        mapped, or looks binary to ``grep``.
+    """
+    pats = set()
+    for pat in patterns:
+        if not isinstance(pat, bytes):
+            pat = pat.encode("utf-8", "surrogateescape")
+        pats.update(pat.split(b"\n"))
+    with open(path, "rb") as f:
+        fsize = os.fstat(f.fileno()).st_size
+        if not fsize:
+            return None
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (EnvironmentError, ValueError):
+            return None
+    try:
+        if mm.find(b"\0") >= 0:
+            return None
+        count = 0
+        pos = 0
+        while pos < fsize:
+            # chunks end at the end of a line, so no match crosses them
+            end = mm.find(b"\n", min(pos + chunksize, fsize) - 1) + 1 or fsize
+            lines = {}
+            for pat in pats:
+                at = mm.find(pat, pos, end)
+                while 0 <= at < end:
+                    start = max(mm.rfind(b"\n", pos, at) + 1, pos)
+                    stop = mm.find(b"\n", at, end)
+                    stop = end if stop < 0 else stop
+                    lines[start] = stop
+                    at = mm.find(pat, stop + 1, end) if stop < end else -1
+            for start in sorted(lines):
+                out.write(mm[start:lines[start]] + b"\n")
+            count += len(lines)
+            pos = end
+        return count
+    finally:
+        mm.close()
+
+
+_KERNEL_COPY_ERRORS = set(
+    getattr(errno, name) for name in ("EINVAL", "ENOSYS", "EXDEV", "EOPNOTSUPP", "ENOTSUP", "EBADF")
+    if hasattr(errno, name)
+)
+
+
+def _kernel_copy(src, dst, blocksize):
+    """Copy from the file descriptor `src` to `dst` without passing the
+    data through user space.  Returns the number of bytes copied, which
+    may be less than the size of the file when the kernel can't copy it.
+    """
+    copied = 0
+    for name in ("copy_file_range", "sendfile"):
+        func = getattr(os, name, None)
+        if func is None:
+            continue
+        try:
+            while True:
+                if name == "sendfile":
+                    n = func(dst, src, None, blocksize)
+                else:
+                    n = func(src, dst, blocksize)
+                if not n:
+                    return copied
+                copied += n
+        except OSError as e:
+            # nothing was copied by the failed call, go on from the
+            # current offsets.
+            if e.errno not in _KERNEL_COPY_ERRORS:
+                raise
+    return copied
+
+
+def copy_file(src, dst, blocksize=1024 * 1024):
+    """Copy the content of a file in-process like ``cp`` does.
+
+    The data of regular files is copied by the kernel with
+    ``os.copy_file_range`` or ``os.sendfile`` where they are available.
+    Whatever they can't copy, e.g. the files under /proc whose size is 0,
+    is read and written a block at a time.  When `dst` doesn't exist, it
+    is created with the permissions of `src` minus the umask.
+
+    Parameters
+    ----------
+    src : str
+        path of the file to copy.
+    dst : str
+        path of the copy.
+    blocksize : int
+        number of bytes copied at a time.
+
+    Returns
+    -------
+    int
+        the number of bytes copied.
+    """
+    with open(src, "rb") as fsrc:
+        st = os.fstat(fsrc.fileno())
+        fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, stat.S_IMODE(st.st_mode))
+        try:
+            copied = 0
+            if stat.S_ISREG(st.st_mode) and st.st_size:
+                copied = _kernel_copy(fsrc.fileno(), fd, blocksize)
+            while True:
+                block = os.read(fsrc.fileno(), blocksize)
+                if not block:
+                    return copied
+                view = memoryview(block)
+                while view:
+                    n = os.write(fd, view)
+                    view = view[n:]
+                copied += len(block)
+        finally:
+            os.close(fd)
+
+
+def write_lines(f, lines, chunksize=4096):
+    """Write lines separated by newlines to a binary file.
+
+    The lines are joined and encoded as UTF-8 `chunksize` lines at a time,
+    so the content isn't copied as a whole.  The same bytes are written as
+    for ``"\\n".join(lines)``.
+
+    Parameters
+    ----------
+    f : file
+        a file object opened in binary mode.
+    lines : list
+        the lines to write, without newlines.
+    chunksize : int
+        number of lines joined at a time.
+    """
+    for start in range(0, len(lines), chunksize):
+        chunk = "\n".join(lines[start:start + chunksize])
+        if start:
+            chunk = "\n" + chunk
+        f.write(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8"))
+
+
+class ReversedSpool(object):
+    """A temporary file that gives back the records written to it in
+    reverse order.
+
+    Records are written with their length after them, so they may contain
+    any bytes, and are read back from the end of the file one block at a
+    time.
+
+    Examples
+    --------
+    >>> with ReversedSpool() as spool:
+    ...     spool.write(b"first")
+    ...     spool.write(b"second")
+    ...     list(spool)
+    [b'second', b'first']
+    """
+    _footer = struct.Struct("<I")
+
+    def __init__(self, blocksize=65536):
+        self.blocksize = blocksize
+        self.count = 0
+        self._file = tempfile.TemporaryFile()
+
+    def write(self, record):
+        self._file.write(record)
+        self._file.write(self._footer.pack(len(record)))
+        self.count += 1
+
+    def __iter__(self):
+        f = self._file
+        f.seek(0, os.SEEK_END)
+        state = {"pos": f.tell(), "buf": b"", "end": 0}
+
+        def fill(need):
+            # keep the unread part of the buffer and prepend blocks until it
+            # holds at least ``need`` bytes
+            while state["end"] < need:
+                size = min(self.blocksize, state["pos"])
+                state["pos"] -= size
+                f.seek(state["pos"])
+                state["buf"] = f.read(size) + state["buf"][:state["end"]]
+                state["end"] = len(state["buf"])
+
+        footer = self._footer.size
+        for _ in range(self.count):
+            fill(footer)
+            end = state["end"]
+            need = footer + self._footer.unpack(state["buf"][end - footer:end])[0]
+            fill(need)
+            end = state["end"]
+            yield state["buf"][end - need:end - footer]
+            state["end"] = end - need
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()